@@ -1,159 +1,366 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from backend.app.services.analyzer import AssetAnalyzer
-import shutil
+from fastapi import APIRouter, UploadFile, File, HTTPException, Request
+from fastapi.responses import PlainTextResponse
+from backend.app.services.analysis_cache import AnalysisCache
+from backend.app.services.job_queue import JobManager
+from backend.app.services.pipeline import (run_analysis_job, run_batch_job, run_edit_job, run_render_job,
+                                           run_shot_search_job)
+from backend.app.services.proxy_service import ProxyManager, build_proxy_job
+from backend.app.services.output_profiles import OUTPUT_PROFILES, get_output_profile
+from backend.app.services.upload_service import UploadManager, UploadNotFound, UploadOffsetMismatch
+from backend.app.services.asset_registry import AssetRegistry
+from backend.app.services.edl_schema import EDLValidationError, EDLValidator
+from backend.app.services.paths import PROXY_DIR, REFERENCE_DIR, UPLOAD_DIR, is_local_reference, within_dirs
+from backend.app.services.warmup import WORKER_MODULES
 import os
-import uuid
 
 router = APIRouter()
-analyzer = AssetAnalyzer()
+# Media/ML libraries only load in the (pre-warmed) job workers; the API process stays light
+cache = AnalysisCache()
+jobs = JobManager(warm_modules=WORKER_MODULES)
 
-UPLOAD_DIR = "backend/uploads"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
+registry = AssetRegistry()
+uploads = UploadManager(upload_dir=UPLOAD_DIR, cache=cache, registry=registry)
+proxies = ProxyManager(proxy_dir=PROXY_DIR, cache=cache)
+
+
+def _queue_proxy(saved: dict):
+    """Build the preview proxy of a freshly uploaded video in the background."""
+    if saved.get("kind") == "video" and proxies.get(saved["path"]) is None:
+        jobs.submit(build_proxy_job, {"path": saved["path"], "proxy_dir": proxies.proxy_dir}, kind="proxy")
 
 @router.post("/upload")
 async def upload_asset(file: UploadFile = File(...)):
     """
-    Upload a video or audio file. Returns a file ID.
+    Upload a video or audio file (told apart by extension). Returns a file ID.
+    Identical content uploaded before returns the existing file ID.
     """
-    file_id = str(uuid.uuid4())
-    extension = os.path.splitext(file.filename)[1]
-    file_path = os.path.join(UPLOAD_DIR, f"{file_id}{extension}")
-    
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-        
-    return {"file_id": file_id, "filename": file.filename, "path": file_path}
+    saved = await uploads.save_upload(file)
+    _queue_proxy(saved)
+    return {"file_id": saved["file_id"], "filename": file.filename, "path": saved["path"],
+            "deduplicated": saved["deduplicated"]}
+
+# --- Resumable Uploads ---
+
+@router.post("/uploads")
+async def init_upload(request: dict):
+    """
+    Start a chunked upload: {"filename", "size" (optional), "kind": "video" | "audio" | "music"}.
+    Without a kind, an asset upload is audio or video by its file extension.
+    Then PUT raw bytes to /api/uploads/{upload_id}?offset=N and POST .../finalize.
+    """
+    try:
+        return await uploads.init(request.get("filename", ""), request.get("size"), request.get("kind"))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/uploads/{upload_id}")
+async def upload_status(upload_id: str):
+    """Current offset, so an interrupted client knows where to resume."""
+    try:
+        return uploads.status(upload_id)
+    except UploadNotFound:
+        raise HTTPException(status_code=404, detail="Upload not found")
+
+@router.put("/uploads/{upload_id}")
+async def upload_chunk(upload_id: str, offset: int, request: Request):
+    try:
+        return await uploads.write_chunk(upload_id, offset, request.stream())
+    except UploadNotFound:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    except UploadOffsetMismatch as e:
+        raise HTTPException(status_code=409, detail={"error": str(e), "offset": e.expected})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/uploads/{upload_id}/finalize")
+async def finalize_upload(upload_id: str, request: dict = None):
+    """Optional body {"sha256"} is verified against the hash computed during the upload."""
+    try:
+        saved = await uploads.finalize(upload_id, (request or {}).get("sha256"))
+        _queue_proxy(saved)
+        return saved
+    except UploadNotFound:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    except UploadOffsetMismatch as e:
+        raise HTTPException(status_code=409, detail={"error": "Upload incomplete", "offset": e.expected})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.post("/analyze/{file_type}/{file_id}")
 async def analyze_asset(file_type: str, file_id: str):
     """
     Trigger analysis. file_type = 'video' or 'audio'.
+    Runs in a job worker (where the analysis libraries are loaded) and waits for the result.
     """
-    # Simple search for file (ignoring extension)
-    found_path = None
-    if os.path.exists(UPLOAD_DIR):
-        for f in os.listdir(UPLOAD_DIR):
-            if f.startswith(file_id):
-                found_path = os.path.join(UPLOAD_DIR, f)
-                break
-            
-    if not found_path:
+    if file_type not in ("video", "audio"):
+        raise HTTPException(status_code=400, detail="Invalid file type")
+    asset = registry.get(file_id)
+    if not asset or not os.path.exists(asset["path"]):
         raise HTTPException(status_code=404, detail="File not found")
-        
+
     try:
-        if file_type == "video":
-            metadata = analyzer.get_video_metadata(found_path)
-            scenes = analyzer.detect_scenes(found_path)
-            return {"metadata": metadata, "scenes": scenes}
-        elif file_type == "audio":
-            analysis = analyzer.analyze_audio(found_path)
-            return {"analysis": analysis}
-            raise HTTPException(status_code=400, detail="Invalid file type")
+        analysis = await jobs.run(run_analysis_job, {"file_type": file_type, "path": asset["path"], "file_id": file_id},
+                                  kind="analysis")
     except Exception as e:
         print(f"Analysis error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+    if file_type == "video":
+        registry.set_analysis(file_id, {"metadata": analysis["metadata"], "scenes": analysis["scenes"]})
+        return {"metadata": analysis["metadata"], "scenes": analysis["scenes"], "interest": analysis["interest"],
+                "shots_indexed": analysis["shots_indexed"]}
+    registry.set_analysis(file_id, {"audio": analysis["audio"]})
+    return {"analysis": analysis["audio"]}
 
-@router.post("/generate_edit")
-async def generate_edit(request: dict):
-    """
-    Full Pipeline:
-    1. Receives list of file_ids and a prompt.
-    2. Director creates an EDL.
-    3. VideoProcessor renders it.
-    """
-    from backend.app.services.director import Director
-    from backend.app.services.video_processor import VideoProcessor
-    from backend.app.services.reference_extractor import ReferenceExtractor
-    
+def _edit_payload(request: dict) -> dict:
+    """Resolve the asset set of an edit request (file ids, music, reference) into the worker payload."""
     file_ids = request.get("file_ids", [])
     prompt = request.get("prompt", "Make a cool video")
-    reference_url = request.get("reference_url") # Optional YouTube link
+    reference_url = _checked_reference_url(request.get("reference_url"))  # Optional YouTube link
+    if request.get("reference_id"):
+        # An uploaded video as the style reference
+        reference = registry.get(request["reference_id"])
+        if not reference:
+            raise HTTPException(status_code=404, detail="Reference file not found")
+        reference_url = reference["path"]
     
     if not file_ids:
         raise HTTPException(status_code=400, detail="No files provided")
-        
-    director = Director()
-    processor = VideoProcessor()
-    ref_extractor = ReferenceExtractor()
-    
-    # 0. Process Reference (if any)
-    reference_style = None
-    if reference_url:
-        try:
-            print(f"Downloading reference: {reference_url}")
-            ref_path = ref_extractor.download_reference(reference_url)
-            reference_style = ref_extractor.analyze_style(ref_path)
-            print(f"Extracted Style: {reference_style}")
-        except Exception as e:
-            print(f"Reference extraction failed: {e}")
-            # Continue without reference
+    output_profile = request.get("output_profile")  # e.g. "vertical_1080"; see /api/output_profiles
+    _check_output_profile(output_profile)
             
     # 0.5 Process Music (if any)
     music_id = request.get("music_id")
     music_path = None
     if music_id:
-        # Search in music dir
-        music_dir = "backend/uploads/music"
-        for f in os.listdir(music_dir):
-            if f.startswith(music_id):
-                music_path = os.path.join(music_dir, f)
-                break
+        music = registry.get(music_id)
+        if music:
+            music_path = music["path"]
     
-    # 1. Gather Metadata
-    assets_metadata = []
+    # 1. Resolve assets (metadata is gathered in the worker)
+    known = registry.get_many(file_ids)
+    assets = []
     for fid in file_ids:
-        # Locate file
-        found_path = None
-        for f in os.listdir(UPLOAD_DIR):
-            if f.startswith(fid):
-                found_path = os.path.join(UPLOAD_DIR, f)
-                break
-        
-        if found_path:
-            meta = analyzer.get_video_metadata(found_path)
-            assets_metadata.append({
-                "file_id": fid,
-                "path": found_path,
-                "metadata": meta
-            })
-            
-    # 2. Director -> EDL
-    # Mix user prompt with reference insights
-    final_prompt = prompt
-    if reference_style:
-        pacing = reference_style.get("pacing", "normal")
-        final_prompt += f". STYLE REFERENCE: Match this pacing: {pacing} (avg shot {reference_style.get('avg_shot_length', 3):.1f}s)."
-        
-    edl = director.generate_edit_script(final_prompt, assets_metadata, reference_style)
-    
-    if music_path:
-        edl['audio_track'] = music_path
-    
-    # 3. Render
-    output_filename = f"render_{uuid.uuid4()}.mp4"
-    output_path = os.path.join(UPLOAD_DIR, output_filename)
-    
+        if fid in known:
+            assets.append({"file_id": fid, "path": known[fid]["path"]})
+
+    return {
+        "assets": assets,
+        "prompt": prompt,
+        "reference_url": reference_url,
+        "music_path": music_path,
+        "render_workers": request.get("render_workers"),  # Optional per-request segment worker count
+        "preview": bool(request.get("preview")),
+        "output_profile": output_profile,
+        "director_timeout": request.get("director_timeout"),  # Optional LLM timeout (seconds)
+        "hedge_after": request.get("hedge_after"),  # Optional latency budget before the heuristic edit wins
+    }
+
+
+def _checked_reference_url(url):
+    """
+    A client-supplied reference URL. Local files are only accepted from the upload and reference
+    download directories (uploaded videos are better passed as reference_id): a request must not make
+    a worker open arbitrary files on the server.
+    """
+    if not url:
+        return None
+    if not isinstance(url, str):
+        raise HTTPException(status_code=400, detail="reference_url must be a string")
+    if is_local_reference(url):
+        path = url[len("file://"):] if url.startswith("file://") else url
+        if not os.path.isfile(path) or not within_dirs(path, (UPLOAD_DIR, REFERENCE_DIR)):
+            raise HTTPException(status_code=400, detail="reference_url must be a remote URL or an uploaded file")
+    return url
+
+
+def _check_output_profile(output_profile):
     try:
-        processor.render_video(edl, output_path)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Rendering failed: {str(e)}")
+        get_output_profile(output_profile)
+    except (ValueError, KeyError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid output profile: {e}")
+
+
+@router.post("/generate_edit")
+async def generate_edit(request: dict):
+    """
+    Submit the full pipeline as a background render job:
+    1. Receives list of file_ids and a prompt.
+    2. Director creates an EDL.
+    3. VideoProcessor renders it.
+    Returns a job id immediately; poll /api/jobs/{job_id} for progress and the output_url.
+    With "preview": true the draft is rendered from low-res proxies with a fast preset;
+    promote it with /api/jobs/{job_id}/promote.
+    """
+    job_id = jobs.submit(run_edit_job, _edit_payload(request))
         
     return {
-        "status": "success",
+        "status": "queued",
+        "job_id": job_id,
+        "status_url": f"/api/jobs/{job_id}"
+    }
+
+MAX_BATCH_VARIANTS = 12
+
+@router.post("/generate_batch")
+async def generate_batch(request: dict):
+    """
+    Several edits of one asset set as a single job: the /generate_edit fields plus
+    "variants": [{"name", "prompt", "style" ("hype" | "cinematic" | "vlog"), "output_profile"}].
+    Analysis runs once and the renders are scheduled together, sharing parts and source decodes.
+    Poll /api/jobs/{job_id}; result["variants"] lists each output_url and EDL
+    (promote one with /api/jobs/{job_id}/promote and {"edl": ...}).
+    """
+    variants = request.get("variants") or []
+    if not isinstance(variants, list) or not variants:
+        raise HTTPException(status_code=400, detail="No variants provided")
+    if len(variants) > MAX_BATCH_VARIANTS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_VARIANTS} variants per batch")
+    for variant in variants:
+        if not isinstance(variant, dict):
+            raise HTTPException(status_code=400, detail="Each variant must be an object")
+        _check_output_profile(variant.get("output_profile"))
+
+    payload = _edit_payload(request)
+    payload["variants"] = [{k: v.get(k) for k in ("name", "prompt", "style", "output_profile") if k in v}
+                           for v in variants]
+    job_id = jobs.submit(run_batch_job, payload, kind="batch")
+    return {
+        "status": "queued",
+        "job_id": job_id,
+        "variants": len(variants),
+        "status_url": f"/api/jobs/{job_id}"
+    }
+
+@router.get("/assets")
+async def list_assets(kind: str = None, limit: int = 50, offset: int = 0):
+    """Paginated asset listing from the registry. kind = 'video', 'music' or 'audio'."""
+    return registry.list(kind=kind, limit=max(1, min(limit, 500)), offset=max(0, offset))
+
+@router.get("/shots/search")
+async def search_shots(q: str, k: int = 10, file_ids: str = None):
+    """
+    Shots of analyzed videos matching a text query ("sunset", "crowd cheering"), best first.
+    `file_ids` (comma-separated) restricts the search. Runs in a job worker, where the embedding model lives.
+    """
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="Empty query")
+    request = {"query": q, "k": max(1, min(k, 100)),
+               "file_ids": [fid for fid in file_ids.split(",") if fid] if file_ids else None}
+    try:
+        return await jobs.run(run_shot_search_job, request, kind="search")
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Shot search unavailable: {e}")
+
+@router.get("/output_profiles")
+async def list_output_profiles():
+    """Named render presets usable as "output_profile" in /generate_edit and /jobs/{id}/promote."""
+    return OUTPUT_PROFILES
+
+@router.get("/cache/stats")
+async def cache_stats():
+    """Analysis cache hit/miss counters for this API process."""
+    return cache.stats()
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """
+    Prometheus scrape endpoint: job counts and durations, per-stage timings, frames encoded,
+    bytes written and stage errors of the jobs finished by this API process, and the per-module
+    import time of the job workers.
+    """
+    for status, count in jobs.status_counts().items():
+        jobs.metrics.set("jobs", count, status=status)
+    jobs.worker_imports()
+    return PlainTextResponse(jobs.metrics.render(), media_type="text/plain; version=0.0.4")
+
+# --- Job Endpoints ---
+
+@router.get("/jobs")
+async def list_jobs():
+    return jobs.list()
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """
+    Job status: queued | running | cancelling | completed | failed | cancelled.
+    Once completed, `output_url` points at the rendered video; `trace` has per-stage timings and counters.
+    """
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["status"] == "completed" and job["result"]:
+        job["output_url"] = job["result"].get("output_url")
+    return job
+
+@router.post("/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str):
+    job = jobs.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.post("/jobs/{job_id}/promote")
+async def promote_job(job_id: str, request: dict = None):
+    """
+    Full-quality render of a completed (preview) job's EDL.
+    An edited EDL can be passed as {"edl": {...}}; otherwise the job's own EDL is used.
+    An edited EDL is checked first: 400 with the list of problems if it cannot be rendered.
+    """
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    edl = (request or {}).get("edl")
+    output_profile = (request or {}).get("output_profile") or (job["result"] or {}).get("output_profile")
+    _check_output_profile(output_profile)
+    if edl is None:
+        if job["status"] != "completed" or not (job["result"] or {}).get("edl"):
+            raise HTTPException(status_code=409, detail="Job has no finished EDL to promote")
+        edl = job["result"]["edl"]
+    else:
+        edl = _checked_edl(edl)
+
+    new_job_id = jobs.submit(run_render_job, {
         "edl": edl,
-        "output_url": f"/static/{output_filename}",
-        "output_path": output_path
+        "render_workers": (request or {}).get("render_workers"),
+        "output_profile": output_profile,
+    })
+    return {
+        "status": "queued",
+        "job_id": new_job_id,
+        "status_url": f"/api/jobs/{new_job_id}"
     }
 
+def _checked_edl(edl) -> dict:
+    """
+    Normalize an edited EDL against the registered assets it references, so a plan that cannot be
+    rendered is a 400 here instead of a failed job.
+    """
+    timeline = edl.get("timeline") if isinstance(edl, dict) else None
+    entries = [c for c in timeline or [] if isinstance(c, dict)]
+    clip_ids = {str(c["clip_id"]) for c in entries if c.get("clip_id") is not None}
+    paths = {c["source_path"] for c in entries if isinstance(c.get("source_path"), str)}
+    # Entries may name their asset by clip_id, by source_path or both
+    found = registry.get_many(sorted(clip_ids))
+    for asset in registry.get_many_by_path(sorted(paths)).values():
+        found.setdefault(asset["file_id"], asset)
+    assets = [{"file_id": fid, "path": asset["path"],
+               "metadata": (asset.get("analysis") or {}).get("metadata") or {}}
+              for fid, asset in found.items()]
+    try:
+        return EDLValidator(assets).normalize(edl)
+    except EDLValidationError as e:
+        raise HTTPException(status_code=400, detail={"error": "Invalid EDL", "problems": e.errors})
+
 # --- Music Endpoints ---
 from backend.app.services.audio_service import AudioService
-audio_service = AudioService()
+audio_service = AudioService(uploads=uploads)
 
 @router.post("/music/upload")
 async def upload_music(file: UploadFile = File(...)):
-    return audio_service.save_music(file)
+    return await audio_service.save_music(file)
 
 @router.get("/music/list")
-async def list_music():
-    return audio_service.list_music()
+async def list_music(limit: int = 1000, offset: int = 0):
+    return audio_service.list_music(limit=limit, offset=offset)
 
@@ -0,0 +1,229 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import zipfile
+
+from backend.app.services.paths import CACHE_DIR
+
+HASH_CHUNK_SIZE = 4 * 1024 * 1024
+
+
+def file_content_hash(path: str) -> str:
+    """SHA-256 of the file contents (streamed, constant memory)."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(HASH_CHUNK_SIZE)
+            if not chunk:
+                break
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class AnalysisCache:
+    """
+    Persistent, content-addressed cache for analysis results (metadata, scenes, beat grids).
+
+    Entries are JSON files keyed by sha256(file hash, kind, analyzer version, params), so a renamed
+    or re-uploaded copy of the same footage hits the cache and an edited file misses it. Analyses
+    made of NumPy arrays (e.g. per-second feature tracks) are stored as .npz files under the same keys.
+    Total size is bounded by `max_bytes`; the least recently used entries are evicted first
+    (recency is tracked through the entry files' mtime, which is bumped on every hit).
+
+    Hashing a large file is itself expensive, so file hashes are memoized by (path, size, mtime).
+    """
+
+    def __init__(self, cache_dir: str = os.path.join(CACHE_DIR, "analysis"), max_bytes: int = None):
+        if max_bytes is None:
+            max_bytes = int(os.getenv("ANALYSIS_CACHE_MAX_MB", "512")) * 1024 * 1024
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._hash_memo = {}
+        self._size = self._scan_size()
+
+    # --- Keys ---
+
+    def file_hash(self, path: str) -> str:
+        st = os.stat(path)
+        stamp = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+        cached = self._hash_memo.get(stamp)
+        if cached:
+            return cached
+
+        # Persisted too, so other worker processes and restarts skip re-hashing
+        stamp_key = self.make_key("path", "file_hash", {"stamp": list(stamp)})
+        entry = self._read(stamp_key)
+        digest = entry["value"] if entry else None
+        if not digest:
+            digest = file_content_hash(path)
+            self._write(stamp_key, digest)
+        self._hash_memo[stamp] = digest
+        return digest
+
+    def remember_hash(self, path: str, digest: str):
+        """Seed the hash memo for a file whose hash is already known (e.g. computed during upload)."""
+        st = os.stat(path)
+        stamp = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+        self._hash_memo[stamp] = digest
+        self._write(self.make_key("path", "file_hash", {"stamp": list(stamp)}), digest)
+
+    @staticmethod
+    def make_key(file_hash: str, kind: str, params: dict = None, version: str = "") -> str:
+        raw = json.dumps([file_hash, kind, version, params or {}], sort_keys=True)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    # --- Entries ---
+
+    def _path(self, key: str, ext: str = "json") -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.{ext}")
+
+    def _read(self, key: str):
+        path = self._path(key)
+        try:
+            with open(path, "r") as f:
+                entry = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        self._touch(path)
+        return entry
+
+    @staticmethod
+    def _touch(path: str):
+        try:
+            os.utime(path, None)  # LRU touch
+        except OSError:
+            pass
+
+    def _write(self, key: str, value):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"value": value, "created_at": time.time()}, f)
+        self._commit(tmp_path, path)
+
+    def _commit(self, tmp_path: str, path: str):
+        """Move a fully written entry into place and account for its size."""
+        size = os.path.getsize(tmp_path)
+        try:
+            previous = os.path.getsize(path)
+        except OSError:
+            previous = 0
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._size += size - previous
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def get(self, key: str):
+        entry = self._read(key)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return entry["value"]
+
+    def put(self, key: str, value):
+        self._write(key, value)
+
+    def get_or_compute(self, file_path: str, kind: str, params: dict, compute, version: str = ""):
+        """
+        Return the cached `kind` analysis of file_path, computing (and storing) it on a miss.
+        """
+        key = self.make_key(self.file_hash(file_path), kind, params, version)
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def get_arrays(self, key: str):
+        """{name: ndarray} stored under `key`, or None."""
+        import numpy as np
+
+        path = self._path(key, "npz")
+        try:
+            with np.load(path, allow_pickle=False) as stored:
+                arrays = {name: stored[name] for name in stored.files}
+        except (OSError, ValueError, zipfile.BadZipFile):
+            arrays = None
+        with self._lock:
+            if arrays is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        self._touch(path)
+        return arrays
+
+    def put_arrays(self, key: str, arrays: dict):
+        import numpy as np
+
+        path = self._path(key, "npz")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **arrays)
+        self._commit(tmp_path, path)
+
+    def get_or_compute_arrays(self, file_path: str, kind: str, params: dict, compute, version: str = ""):
+        """get_or_compute for analyses made of NumPy arrays: `compute` returns {name: ndarray}."""
+        key = self.make_key(self.file_hash(file_path), kind, params, version)
+        arrays = self.get_arrays(key)
+        if arrays is None:
+            arrays = compute()
+            self.put_arrays(key, arrays)
+        return arrays
+
+    # --- Eviction / stats ---
+
+    def _entries(self):
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith((".json", ".npz")):
+                    path = os.path.join(root, name)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    yield path, st.st_size, st.st_mtime
+
+    def _scan_size(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self, target_ratio: float = 0.9):
+        """Drop least recently used entries until the cache is under target_ratio * max_bytes."""
+        entries = sorted(self._entries(), key=lambda e: e[2])
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * target_ratio
+        for path, size, _ in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            self.evictions += 1
+        with self._lock:
+            self._size = total
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "bytes": self._size,
+            "max_bytes": self.max_bytes,
+        }
@@ -1,19 +1,33 @@
 import cv2
-import librosa
 import numpy as np
 import os
 import json
-# from scenedetect import VideoManager, SceneManager, ContentDetector
+from backend.app.services.scene_detector import SceneDetector
+from backend.app.services.analysis_cache import AnalysisCache
+from backend.app.services.beat_analyzer import BeatAnalyzer
+from backend.app.services.feature_track import FeatureExtractor
+
+# Bump when an analysis changes its output so stale cache entries are ignored
+ANALYZER_VERSION = "3"
 
 class AssetAnalyzer:
-    def __init__(self):
-        # Initialize models here (lazy loading recommended for heavy models like CLIP)
-        pass
+    def __init__(self, cache: AnalysisCache = None):
+        # CLIP (shot search) is loaded lazily by ShotIndex's embedder, only in workers that use it
+        self.cache = cache if cache is not None else AnalysisCache()
+
+    def _cached(self, path: str, kind: str, params: dict, compute):
+        # Missing/unreadable files go straight to the analysis so it raises its usual error
+        if self.cache is None or not os.path.isfile(path):
+            return compute()
+        return self.cache.get_or_compute(path, kind, params, compute, version=ANALYZER_VERSION)
 
     def get_video_metadata(self, video_path: str):
         """
-        Extract basic metadata from video.
+        Extract basic metadata from video (cached by file content).
         """
+        return self._cached(video_path, "metadata", {}, lambda: self._read_video_metadata(video_path))
+
+    def _read_video_metadata(self, video_path: str):
         cap = cv2.VideoCapture(video_path)
         if not cap.isOpened():
             raise ValueError(f"Could not open video file: {video_path}")
@@ -37,35 +51,30 @@ class AssetAnalyzer:
     def detect_scenes(self, video_path: str, threshold=30.0):
         """
         Detect scene changes in the video.
-        For now, implementing a simple histogram-based detector or placeholder.
+        Returns [{"start", "end", "description"}] shots covering the whole clip.
         """
-        # Placeholder for PySceneDetect integration
-        # In a real impl, we would use:
-        # scenes = find_scenes(video_path, threshold=threshold)
-        # return [(start_time, end_time) for start_time, end_time in scenes]
-        
-        # Simulating one scene for the whole video for now
-        meta = self.get_video_metadata(video_path)
-        return [{"start": 0.0, "end": meta["duration"], "description": "Full clip"}]
+        return self._cached(video_path, "scenes", {"threshold": threshold},
+                            lambda: SceneDetector(threshold=threshold).detect(video_path))
 
-    def analyze_audio(self, audio_path: str):
+    def get_feature_track(self, video_path: str):
         """
-        Extract beats and tempo from audio.
+        Per-second motion, sharpness, brightness and audio RMS ({name: float32 array}, see
+        FeatureExtractor), from one downsampled pass over the file and cached by file content.
         """
-        # Load audio (only first 60s for speed in demo)
-        y, sr = librosa.load(audio_path, duration=60)
-        
-        # Estimate tempo and beat frames
-        tempo, beat_frames = librosa.beat.beat_track(y=y, sr=sr)
-        
-        # Convert beat frames to time
-        beat_times = librosa.frames_to_time(beat_frames, sr=sr)
-        
-        # Detect onsets (potential cuts)
-        onset_env = librosa.onset.onset_strength(y=y, sr=sr)
-        
-        return {
-            "tempo": float(tempo),
-            "beat_times": beat_times.tolist(),
-            "duration": librosa.get_duration(y=y, sr=sr)
-        }
+        extractor = FeatureExtractor()
+        params = {"sample_fps": extractor.sample_fps, "width": extractor.analysis_width}
+        if self.cache is None or not os.path.isfile(video_path):
+            return extractor.extract(video_path)
+        return self.cache.get_or_compute_arrays(video_path, "features", params,
+                                                lambda: extractor.extract(video_path), version=ANALYZER_VERSION)
+
+    def analyze_audio(self, audio_path: str, sample_rate: int = None):
+        """
+        Beat grid, downbeats, onset peaks and energy envelope for the whole track (cached by file content).
+        The track is decoded in blocks, so long mixes never sit in memory as a full waveform.
+        A lower `sample_rate` (e.g. 11025) is faster; defaults to AUDIO_ANALYSIS_SR or 22050.
+        """
+        if sample_rate is None:
+            sample_rate = int(os.getenv("AUDIO_ANALYSIS_SR", "22050"))
+        return self._cached(audio_path, "audio", {"sample_rate": sample_rate},
+                            lambda: BeatAnalyzer(sample_rate=sample_rate).analyze(audio_path))
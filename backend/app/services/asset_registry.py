@@ -0,0 +1,171 @@
+import json
+import os
+import sqlite3
+import sys
+import time
+from contextlib import contextmanager
+
+from backend.app.services.analysis_cache import file_content_hash
+from backend.app.services.paths import DATA_DIR, MUSIC_DIR, UPLOAD_DIR
+
+VIDEO_EXTENSIONS = ('.mp4', '.mov', '.mkv', '.webm', '.avi', '.m4v')
+AUDIO_EXTENSIONS = ('.mp3', '.wav', '.m4a', '.aac', '.flac', '.ogg')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS assets (
+    file_id    TEXT PRIMARY KEY,
+    path       TEXT NOT NULL,
+    kind       TEXT NOT NULL,
+    filename   TEXT,
+    size       INTEGER,
+    sha256     TEXT,
+    created_at REAL,
+    analysis   TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_assets_sha256 ON assets (sha256);
+CREATE INDEX IF NOT EXISTS idx_assets_kind_created ON assets (kind, created_at);
+CREATE INDEX IF NOT EXISTS idx_assets_path ON assets (path);
+"""
+
+
+def asset_kind(filename: str) -> str:
+    """"audio" or "video": what a file in the upload directory is, by its extension."""
+    return "audio" if os.path.splitext(filename)[1].lower() in AUDIO_EXTENSIONS else "video"
+
+
+class AssetRegistry:
+    """
+    SQLite index of uploaded assets: file_id -> path, kind, size, content hash and cached analysis.
+    Replaces directory scans for id lookups (exact match, O(1) via the primary key).
+    """
+
+    def __init__(self, db_path: str = os.path.join(DATA_DIR, "assets.db")):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        """Short-lived connection per operation (safe across threads and worker processes)."""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _row(row) -> dict:
+        if row is None:
+            return None
+        item = dict(row)
+        item["analysis"] = json.loads(item["analysis"]) if item["analysis"] else None
+        return item
+
+    def add(self, file_id: str, path: str, kind: str, filename: str = None, size: int = None,
+            sha256: str = None) -> dict:
+        if size is None and os.path.exists(path):
+            size = os.path.getsize(path)
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO assets (file_id, path, kind, filename, size, sha256, created_at, analysis) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, (SELECT analysis FROM assets WHERE file_id = ?))",
+                (file_id, path, kind, filename, size, sha256, time.time(), file_id),
+            )
+        return self.get(file_id)
+
+    def get(self, file_id: str) -> dict:
+        with self._connect() as conn:
+            return self._row(conn.execute("SELECT * FROM assets WHERE file_id = ?", (file_id,)).fetchone())
+
+    def get_many(self, file_ids: list) -> dict:
+        if not file_ids:
+            return {}
+        placeholders = ",".join("?" for _ in file_ids)
+        with self._connect() as conn:
+            rows = conn.execute(f"SELECT * FROM assets WHERE file_id IN ({placeholders})", list(file_ids)).fetchall()
+        return {row["file_id"]: self._row(row) for row in rows}
+
+    def get_many_by_path(self, paths: list) -> dict:
+        """path -> asset for the registered ones among `paths` (the first registered, if several share a path)."""
+        if not paths:
+            return {}
+        placeholders = ",".join("?" for _ in paths)
+        with self._connect() as conn:
+            rows = conn.execute(f"SELECT * FROM assets WHERE path IN ({placeholders}) ORDER BY created_at DESC",
+                                list(paths)).fetchall()
+        return {row["path"]: self._row(row) for row in rows}
+
+    def find_by_hash(self, sha256: str, kind: str = None) -> dict:
+        where, params = ("sha256 = ? AND kind = ?", (sha256, kind)) if kind else ("sha256 = ?", (sha256,))
+        with self._connect() as conn:
+            return self._row(conn.execute(
+                f"SELECT * FROM assets WHERE {where} ORDER BY created_at LIMIT 1", params).fetchone())
+
+    def list(self, kind: str = None, limit: int = 50, offset: int = 0) -> dict:
+        where, params = ("WHERE kind = ?", [kind]) if kind else ("", [])
+        with self._connect() as conn:
+            total = conn.execute(f"SELECT COUNT(*) FROM assets {where}", params).fetchone()[0]
+            rows = conn.execute(
+                f"SELECT * FROM assets {where} ORDER BY created_at, file_id LIMIT ? OFFSET ?",
+                params + [limit, offset],
+            ).fetchall()
+        return {"items": [self._row(r) for r in rows], "total": total, "limit": limit, "offset": offset}
+
+    def set_analysis(self, file_id: str, analysis: dict):
+        with self._connect() as conn:
+            conn.execute("UPDATE assets SET analysis = ? WHERE file_id = ?", (json.dumps(analysis), file_id))
+
+    def remove(self, file_id: str):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM assets WHERE file_id = ?", (file_id,))
+
+    def rebuild(self, upload_dir: str = UPLOAD_DIR, music_dir: str = MUSIC_DIR,
+                hash_files: bool = True) -> int:
+        """
+        Index files already sitting in the upload directories (named `<file_id><ext>`),
+        and drop entries whose files are gone. Returns the number of files indexed.
+        """
+        found = 0
+        for directory, kind in ((upload_dir, None), (music_dir, "music")):
+            if not os.path.isdir(directory):
+                continue
+            for name in os.listdir(directory):
+                path = os.path.join(directory, name)
+                file_id, ext = os.path.splitext(name)
+                # Hidden bookkeeping files and render outputs are not assets
+                if name.startswith((".", "render_")) or not os.path.isfile(path):
+                    continue
+                if kind is None and ext.lower() not in VIDEO_EXTENSIONS + AUDIO_EXTENSIONS:
+                    continue
+                if kind == "music" and ext.lower() not in AUDIO_EXTENSIONS:
+                    continue
+                existing = self.get(file_id)
+                if existing and existing["path"] == path and existing["sha256"]:
+                    found += 1
+                    continue
+                self.add(
+                    file_id, path,
+                    kind or asset_kind(name),
+                    filename=name,
+                    sha256=file_content_hash(path) if hash_files else None,
+                )
+                found += 1
+
+        with self._connect() as conn:
+            for row in conn.execute("SELECT file_id, path FROM assets").fetchall():
+                if not os.path.exists(row["path"]):
+                    conn.execute("DELETE FROM assets WHERE file_id = ?", (row["file_id"],))
+        return found
+
+
+if __name__ == "__main__":
+    # python -m backend.app.services.asset_registry rebuild
+    if len(sys.argv) > 1 and sys.argv[1] == "rebuild":
+        count = AssetRegistry().rebuild()
+        print(f"Indexed {count} assets.")
+    else:
+        print("Usage: python -m backend.app.services.asset_registry rebuild")
@@ -0,0 +1,292 @@
+import itertools
+import subprocess
+import tempfile
+import time
+
+import numpy as np
+
+from backend.app.services.ffmpeg_tools import decode_audio_blocks, ffmpeg_exe, probe_streams
+
+# Sample rate of the first (analysis) pass; the envelope only needs loudness, not fidelity
+ENVELOPE_SR = 8000
+# The AAC encode dominates the mix pass; the fast coder halves it at no audible cost for a music bed
+MIX_AUDIO_ARGS = ["-c:a", "aac", "-aac_coder", "fast", "-b:a", "192k"]
+
+
+def _equal_power(head: np.ndarray, tail: np.ndarray) -> np.ndarray:
+    """`tail` fading out into `head` fading in, with constant power across the join."""
+    t = np.linspace(0.0, np.pi / 2, len(head), dtype=np.float32)[:, None]
+    return head * np.sin(t) + tail * np.cos(t)
+
+
+def loop_cycle(music: np.ndarray, xfade: int):
+    """(cycle, period) of `music` looped with an `xfade`-sample crossfade (see AudioMixer._loop_cycle)."""
+    n = len(music)
+    if xfade <= 0:
+        return music, n
+    period = n - xfade
+    cycle = music[:period].copy()
+    cycle[:xfade] = _equal_power(music[:xfade], music[period:])
+    return cycle, period
+
+
+class LoopedMusic:
+    """
+    A music track looped without end, read in order a block at a time. Each pass is decoded again
+    rather than the track being held in memory: output runs `xfade` samples behind the decoder, so the
+    tail is known when the stream ends and is crossfaded into the head kept from the first pass.
+    Tracks shorter than two crossfades are small enough to loop from memory.
+    `length` and `period` (samples) are known once the first pass has been decoded.
+    """
+
+    def __init__(self, path: str, sample_rate: int, channels: int, crossfade: float, block_samples: int = 1 << 16):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.xfade = max(0, int(crossfade * sample_rate))
+        self.block_samples = block_samples
+        self.length = None
+        self.period = None
+        self._blocks = self._passes()
+        self._pending = np.zeros((0, channels), dtype=np.float32)
+
+    def read(self, n: int) -> np.ndarray:
+        """The next `n` samples, shaped (n, channels)."""
+        parts, have = [], 0
+        while have < n:
+            if not len(self._pending):
+                self._pending = next(self._blocks)
+            part = self._pending[:n - have]
+            self._pending = self._pending[len(part):]
+            parts.append(part)
+            have += len(part)
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    def close(self):
+        self._blocks.close()
+
+    def _decode(self, skip: int = 0):
+        for block in decode_audio_blocks(self.path, self.sample_rate, self.block_samples, self.channels):
+            block = block.reshape(len(block), -1)
+            if skip:
+                dropped = min(skip, len(block))
+                block, skip = block[dropped:], skip - dropped
+            if len(block):
+                yield block
+
+    def _passes(self):
+        blocks = self._decode()
+        buffered, size = [], 0
+        for block in blocks:
+            buffered.append(block)
+            size += len(block)
+            if size >= 2 * self.xfade:
+                break
+        else:
+            # The whole track fits in two crossfades
+            music = np.concatenate(buffered)
+            cycle, self.period = loop_cycle(music, min(self.xfade, len(music) // 2))
+            self.length = len(music)
+            yield music[:self.period]
+            while True:
+                yield cycle
+
+        xfade = self.xfade
+        buf = np.concatenate(buffered)
+        head = buf[:xfade].copy()
+        # The head buffer may already hold the whole track: it goes through the same lookahead
+        blocks, buf = itertools.chain([buf], blocks), np.zeros((0, self.channels), dtype=np.float32)
+        decoded = 0
+        while True:
+            for block in blocks:
+                buf = np.concatenate([buf, block]) if len(buf) else block
+                ready = len(buf) - xfade
+                if ready > 0:
+                    decoded += ready
+                    yield buf[:ready]
+                    buf = buf[ready:]
+            if self.length is None:
+                self.length, self.period = decoded + xfade, decoded
+            # buf is the track's tail: fade it into the head, then play the track again past the head
+            if xfade:
+                yield _equal_power(head, buf)
+            blocks, buf = self._decode(skip=xfade), np.zeros((0, self.channels), dtype=np.float32)
+
+
+class AudioMixer:
+    """
+    Background music under a video's own audio, with automatic ducking.
+
+    Pass 1 decodes the original audio at a low rate and measures its RMS envelope every `hop`
+    seconds. Where it is above `threshold_db` (speech, a live sound) the music gain drops by
+    `duck_db`; the curve is held for `hold` seconds and smoothed over `smooth` seconds, so the
+    music dips slightly ahead of speech and does not pump between words. All of this is NumPy on a
+    few floats per hop, so an hour of audio costs milliseconds.
+
+    Pass 2 streams the original audio and the music (see LoopedMusic) at the output rate, the music
+    looped with an equal-power crossfade of `crossfade` seconds instead of a hard repeat and faded
+    out at the end when trimmed, applies the interpolated gain curve and sums both block by block.
+    The mix is piped into ffmpeg, which muxes it with the copied video stream.
+    """
+
+    def __init__(self, music_volume: float = 0.3, duck_db: float = -10.0, threshold_db: float = -40.0,
+                 hop: float = 0.01, hold: float = 0.3, smooth: float = 0.25, crossfade: float = 2.0,
+                 fade_out: float = 1.5, block_seconds: float = 10.0):
+        self.music_volume = music_volume
+        self.duck_db = duck_db
+        self.threshold_db = threshold_db
+        self.hop = hop
+        self.hold = hold
+        self.smooth = smooth
+        self.crossfade = crossfade
+        self.fade_out = fade_out
+        self.block_seconds = block_seconds
+
+    # --- Pass 1: envelope and gain curve ---
+
+    def envelope_db(self, path: str) -> np.ndarray:
+        """RMS level (dBFS) of the first audio stream of `path`, one value per `hop`."""
+        hop = max(1, int(round(self.hop * ENVELOPE_SR)))
+        levels, carry = [], np.zeros(0, dtype=np.float32)
+        for block in decode_audio_blocks(path, ENVELOPE_SR, hop * 1000):
+            buf = np.concatenate([carry, block]) if len(carry) else block
+            n = len(buf) // hop
+            if n:
+                frames = buf[:n * hop].reshape(n, hop)
+                levels.append(np.sqrt(np.mean(frames * frames, axis=1)))
+            carry = buf[n * hop:]
+        if len(carry):
+            levels.append(np.sqrt(np.mean(carry * carry, keepdims=True)))
+        rms = np.concatenate(levels) if levels else np.zeros(0, dtype=np.float32)
+        return 20.0 * np.log10(np.maximum(rms, 1e-6))
+
+    def gain_curve(self, envelope_db: np.ndarray) -> np.ndarray:
+        """Music gain per hop: `music_volume`, ducked by `duck_db` while the original audio is active."""
+        if len(envelope_db) == 0:
+            return np.zeros(0, dtype=np.float32)
+        # Soft knee: fully ducked 6 dB above the threshold
+        active = np.clip((envelope_db - self.threshold_db) / 6.0, 0.0, 1.0)
+
+        # Hold: running maximum over a centred window, so short pauses between words stay ducked
+        hold = max(1, int(round(self.hold / self.hop)))
+        if hold > 1 and len(active) > 1:
+            padded = np.pad(active, (hold // 2, hold - 1 - hold // 2), mode="edge")
+            active = np.lib.stride_tricks.sliding_window_view(padded, hold).max(axis=1)
+
+        # Smooth the edges (a centred Hann window, so the dip starts a little before the sound)
+        width = max(1, int(round(self.smooth / self.hop)))
+        if width > 1 and len(active) > 1:
+            window = np.hanning(width + 2)[1:-1]
+            window /= window.sum()
+            padded = np.pad(active, (width // 2, width - 1 - width // 2), mode="edge")
+            active = np.convolve(padded, window, mode="valid")
+
+        depth = 1.0 - 10.0 ** (self.duck_db / 20.0)
+        return (self.music_volume * (1.0 - depth * active)).astype(np.float32)
+
+    # --- Music looping ---
+
+    def _loop_cycle(self, music: np.ndarray, sample_rate: int):
+        """
+        (cycle, period): what plays on every pass after the first. The head of each repeat is an
+        equal-power crossfade of the track's head with its tail, so the loop point is inaudible.
+        """
+        return loop_cycle(music, min(int(self.crossfade * sample_rate), len(music) // 2))
+
+    def loop_period(self, duration: float) -> float:
+        """Seconds between the starts of two passes of a `duration`-second track (it repeats a crossfade early)."""
+        return duration - min(self.crossfade, duration / 2)
+
+    @staticmethod
+    def music_segment(music: np.ndarray, cycle: np.ndarray, period: int, start: int, end: int) -> np.ndarray:
+        """Samples [start, end) of the endlessly looped music, copied as contiguous runs (one per loop pass)."""
+        out = np.empty((end - start,) + music.shape[1:], dtype=np.float32)
+        pos = start
+        while pos < end:
+            # The first pass plays the track as is, later passes the crossfaded cycle
+            source, offset = (music, pos) if pos < period else (cycle, (pos - period) % period)
+            n = min(end - pos, period - offset)
+            out[pos - start:pos - start + n] = source[offset:offset + n]
+            pos += n
+        return out
+
+    # --- Pass 2: mix ---
+
+    def mix(self, video_path: str, music_path: str, output_path: str, has_audio: bool = True,
+            sample_rate: int = 44100, channels: int = 2) -> dict:
+        """
+        Write `output_path`: the video stream of `video_path` copied, audio = its own audio plus
+        the ducked, looped music. Returns a report (durations, loops, how much of it was ducked, timings).
+        """
+        started = time.perf_counter()
+        if has_audio:
+            gains = self.gain_curve(self.envelope_db(video_path))
+            total = int(round(len(gains) * self.hop * sample_rate))
+        else:
+            gains = np.zeros(0, dtype=np.float32)
+            total = int(round((probe_streams(video_path).get("duration") or 0.0) * sample_rate))
+        if total <= 0:
+            raise ValueError(f"Nothing to mix music under: {video_path}")
+        analysed = time.perf_counter()
+
+        # Fade the music out at the end, unless it happens to end with the video
+        hop_samples = self.hop * sample_rate
+        music_samples = (probe_streams(music_path).get("duration") or 0.0) * sample_rate
+        fade = min(int(self.fade_out * sample_rate), total) if abs(total - music_samples) > hop_samples else 0
+
+        cmd = [ffmpeg_exe(), "-hide_banner", "-nostdin", "-y", "-v", "error",
+               "-i", video_path,
+               "-f", "f32le", "-ar", str(sample_rate), "-ac", str(channels), "-i", "pipe:0",
+               "-map", "0:v:0?", "-map", "1:a:0", "-c:v", "copy"] + MIX_AUDIO_ARGS + \
+              ["-movflags", "+faststart", output_path]
+        with tempfile.TemporaryFile() as err:
+            proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=err)
+            music = LoopedMusic(music_path, sample_rate, channels, self.crossfade)
+            try:
+                written = 0
+                source = decode_audio_blocks(video_path, sample_rate, int(self.block_seconds * sample_rate),
+                                             channels) if has_audio else None
+                while written < total:
+                    if source is not None:
+                        block = next(source, None)
+                        if block is None:
+                            break
+                        block = block.reshape(len(block), -1)[:total - written]
+                    else:
+                        block = np.zeros((min(total - written, int(self.block_seconds * sample_rate)), channels),
+                                         dtype=np.float32)
+                    n = len(block)
+                    positions = np.arange(written, written + n)
+                    if len(gains):
+                        gain = np.interp(positions / hop_samples, np.arange(len(gains)), gains).astype(np.float32)
+                    else:
+                        gain = np.full(n, self.music_volume, dtype=np.float32)
+                    if fade and written + n > total - fade:
+                        gain *= np.clip((total - positions) / fade, 0.0, 1.0)
+                    mixed = block + music.read(n) * gain[:, None]
+                    proc.stdin.write(np.ascontiguousarray(mixed, dtype=np.float32).tobytes())
+                    written += n
+                if source is not None:
+                    source.close()
+                proc.stdin.close()
+            except BaseException:
+                proc.kill()
+                raise
+            finally:
+                music.close()
+                returncode = proc.wait()
+            if returncode != 0:
+                err.seek(0)
+                tail = "\n".join(err.read().decode("utf-8", errors="replace").strip().splitlines()[-5:])
+                raise RuntimeError(f"ffmpeg failed ({returncode}): {tail}")
+
+        duration = written / sample_rate
+        period = music.period or written
+        return {
+            "duration": round(duration, 3),
+            "music_duration": round((music.length or music_samples) / sample_rate, 3),
+            "loops": int(max(0, written - 1) // period) if written > period else 0,
+            "ducked": round(float(np.mean(gains < self.music_volume * 0.99)), 4) if len(gains) else 0.0,
+            "timings": {"analysis": round(analysed - started, 3),
+                        "mix": round(time.perf_counter() - analysed, 3)},
+        }
@@ -1,47 +1,38 @@
 import os
-import shutil
-import uuid
 from fastapi import UploadFile
+from backend.app.services.paths import MUSIC_DIR
+from backend.app.services.upload_service import UploadManager
 
 class AudioService:
-    def __init__(self, upload_dir="backend/uploads/music"):
+    def __init__(self, upload_dir=MUSIC_DIR, uploads: UploadManager = None):
         self.upload_dir = upload_dir
         os.makedirs(upload_dir, exist_ok=True)
+        self.uploads = uploads if uploads is not None else UploadManager(music_dir=upload_dir)
 
-    def save_music(self, file: UploadFile) -> dict:
+    async def save_music(self, file: UploadFile) -> dict:
         """
-        Save an uploaded music file.
+        Save an uploaded music file (streamed to disk, hashed and deduplicated).
         """
-        file_id = str(uuid.uuid4())
-        extension = os.path.splitext(file.filename)[1]
-        if not extension:
-            extension = ".mp3" # Default
-            
-        filename = f"{file_id}{extension}"
-        file_path = os.path.join(self.upload_dir, filename)
-        
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-            
+        saved = await self.uploads.save_upload(file, kind="music")
         return {
-            "id": file_id,
+            "id": saved["file_id"],
             "filename": file.filename,
-            "path": file_path,
-            "url": f"/static/music/{filename}"
+            "path": saved["path"],
+            "url": saved["url"],
+            "deduplicated": saved["deduplicated"]
         }
 
-    def list_music(self) -> list:
+    def list_music(self, limit: int = 1000, offset: int = 0) -> list:
         """
-        List available music tracks.
+        List available music tracks (served from the asset registry).
         """
         tracks = []
-        if os.path.exists(self.upload_dir):
-            for f in os.listdir(self.upload_dir):
-                if f.endswith(('.mp3', '.wav', '.m4a')):
-                    tracks.append({
-                        "id": os.path.splitext(f)[0],
-                        "filename": f,
-                        "path": os.path.join(self.upload_dir, f),
-                        "url": f"/static/music/{f}"
-                    })
+        for item in self.uploads.registry.list(kind="music", limit=limit, offset=offset)["items"]:
+            filename = os.path.basename(item["path"])
+            tracks.append({
+                "id": item["file_id"],
+                "filename": filename,
+                "path": item["path"],
+                "url": f"/static/music/{filename}"
+            })
         return tracks
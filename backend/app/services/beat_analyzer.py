@@ -0,0 +1,151 @@
+import librosa
+import numpy as np
+
+from backend.app.services.ffmpeg_tools import decode_audio_blocks
+
+# Reference analysis resolution: 512-sample hop / 2048-sample window at 22.05 kHz (~23 ms frames).
+# Other sample rates scale both so frame timing stays the same.
+REFERENCE_SR = 22050
+REFERENCE_HOP = 512
+REFERENCE_N_FFT = 2048
+
+
+class BeatAnalyzer:
+    """
+    Whole-track beat, downbeat, onset and energy analysis at bounded memory.
+
+    The audio is decoded in fixed-size blocks (see decode_audio_blocks); each block is turned into
+    mel-spectrum frames, and only per-frame features are kept: spectral-flux onset strength, a
+    low-band flux used for downbeats, and RMS energy (a few floats per ~23 ms frame, so an hour-long
+    mix stays in the low megabytes). Beat tracking then runs on the full onset envelope.
+    `sample_rate` below 22050 (e.g. 11025) trades high-frequency detail for speed.
+    """
+
+    def __init__(self, sample_rate: int = REFERENCE_SR, n_mels: int = 64, block_seconds: float = 10.0,
+                 beats_per_bar: int = 4, energy_rate: float = 10.0):
+        self.sample_rate = int(sample_rate)
+        scale = self.sample_rate / REFERENCE_SR
+        self.hop_length = max(32, int(round(REFERENCE_HOP * scale)))
+        self.n_fft = max(128, int(round(REFERENCE_N_FFT * scale)))
+        self.n_mels = n_mels
+        self.block_samples = max(self.n_fft, int(block_seconds * self.sample_rate))
+        self.beats_per_bar = beats_per_bar
+        self.energy_rate = energy_rate
+
+        self.window = np.hanning(self.n_fft).astype(np.float32)
+        self.mel_basis = librosa.filters.mel(sr=self.sample_rate, n_fft=self.n_fft, n_mels=n_mels).astype(np.float32)
+        # Lowest ~quarter of the mel bands (kick/bass) drives downbeat detection
+        self.low_bands = max(1, n_mels // 4)
+
+    # --- Feature extraction ---
+
+    def features(self, path: str) -> dict:
+        """
+        Per-frame features for the whole file: {"onset", "low_onset", "rms", "frame_times", "duration"}.
+        Frame i covers samples [i*hop, i*hop + n_fft); its time is the window centre.
+        """
+        onset, low_onset, rms = [], [], []
+        carry = np.zeros(0, dtype=np.float32)
+        previous = None  # last log-mel column of the previous block, for flux across block edges
+        total_samples = 0
+
+        for block in decode_audio_blocks(path, self.sample_rate, self.block_samples):
+            total_samples += len(block)
+            buf = np.concatenate([carry, block]) if len(carry) else block
+            n_frames = 1 + (len(buf) - self.n_fft) // self.hop_length if len(buf) >= self.n_fft else 0
+            if n_frames <= 0:
+                carry = buf
+                continue
+
+            frames = librosa.util.frame(buf[:(n_frames - 1) * self.hop_length + self.n_fft],
+                                        frame_length=self.n_fft, hop_length=self.hop_length)
+            spectrum = np.abs(np.fft.rfft(frames * self.window[:, None], axis=0)) ** 2
+            log_mel = np.log10(np.maximum(self.mel_basis @ spectrum, 1e-10)) * 10.0
+
+            stacked = log_mel if previous is None else np.concatenate([previous, log_mel], axis=1)
+            flux = np.maximum(0.0, np.diff(stacked, axis=1))
+            if previous is None:
+                flux = np.concatenate([np.zeros((self.n_mels, 1), dtype=flux.dtype), flux], axis=1)
+            onset.append(flux.mean(axis=0))
+            low_onset.append(flux[:self.low_bands].mean(axis=0))
+            rms.append(np.sqrt(np.mean(frames ** 2, axis=0)))
+
+            previous = log_mel[:, -1:]
+            carry = buf[n_frames * self.hop_length:]
+
+        onset = np.concatenate(onset).astype(np.float32) if onset else np.zeros(0, dtype=np.float32)
+        low_onset = np.concatenate(low_onset).astype(np.float32) if low_onset else np.zeros(0, dtype=np.float32)
+        rms = np.concatenate(rms).astype(np.float32) if rms else np.zeros(0, dtype=np.float32)
+        frame_times = (np.arange(len(onset)) * self.hop_length + self.n_fft / 2) / self.sample_rate
+        return {
+            "onset": onset,
+            "low_onset": low_onset,
+            "rms": rms,
+            "frame_times": frame_times,
+            "duration": total_samples / self.sample_rate,
+        }
+
+    # --- Analysis ---
+
+    def analyze(self, path: str) -> dict:
+        """
+        Returns {"tempo", "beat_times", "downbeat_times", "onset_times", "onset_strengths",
+        "energy_envelope": {"rate", "values"}, "duration", "sample_rate"}.
+        """
+        feats = self.features(path)
+        onset, times = feats["onset"], feats["frame_times"]
+        result = {
+            "tempo": 0.0,
+            "beat_times": [],
+            "downbeat_times": [],
+            "onset_times": [],
+            "onset_strengths": [],
+            "energy_envelope": self._energy_envelope(feats),
+            "duration": feats["duration"],
+            "sample_rate": self.sample_rate,
+        }
+        if len(onset) < 2 or not np.any(onset > 0):
+            return result
+
+        tempo, beat_frames = librosa.beat.beat_track(onset_envelope=onset, sr=self.sample_rate,
+                                                     hop_length=self.hop_length)
+        beat_frames = np.asarray(beat_frames, dtype=int)
+        result["tempo"] = float(np.atleast_1d(tempo)[0])
+        result["beat_times"] = np.round(times[beat_frames], 4).tolist()
+        result["downbeat_times"] = np.round(times[self._downbeats(beat_frames, feats["low_onset"])], 4).tolist()
+
+        peaks = librosa.onset.onset_detect(onset_envelope=onset, sr=self.sample_rate,
+                                           hop_length=self.hop_length, units="frames")
+        peak_max = float(onset.max())
+        result["onset_times"] = np.round(times[peaks], 4).tolist()
+        result["onset_strengths"] = np.round(onset[peaks] / peak_max, 4).tolist()
+        return result
+
+    def _downbeats(self, beat_frames: np.ndarray, low_onset: np.ndarray) -> np.ndarray:
+        """
+        Bar starts, assuming a constant meter of `beats_per_bar`: pick the beat phase whose beats
+        carry the most low-frequency onset energy (kick drums land on the one).
+        """
+        n = self.beats_per_bar
+        if len(beat_frames) < n:
+            return beat_frames[:1]
+        strength = low_onset[beat_frames]
+        phase = int(np.argmax([strength[p::n].mean() for p in range(n)]))
+        return beat_frames[phase::n]
+
+    def _energy_envelope(self, feats: dict) -> dict:
+        """
+        RMS energy averaged into roughly `energy_rate` bins per second, normalised to 0..1.
+        `rate` is the exact number of bins per second; bin i starts at i / rate.
+        """
+        rms = feats["rms"]
+        frames_per_bin = max(1, int(round(self.sample_rate / self.hop_length / self.energy_rate)))
+        rate = self.sample_rate / self.hop_length / frames_per_bin
+        if not len(rms):
+            return {"rate": rate, "values": []}
+        usable = len(rms) - len(rms) % frames_per_bin
+        bins = rms[:usable].reshape(-1, frames_per_bin).mean(axis=1)
+        if usable < len(rms):
+            bins = np.append(bins, rms[usable:].mean())
+        peak = bins.max()
+        return {"rate": rate, "values": np.round(bins / peak if peak > 0 else bins, 4).tolist()}
@@ -0,0 +1,125 @@
+import numpy as np
+
+
+class BeatGrid:
+    """
+    Sorted beat (and bar) times of the music track, for snapping cut points onto the rhythm.
+
+    The music is looped under the video when it is shorter (see AudioMixer), so the grid repeats
+    every `period` seconds as far as it is needed: `duration` for a hard repeat, less when each
+    pass starts with a crossfade over the end of the previous one.
+    """
+
+    def __init__(self, beat_times, downbeat_times=None, duration: float = None, period: float = None):
+        self.beats = np.unique(np.asarray(beat_times, dtype=np.float64))
+        self.downbeats = np.unique(np.asarray(downbeat_times if downbeat_times is not None else [], dtype=np.float64))
+        self.duration = float(duration) if duration else None
+        self.period = float(period) if period else self.duration
+
+    @classmethod
+    def from_analysis(cls, analysis: dict, loop_period=None):
+        """
+        Build from AssetAnalyzer.analyze_audio output. Returns None if it has no beats.
+        `loop_period` maps the track's duration to the spacing of its loops (e.g. AudioMixer.loop_period).
+        """
+        if not analysis or len(analysis.get("beat_times") or []) < 2:
+            return None
+        duration = analysis.get("duration")
+        period = loop_period(duration) if loop_period is not None and duration else None
+        return cls(analysis["beat_times"], analysis.get("downbeat_times"), duration, period)
+
+    @property
+    def beat_length(self) -> float:
+        return float(np.median(np.diff(self.beats)))
+
+    @property
+    def bar_length(self) -> float:
+        if len(self.downbeats) >= 2:
+            return float(np.median(np.diff(self.downbeats)))
+        return 4 * self.beat_length
+
+    def grid(self, unit: str = "beat", until: float = None) -> np.ndarray:
+        """Beat or bar times, repeated over loops of the track until `until` seconds."""
+        base = self.downbeats if unit == "bar" and len(self.downbeats) >= 2 else self.beats
+        if unit == "bar" and base is self.beats:
+            base = self.beats[::4]
+        if until is None or not self.period or until <= self.period:
+            return base
+        # Each pass plays up to the start of the next one
+        base = base[base < self.period]
+        loops = int(np.ceil(until / self.period)) + 1
+        return (base[None, :] + self.period * np.arange(loops)[:, None]).ravel()
+
+    @staticmethod
+    def nearest(grid: np.ndarray, times) -> np.ndarray:
+        """Index of the nearest grid point for every time (vectorized binary search)."""
+        times = np.asarray(times, dtype=np.float64)
+        idx = np.clip(np.searchsorted(grid, times), 1, len(grid) - 1)
+        left, right = grid[idx - 1], grid[idx]
+        return idx - (times - left < right - times)
+
+    def snap_timeline(self, timeline: list, clip_durations: dict = None, unit: str = "auto") -> dict:
+        """
+        Move cut points onto the grid. Cut points are positions on the *output* timeline (the music
+        plays from 0), so each entry's end time in its source is adjusted until the running total
+        of output durations lands on a beat. Every entry keeps at least one grid step, and an entry
+        is never extended past the end of its source (`clip_durations`: clip_id/source_path -> seconds);
+        it is shortened to the previous grid point instead.
+        Mutates `timeline` in place and returns a summary.
+        """
+        if not timeline:
+            return {"unit": unit, "snapped": 0, "max_shift": 0.0}
+        clip_durations = clip_durations or {}
+
+        starts = np.array([float(c.get('start', 0)) for c in timeline])
+        ends = np.array([float(c.get('end', 0)) for c in timeline])
+        speeds = np.array([float(c.get('speed', 1.0) or 1.0) for c in timeline])
+        out_durations = np.maximum(ends - starts, 0.0) / speeds
+        boundaries = np.cumsum(out_durations)
+
+        if unit == "auto":
+            unit = "bar" if np.median(out_durations) >= self.bar_length else "beat"
+        grid = self.grid(unit, until=boundaries[-1] + self.bar_length * 2)
+        grid = grid[grid > 0]
+        if len(grid) < 2:
+            return {"unit": unit, "snapped": 0, "max_shift": 0.0}
+
+        # Nearest grid point per boundary, then force strictly increasing indices so no entry collapses
+        idx = self.nearest(grid, boundaries)
+        steps = np.arange(len(idx))
+        idx = np.maximum.accumulate(idx - steps) + steps
+        idx = np.minimum(idx, len(grid) - 1)
+
+        # Entries cannot run past the end of their source; fall back to the last grid point that fits
+        available = np.full(len(timeline), np.inf)
+        for i, cut in enumerate(timeline):
+            limit = clip_durations.get(cut.get('clip_id'), clip_durations.get(cut.get('source_path')))
+            if limit is not None:
+                available[i] = (float(limit) - starts[i]) / speeds[i]
+
+        snapped = 0
+        max_shift = 0.0
+        position = 0.0
+        for i, cut in enumerate(timeline):
+            target = grid[idx[i]]
+            if target <= position + 1e-6:
+                # An earlier entry was left off-grid or the grid ran out; take the next point
+                following = np.searchsorted(grid, position + 1e-6, side="right")
+                if following >= len(grid):
+                    position += out_durations[i]
+                    continue
+                target = grid[following]
+            if target - position > available[i] + 1e-6:
+                fit = np.searchsorted(grid, position + available[i], side="right") - 1
+                if fit < 0 or grid[fit] <= position + 1e-6:
+                    # Not even one grid step fits: keep the entry as is
+                    position += out_durations[i]
+                    continue
+                target = grid[fit]
+            new_end = starts[i] + (target - position) * speeds[i]
+            max_shift = max(max_shift, abs(target - boundaries[i]))
+            cut['end'] = round(float(new_end), 4)
+            position = target
+            snapped += 1
+
+        return {"unit": unit, "snapped": snapped, "max_shift": round(float(max_shift), 4)}
@@ -1,13 +1,56 @@
+import asyncio
 import json
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 import google.generativeai as genai
+from backend.app.services.audio_mixer import AudioMixer
+from backend.app.services.beat_sync import BeatGrid
+from backend.app.services.edl_schema import EDLValidator
+from backend.app.services.feature_track import best_windows, interest_scores, summarize_track
+from backend.app.services.llm_cache import LLMResponseCache
+
+_director = None
+_director_lock = threading.Lock()
+
+
+def get_director() -> "Director":
+    """Process-wide Director, so styles, the Gemini client and the response cache are set up once."""
+    global _director
+    if _director is None:
+        with _director_lock:
+            if _director is None:
+                _director = Director()
+    return _director
+
 
 class Director:
-    def __init__(self):
+    def __init__(self, model=None, llm_cache: LLMResponseCache = None, llm_timeout: float = None,
+                 hedge_after: float = None, max_concurrent_llm: int = None):
+        """
+        `model` can be any object with generate_content(prompt) -> response.text (e.g. a local stub).
+        LLM calls in generate_edit_script_async give up after `llm_timeout` seconds (DIRECTOR_TIMEOUT, 30),
+        at most `max_concurrent_llm` run at once (DIRECTOR_MAX_CONCURRENCY, 4), and with `hedge_after`
+        (DIRECTOR_HEDGE_AFTER, off by default) the heuristic edit is returned once the LLM misses that budget.
+        """
         self.api_key = os.getenv("GEMINI_API_KEY")
-        self.model = None
-        
-        if self.api_key:
+        self.model = model
+        self.llm_cache = llm_cache if llm_cache is not None else LLMResponseCache()
+        self.llm_timeout = llm_timeout if llm_timeout is not None else float(os.getenv("DIRECTOR_TIMEOUT", "30"))
+        if hedge_after is None and os.getenv("DIRECTOR_HEDGE_AFTER"):
+            hedge_after = float(os.getenv("DIRECTOR_HEDGE_AFTER"))
+        self.hedge_after = hedge_after
+        if max_concurrent_llm is None:
+            max_concurrent_llm = int(os.getenv("DIRECTOR_MAX_CONCURRENCY", "4"))
+        self.llm_slots = threading.BoundedSemaphore(max(1, max_concurrent_llm))
+        # Own threads for blocking model calls: a call that outlives its timeout keeps running here
+        # (and still fills the response cache) without holding up asyncio's default executor
+        self._llm_executor = None
+
+        if self.model is not None:
+            print("✅ AI Director initialized with custom model")
+        elif self.api_key:
             try:
                 genai.configure(api_key=self.api_key)
                 self.model = genai.GenerativeModel('gemini-pro')
@@ -41,21 +84,123 @@ class Director:
             return 'cinematic'
         return 'vlog'
 
-    def generate_edit_script(self, user_prompt: str, assets_metadata: list, reference_style: dict = None) -> dict:
+    def generate_edit_script(self, user_prompt: str, assets_metadata: list, reference_style: dict = None,
+                             music_analysis: dict = None, validator: EDLValidator = None) -> dict:
         """
         Takes user intent and assets, returns an Edit Decision List (EDL).
         Uses Gemini LLM if available, otherwise falls back to vibe-based heuristics.
+        With `music_analysis` (AssetAnalyzer.analyze_audio output) cut points are snapped to the beat.
+        With a `validator` the plan is normalized before the beat sync, and an LLM plan it rejects
+        counts as a failed LLM call.
         """
         detected_vibe = self._analyze_vibe(user_prompt)
         print(f"🎬 Director detected vibe: {detected_vibe}")
 
+        edl = None
         if self.model:
             try:
-                return self._generate_with_llm(user_prompt, assets_metadata, detected_vibe, reference_style)
+                edl = self._validated(self._generate_with_llm(user_prompt, assets_metadata, detected_vibe,
+                                                              reference_style), validator)
             except Exception as e:
                 print(f"❌ LLM Generation failed: {e}. Falling back to heuristic.")
-                
-        return self._generate_heuristic(user_prompt, assets_metadata, detected_vibe)
+
+        if edl is None:
+            edl = self._validated(self._generate_heuristic(user_prompt, assets_metadata, detected_vibe), validator)
+        return self._sync_to_beat(edl, assets_metadata, music_analysis, detected_vibe)
+
+    async def generate_edit_script_async(self, user_prompt: str, assets_metadata: list, reference_style: dict = None,
+                                         music_analysis: dict = None, timeout: float = None,
+                                         hedge_after: float = None, vibe: str = None,
+                                         validator: EDLValidator = None) -> dict:
+        """
+        Like generate_edit_script, but the LLM call is bounded by `timeout` and the concurrency limit,
+        and optionally hedged: the heuristic edit is built in parallel and wins if the LLM has not
+        answered within `hedge_after` seconds. edl["director"] reports which path won and the latency
+        of each path (None for an LLM call that was still running when the edit was returned).
+        `vibe` (a style from styles.json) overrides the one detected from the prompt; `validator` as in
+        generate_edit_script.
+        """
+        timeout = self.llm_timeout if timeout is None else timeout
+        hedge_after = self.hedge_after if hedge_after is None else hedge_after
+        detected_vibe = vibe if vibe in self.styles.get("styles", {}) else self._analyze_vibe(user_prompt)
+        print(f"🎬 Director detected vibe: {detected_vibe}")
+
+        report = {"path": "heuristic", "reason": None, "hedged": False,
+                  "latency": {"llm": None, "heuristic": None}}
+        started = time.perf_counter()
+
+        def heuristic():
+            heuristic_started = time.perf_counter()
+            edl = self._generate_heuristic(user_prompt, assets_metadata, detected_vibe)
+            report["latency"]["heuristic"] = round(time.perf_counter() - heuristic_started, 4)
+            return edl
+
+        edl = None
+        heuristic_task = None
+        if self.model:
+            loop = asyncio.get_running_loop()
+            llm_task = loop.run_in_executor(self._executor(), self._bounded_llm_call,
+                                            user_prompt, assets_metadata, detected_vibe, reference_style, timeout)
+            budget = timeout
+            if hedge_after is not None and hedge_after < timeout:
+                report["hedged"] = True
+                budget = hedge_after
+                heuristic_task = asyncio.ensure_future(asyncio.to_thread(heuristic))
+            try:
+                edl = self._validated(await asyncio.wait_for(asyncio.shield(llm_task), budget), validator)
+                report["path"] = "llm"
+                report["latency"]["llm"] = round(time.perf_counter() - started, 4)
+            except asyncio.TimeoutError:
+                report["reason"] = f"LLM missed the {budget:g}s budget"
+                print(f"⏱️ {report['reason']}. Using heuristic.")
+            except Exception as e:
+                report["reason"] = f"LLM failed: {e}"
+                report["latency"]["llm"] = round(time.perf_counter() - started, 4)
+                print(f"❌ LLM Generation failed: {e}. Falling back to heuristic.")
+
+        if edl is None:
+            edl = self._validated(await heuristic_task if heuristic_task else heuristic(), validator)
+        elif heuristic_task:
+            await heuristic_task
+        edl = self._sync_to_beat(edl, assets_metadata, music_analysis, detected_vibe)
+        edl["director"] = report
+        return edl
+
+    @staticmethod
+    def _validated(edl: dict, validator: EDLValidator = None) -> dict:
+        """Normalized plan (see EDLValidator); raises EDLValidationError if it cannot be rendered."""
+        return validator.normalize(edl) if validator is not None else edl
+
+    def _executor(self) -> ThreadPoolExecutor:
+        if self._llm_executor is None:
+            self._llm_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="director-llm")
+        return self._llm_executor
+
+    def _bounded_llm_call(self, user_prompt: str, assets: list, vibe: str, style_ref: dict, timeout: float) -> dict:
+        """Blocking LLM call holding one of the concurrency slots; waiting for a slot counts against `timeout`."""
+        if not self.llm_slots.acquire(timeout=timeout):
+            raise TimeoutError("LLM concurrency limit reached")
+        try:
+            return self._generate_with_llm(user_prompt, assets, vibe, style_ref)
+        finally:
+            self.llm_slots.release()
+
+    def _sync_to_beat(self, edl: dict, assets: list, music_analysis: dict, vibe: str) -> dict:
+        """Cut-planning stage: snap timeline cut points onto the music's beat (or bar) grid."""
+        grid = BeatGrid.from_analysis(music_analysis, AudioMixer().loop_period)
+        if grid is None or not edl.get("timeline"):
+            return edl
+        durations = {}
+        for a in assets:
+            duration = a.get('metadata', {}).get('duration')
+            if duration:
+                durations[a['file_id']] = duration
+                durations[a['path']] = duration
+        # Slow styles cut on bars, everything else on beats
+        unit = "bar" if vibe == "cinematic" else "beat"
+        edl["beat_sync"] = grid.snap_timeline(edl["timeline"], durations, unit=unit)
+        print(f"🥁 Snapped {edl['beat_sync']['snapped']} cuts to the {unit} grid")
+        return edl
 
     def _generate_with_llm(self, user_prompt: str, assets: list, vibe: str, style_ref: dict) -> dict:
         """Generate EDL using Gemini Pro"""
@@ -65,12 +210,20 @@ class Director:
         # Simplify assets for the prompt to save tokens/complexity
         simplified_assets = []
         for a in assets:
-            simplified_assets.append({
+            simplified = {
                 "id": a['file_id'],
                 "type": a['type'], # video/image
                 "duration": f"{a['metadata'].get('duration', 0):.1f}s",
                 "filename": os.path.basename(a['path'])
-            })
+            }
+            if a.get('features'):
+                # Best windows and a coarse per-second interest curve instead of the raw feature arrays
+                simplified["interest"] = summarize_track(a['features'], a['metadata'].get('duration'),
+                                                         window=style_config.get('pacing', 3.0))
+            if a.get('shots'):
+                # Indexed shots matching the request (see ShotIndex), best first
+                simplified["matching_shots"] = a['shots']
+            simplified_assets.append(simplified)
 
         system_prompt = f"""
         Act as a professional Video Editor Director. Your goal is to create an engaging video edit based on the user's request and the available assets.
@@ -90,6 +243,10 @@ class Director:
         - For 'cinematic', use longer, steady shots (5-8s).
         - Ensure the total duration matches the amount of content provided (don't make it too short if there are many clips).
         - You CAN re-use clips if it fits the style (like a montage).
+        - Assets with "interest" list their most engaging windows ("highlights", scored 0-1 from motion,
+          sharpness, exposure and loudness) and an interest curve over the clip; prefer those moments.
+        - Assets with "matching_shots" contain shots that visually match the request; build the edit
+          around them.
         
         **Output Format (Strict JSON):**
         {{
@@ -101,16 +258,24 @@ class Director:
                     "description": "reason for selection",
                     "transition": "cut" | "cross_dissolve" | "fade_in" | "fade_out",
                     "speed": float (1.0 is normal),
-                    "filter": "none" | "black_white" | "vibrant"
+                    "filter": "none" | "black_white" | "vibrant",
+                    "saturation": float (optional, 1.0 is normal),
+                    "contrast": float (optional, 1.0 is normal),
+                    "brightness": float (optional, 1.0 is normal),
+                    "effect": "zoom_in" (optional, slow Ken Burns push-in)
                 }}
             ],
             "explanation": "Brief explanation of your creative choices."
         }}
         """
         
-        response = self.model.generate_content(system_prompt)
-        cleaned_json = self._clean_json_response(response.text)
-        return cleaned_json
+        def ask_model():
+            response = self.model.generate_content(system_prompt)
+            return self._clean_json_response(response.text)
+
+        # Identical requests (normalized prompt, assets, style) reuse or join the same model call
+        key = self.llm_cache.make_key(user_prompt, vibe, simplified_assets, style_ref)
+        return self.llm_cache.get_or_compute(key, ask_model)
 
     def _clean_json_response(self, text: str) -> dict:
         """Extracts JSON from markdown code blocks if necessary"""
@@ -123,8 +288,35 @@ class Director:
         except Exception as e:
             raise ValueError(f"Failed to parse LLM JSON: {e}")
 
+    @staticmethod
+    def _interest_windows(asset: dict, duration: float, length: float, count: int = 1):
+        """
+        [(start, end)] of the `count` most interesting `length`-second windows of an asset, scored on its
+        per-second feature track (asset["features"], see FeatureExtractor); None without a track.
+        """
+        features = asset.get('features')
+        if not features:
+            return None
+        return [(w["start"], w["end"]) for w in best_windows(interest_scores(features), length, count, duration)]
+
+    @staticmethod
+    def _matching_shot(asset: dict, length: float):
+        """(start, end) of the asset's best shot matching the request (asset["shots"]), at most `length` long."""
+        shots = asset.get('shots')
+        if not shots:
+            return None
+        shot = shots[0]
+        if shot['end'] - shot['start'] <= length:
+            return shot['start'], shot['end']
+        mid = (shot['start'] + shot['end']) / 2
+        return mid - length / 2, mid + length / 2
+
     def _generate_heuristic(self, user_prompt: str, assets: list, vibe: str) -> dict:
-        """Fallback logic if LLM is unavailable"""
+        """
+        Fallback logic if LLM is unavailable. Standard and cinematic edits take an asset's shot matching
+        the request when the shot index found one; assets with a feature track get their most
+        interesting windows; otherwise the opening (or, for cinematic, the middle) of each clip is used.
+        """
         style_config = self.styles.get("styles", {}).get(vibe, {})
         target_clip_len = style_config.get('pacing', 3.0)
         timeline = []
@@ -135,38 +327,49 @@ class Director:
             duration = asset.get('metadata', {}).get('duration', 10)
             
             if vibe == 'hype':
-                # Hype: Fast cuts
+                # Hype: Fast cuts, several per long clip when the feature track says where the action is
                 if duration > target_clip_len:
-                    timeline.append({
-                        "clip_id": asset['file_id'],
-                        "source_path": asset['path'],
-                        "start": 0,
-                        "end": target_clip_len,
-                        "description": "Fast opener",
-                        "speed": 1.2,
-                        "transition": "cut"
-                    })
+                    count = min(3, max(1, int(duration // (target_clip_len * 4))))
+                    windows = self._interest_windows(asset, duration, target_clip_len, count)
+                    for start, end in windows or [(0, target_clip_len)]:
+                        timeline.append({
+                            "clip_id": asset['file_id'],
+                            "source_path": asset['path'],
+                            "start": start,
+                            "end": end,
+                            "description": "High-energy moment" if windows else "Fast opener",
+                            "speed": 1.2,
+                            "transition": "cut"
+                        })
             elif vibe == 'cinematic':
-                # Cinematic: Slow middle cut
+                # Cinematic: Slow cut, from the middle unless the feature track finds a better shot
                 mid = duration / 2
                 half = target_clip_len / 2
+                shot = self._matching_shot(asset, target_clip_len)
+                windows = [shot] if shot else self._interest_windows(asset, duration, target_clip_len)
+                start, end = windows[0] if windows else (max(0, mid - half), min(duration, mid + half))
                 timeline.append({
                     "clip_id": asset['file_id'],
                     "source_path": asset['path'],
-                    "start": max(0, mid - half),
-                    "end": min(duration, mid + half),
-                    "description": "Cinematic center frame",
+                    "start": start,
+                    "end": end,
+                    "description": "Requested shot" if shot else
+                                   "Cinematic best shot" if windows else "Cinematic center frame",
                     "filter": "vibrant",
                     "transition": "cross_dissolve"
                 })
             else:
                 # Standard
+                shot = self._matching_shot(asset, min(duration, target_clip_len))
+                windows = [shot] if shot else self._interest_windows(asset, duration, min(duration, target_clip_len))
+                start, end = windows[0] if windows else (0, min(duration, target_clip_len))
                 timeline.append({
                     "clip_id": asset['file_id'],
                     "source_path": asset['path'],
-                    "start": 0,
-                    "end": min(duration, target_clip_len),
-                    "description": "Standard selection",
+                    "start": start,
+                    "end": end,
+                    "description": "Requested shot" if shot else
+                                   "Most interesting moment" if windows else "Standard selection",
                     "transition": "cut"
                 })
                 
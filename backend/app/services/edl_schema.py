@@ -0,0 +1,148 @@
+import math
+import os
+
+from backend.app.services.render_planner import effect_reasons
+
+# Typed schema of one EDL timeline entry (what the Director prompt asks the LLM for).
+# Numeric fields map to their lower bound and whether it is exclusive; choice fields to the allowed values.
+NUMERIC_FIELDS = {
+    "speed": (0.0, True),
+    "saturation": (0.0, False),
+    "contrast": (0.0, False),
+    "brightness": (0.0, False),
+}
+CHOICE_FIELDS = {
+    "transition": ("cut", "cross_dissolve", "fade_in", "fade_out"),
+    "filter": ("none", "black_white", "vibrant"),
+    "effect": ("zoom_in",),
+}
+
+# Entries shorter than one frame at 25 fps render nothing; they are dropped
+MIN_CUT_SECONDS = 0.04
+# Cuts of one source that meet within this gap are joined into a single entry
+MERGE_GAP = 0.001
+
+
+class EDLValidationError(ValueError):
+    """The EDL cannot be rendered; `errors` lists every problem found, by timeline entry."""
+
+    def __init__(self, errors: list):
+        super().__init__("Invalid EDL: " + "; ".join(errors))
+        self.errors = errors
+
+
+class EDLValidator:
+    """
+    Checks and normalizes EDLs against the asset set they were planned for, before any file is opened:
+    - every entry is resolved to its asset (by clip_id, source path or the filename the LLM was shown)
+      and gets that asset's source_path;
+    - start/end/speed and the colour fields become floats, ranges are clamped to [0, asset duration];
+    - unknown transition/filter/effect values are removed (rendered as plain), with a warning;
+    - entries that end up shorter than MIN_CUT_SECONDS are dropped;
+    - consecutive plain cuts of one source that continue each other are merged.
+    Problems that cannot be repaired (unknown clip, non-numeric or inverted range, bad speed, an empty
+    timeline) raise EDLValidationError. The index is built once, so one validator serves many EDLs.
+
+    `assets`: [{"file_id", "path", "metadata": {"duration"}}] as gathered by the pipeline; None skips
+    the asset checks (entries must then carry their own source_path).
+    """
+
+    def __init__(self, assets: list = None):
+        self.check_assets = assets is not None
+        self._assets = {}
+        for asset in assets or []:
+            duration = (asset.get("metadata") or {}).get("duration")
+            record = (asset["path"], float(duration) if duration else None)
+            for key in (str(asset["file_id"]), asset["path"], os.path.basename(asset["path"])):
+                self._assets.setdefault(key, record)
+
+    def normalize(self, edl: dict) -> dict:
+        """A normalized copy of `edl`; edl["validation"] counts what was clamped, dropped and merged."""
+        timeline = edl.get("timeline") if isinstance(edl, dict) else None
+        if not isinstance(timeline, list):
+            raise EDLValidationError(["timeline must be a list"])
+        errors, warnings = [], []
+        report = {"entries": len(timeline), "clamped": 0, "dropped": 0, "merged": 0}
+        cuts = []
+        for index, entry in enumerate(timeline):
+            cut = self._entry(index, entry, errors, warnings, report)
+            if cut is None:
+                continue
+            previous = cuts[-1] if cuts else None
+            if previous is not None and self._continues(previous, cut):
+                previous["end"] = cut["end"]
+                report["merged"] += 1
+            else:
+                cuts.append(cut)
+        if not errors and not cuts:
+            errors.append("timeline has no renderable entries")
+        if errors:
+            raise EDLValidationError(errors)
+        report["warnings"] = warnings
+        return dict(edl, timeline=cuts, validation=report)
+
+    def _entry(self, index: int, entry, errors: list, warnings: list, report: dict):
+        if not isinstance(entry, dict):
+            errors.append(f"entry {index} is not an object")
+            return None
+        path, duration = self._resolve(entry)
+        if path is None:
+            errors.append(f"entry {index} has an unknown clip_id {entry.get('clip_id')!r}"
+                          if self.check_assets else f"entry {index} has no source_path")
+            return None
+        try:
+            start, end = float(entry["start"]), float(entry["end"])
+        except (KeyError, TypeError, ValueError):
+            errors.append(f"entry {index} needs numeric start and end")
+            return None
+        if not (math.isfinite(start) and math.isfinite(end)) or end < start:
+            errors.append(f"entry {index} has an invalid range {start:g} - {end:g}")
+            return None
+
+        cut = dict(entry, source_path=path, start=start, end=end)
+        if "clip_id" in cut:
+            cut["clip_id"] = str(cut["clip_id"])
+        for field, (bound, exclusive) in NUMERIC_FIELDS.items():
+            if cut.get(field) is None:
+                cut.pop(field, None)
+                continue
+            try:
+                value = float(cut[field])
+            except (TypeError, ValueError):
+                value = math.nan
+            if not math.isfinite(value) or value < bound or (exclusive and value == bound):
+                errors.append(f"entry {index} has an invalid {field} {cut[field]!r}")
+                return None
+            cut[field] = value
+        for field, allowed in CHOICE_FIELDS.items():
+            if field in cut and cut[field] is not None and cut[field] not in allowed:
+                warnings.append(f"entry {index}: unknown {field} {cut.pop(field)!r} ignored")
+
+        clamped_start = max(0.0, start)
+        clamped_end = min(end, duration) if duration else end
+        if (clamped_start, clamped_end) != (start, end):
+            cut["start"], cut["end"] = clamped_start, clamped_end
+            report["clamped"] += 1
+        if cut["end"] - cut["start"] < MIN_CUT_SECONDS:
+            report["dropped"] += 1
+            return None
+        return cut
+
+    def _resolve(self, entry: dict):
+        """(source path, duration or None) of an entry; (None, None) when it names no known asset."""
+        path = entry.get("source_path")
+        if not self.check_assets:
+            return (path, None) if path else (None, None)
+        clip_id = entry.get("clip_id")
+        for key in (str(clip_id) if clip_id is not None else None, path):
+            if key is not None and key in self._assets:
+                return self._assets[key]
+        return None, None
+
+    @staticmethod
+    def _continues(previous: dict, cut: dict) -> bool:
+        """`cut` picks up its source where `previous` stopped, and neither is more than a plain cut."""
+        return (cut["source_path"] == previous["source_path"]
+                and abs(cut["start"] - previous["end"]) <= MERGE_GAP
+                and cut.get("transition") in (None, "cut")
+                and not effect_reasons(previous) and not effect_reasons(cut))
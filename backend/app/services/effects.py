@@ -0,0 +1,109 @@
+import cv2
+import numpy as np
+
+# Rec. 601 luma weights (RGB order, as MoviePy delivers frames)
+LUMA = np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+# Named looks used by the Director / LLM EDLs
+FILTER_PRESETS = {
+    "vibrant": {"saturation": 1.3, "contrast": 1.1},
+    "black_white": {"black_white": True},
+}
+
+
+def color_matrix(saturation: float = 1.0, contrast: float = 1.0, brightness: float = 1.0,
+                 black_white: bool = False) -> np.ndarray:
+    """
+    3x4 affine colour matrix equivalent to, in order:
+    saturation around luma (0 = grey, B&W forces 0), contrast around mid-grey (128), brightness gain.
+    All three are linear, so any combination folds into one matrix applied in a single pass.
+    """
+    s = 0.0 if black_white else float(saturation)
+    # Saturation: out = Y + s * (C - Y) = s*C + (1-s)*Y
+    m = (1.0 - s) * np.tile(LUMA, (3, 1)) + s * np.eye(3, dtype=np.float32)
+    # Contrast, then brightness: out = b * (c * (x - 128) + 128)
+    c, b = float(contrast), float(brightness)
+    m = b * c * m
+    offset = np.full((3, 1), b * 128.0 * (1.0 - c), dtype=np.float32)
+    return np.hstack([m, offset]).astype(np.float32)
+
+
+class FramePipeline:
+    """
+    Fused per-frame effects for one timeline entry: geometry (Ken Burns centre zoom and the fit to the
+    output size) as one crop-and-resize, then the colour grade (saturation, contrast, brightness,
+    black & white) as one cv2.transform with a precomputed matrix. Both write into buffers allocated
+    once per clip, so stacking effects costs about the same as applying one.
+
+    `fit` decides how a source with another aspect ratio meets `output_size`: "pad" letterboxes,
+    "crop" fills the frame (e.g. landscape footage in a vertical short).
+    The returned frame is reused on the next call; callers that keep frames must copy them.
+    """
+
+    def __init__(self, size, saturation: float = 1.0, contrast: float = 1.0, brightness: float = 1.0,
+                 black_white: bool = False, zoom_rate: float = 0.0, max_zoom: float = 1.5,
+                 output_size=None, fit: str = "pad"):
+        self.source_width, self.source_height = int(size[0]), int(size[1])
+        self.width, self.height = (int(output_size[0]), int(output_size[1])) if output_size else \
+            (self.source_width, self.source_height)
+        self.zoom_rate = float(zoom_rate)
+        self.max_zoom = float(max_zoom)
+        self.resizes = (self.width, self.height) != (self.source_width, self.source_height)
+        self.has_color = black_white or (saturation, contrast, brightness) != (1.0, 1.0, 1.0)
+        self.matrix = color_matrix(saturation, contrast, brightness, black_white) if self.has_color else None
+
+        self._crop, self._target = self._fit_rects(fit)
+        self._fitted = np.zeros((self.height, self.width, 3), dtype=np.uint8)  # padding stays black
+        tw, th = self._target[2], self._target[3]
+        self._scaled = self._fitted if (tw, th) == (self.width, self.height) else np.empty((th, tw, 3), dtype=np.uint8)
+        self._graded = np.empty((self.height, self.width, 3), dtype=np.uint8)
+
+    def _fit_rects(self, fit: str):
+        """(source crop rect, destination rect) as (x, y, w, h) before any zoom."""
+        sw, sh, ow, oh = self.source_width, self.source_height, self.width, self.height
+        if fit == "crop":
+            # Largest centred source region with the output aspect ratio
+            cw, ch = (sw, max(1, round(sw * oh / ow))) if sw * oh <= sh * ow else (max(1, round(sh * ow / oh)), sh)
+            return ((sw - cw) // 2, (sh - ch) // 2, cw, ch), (0, 0, ow, oh)
+        # Letterbox: whole source scaled to fit inside the output
+        scale = min(ow / sw, oh / sh)
+        tw, th = max(1, round(sw * scale)), max(1, round(sh * scale))
+        return (0, 0, sw, sh), ((ow - tw) // 2, (oh - th) // 2, tw, th)
+
+    @classmethod
+    def from_cut(cls, cut: dict, size, output_size=None, fit: str = "pad"):
+        """Pipeline for an EDL entry's effect fields; None when frames pass through unchanged."""
+        params = dict(FILTER_PRESETS.get(cut.get('filter'), {}))
+        for key in ('saturation', 'contrast', 'brightness'):
+            if cut.get(key) is not None:
+                params[key] = float(cut[key])
+        if cut.get('effect') == 'zoom_in':
+            params['zoom_rate'] = 0.1  # 10% per second
+        pipeline = cls(size, output_size=output_size, fit=fit, **params)
+        return pipeline if pipeline.active else None
+
+    @property
+    def active(self) -> bool:
+        return self.has_color or self.resizes or self.zoom_rate != 0.0
+
+    def zoom_at(self, t: float) -> float:
+        return min(self.max_zoom, 1.0 + self.zoom_rate * max(0.0, t))
+
+    def apply(self, frame: np.ndarray, t: float = 0.0) -> np.ndarray:
+        out = frame
+        z = self.zoom_at(t) if self.zoom_rate else 1.0
+        if self.resizes or z != 1.0:
+            # Centre crop (fit region shrunk by the zoom), scaled once to the destination rect
+            x, y, w, h = self._crop
+            cw, ch = max(1, int(round(w / z))), max(1, int(round(h / z)))
+            x0, y0 = x + (w - cw) // 2, y + (h - ch) // 2
+            tx, ty, tw, th = self._target
+            cv2.resize(out[y0:y0 + ch, x0:x0 + cw], (tw, th), dst=self._scaled, interpolation=cv2.INTER_AREA
+                       if cw > tw else cv2.INTER_LINEAR)
+            if self._scaled is not self._fitted:
+                self._fitted[ty:ty + th, tx:tx + tw] = self._scaled
+            out = self._fitted
+        if self.has_color:
+            cv2.transform(out, self.matrix, dst=self._graded)
+            out = self._graded
+        return out
@@ -0,0 +1,132 @@
+import numpy as np
+
+from backend.app.services.ffmpeg_tools import decode_audio_blocks, decode_video_frames
+
+# Weights of the normalized features in the interest score; exposure rewards mid-grey brightness
+INTEREST_WEIGHTS = {"motion": 0.4, "sharpness": 0.3, "audio_rms": 0.2, "exposure": 0.1}
+# Mean grey-level change per sample above which a sample pair is a picture change (cut, flash), not motion
+MAX_MOTION = 0.12
+
+
+class FeatureExtractor:
+    """
+    Per-second feature track of a video: motion energy (mean grey-level change between samples),
+    sharpness (Laplacian variance), brightness (mean grey level, 0-1) and audio RMS.
+
+    Video is one downsampled decode (`sample_fps` thumbnails `analysis_width` pixels wide, see
+    decode_video_frames) and audio one low-rate mono decode, both streamed in blocks and scored in
+    NumPy, so a long clip never sits in memory. extract() returns {feature: float32 array}, one value
+    per started second; the arrays are small enough to cache per file (AssetAnalyzer.get_feature_track).
+    """
+
+    def __init__(self, sample_fps: float = 4.0, analysis_width: int = 96, audio_rate: int = 8000,
+                 block_frames: int = 128):
+        self.sample_fps = sample_fps
+        self.analysis_width = analysis_width
+        self.audio_rate = audio_rate
+        self.block_frames = block_frames
+
+    def extract(self, video_path: str) -> dict:
+        times, motion, sharpness, brightness = [], [], [], []
+        prev = None
+        for block_times, frames in decode_video_frames(video_path, self.sample_fps, self.analysis_width,
+                                                       self.block_frames):
+            gray = frames.astype(np.float32) @ np.array([0.114, 0.587, 0.299], dtype=np.float32)  # BGR
+            lap = (4.0 * gray[:, 1:-1, 1:-1] - gray[:, :-2, 1:-1] - gray[:, 2:, 1:-1]
+                   - gray[:, 1:-1, :-2] - gray[:, 1:-1, 2:])
+            sharpness.append(lap.var(axis=(1, 2)))
+            brightness.append(gray.mean(axis=(1, 2)) / 255.0)
+            # Pair the first sample of this block with the last one of the previous block
+            paired = gray if prev is None else np.concatenate([prev[None], gray])
+            change = np.abs(paired[1:] - paired[:-1]).mean(axis=(1, 2)) / 255.0
+            motion.append(np.concatenate([[0.0], change]) if prev is None else change)
+            times.append(block_times)
+            prev = gray[-1]
+
+        times = np.concatenate(times)
+        seconds = int(np.floor(times[-1])) + 1
+        index = np.minimum(times.astype(np.int64), seconds - 1)
+        track = {
+            "motion": self._per_second(index, np.minimum(np.concatenate(motion), MAX_MOTION), seconds),
+            "sharpness": self._per_second(index, np.concatenate(sharpness), seconds),
+            "brightness": self._per_second(index, np.concatenate(brightness), seconds),
+            "audio_rms": self._audio_rms(video_path, seconds),
+        }
+        return {name: values.astype(np.float32) for name, values in track.items()}
+
+    @staticmethod
+    def _per_second(index: np.ndarray, values: np.ndarray, seconds: int) -> np.ndarray:
+        counts = np.bincount(index, minlength=seconds)
+        sums = np.bincount(index, weights=values, minlength=seconds)
+        return np.divide(sums, counts, out=np.zeros(seconds), where=counts > 0)
+
+    def _audio_rms(self, video_path: str, seconds: int) -> np.ndarray:
+        """RMS per second of the first audio stream; zeros for a silent (audio-less) clip."""
+        squares = np.zeros(seconds)
+        counts = np.zeros(seconds)
+        offset = 0
+        try:
+            for block in decode_audio_blocks(video_path, sample_rate=self.audio_rate):
+                index = np.minimum((offset + np.arange(len(block))) // self.audio_rate, seconds - 1)
+                squares += np.bincount(index, weights=block.astype(np.float64) ** 2, minlength=seconds)
+                counts += np.bincount(index, minlength=seconds)
+                offset += len(block)
+        except ValueError:
+            return squares  # No audio stream
+        return np.sqrt(np.divide(squares, counts, out=np.zeros(seconds), where=counts > 0))
+
+
+def interest_scores(track: dict) -> np.ndarray:
+    """
+    Per-second interest in [0, 1]: weighted motion, sharpness, loudness (each relative to the clip's
+    own 95th percentile, so a clip is compared with itself) and exposure (1 at mid-grey, 0 at black/white).
+    """
+    score = np.zeros(len(track["motion"]), dtype=np.float32)
+    for name in ("motion", "sharpness", "audio_rms"):
+        values = np.asarray(track[name], dtype=np.float32)
+        scale = float(np.percentile(values, 95)) if len(values) else 0.0
+        if scale > 0:
+            score += INTEREST_WEIGHTS[name] * np.minimum(values / scale, 1.0)
+    exposure = 1.0 - np.minimum(np.abs(np.asarray(track["brightness"], dtype=np.float32) - 0.5) * 2.0, 1.0)
+    return score + INTEREST_WEIGHTS["exposure"] * exposure
+
+
+def best_windows(scores: np.ndarray, length: float, count: int = 1, duration: float = None) -> list:
+    """
+    The `count` highest-scoring non-overlapping windows of `length` seconds, in time order, as
+    [{"start", "end", "score"}] (score = mean interest over the window). Windows start on whole
+    seconds; `duration` (default: the track length) bounds their end.
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    duration = float(duration if duration is not None else len(scores))
+    width = max(1, int(round(length)))
+    if len(scores) <= width:
+        mean = float(scores.mean()) if len(scores) else 0.0
+        return [{"start": 0.0, "end": round(float(min(length, duration)), 3), "score": round(mean, 3)}]
+
+    # Mean of every window at once from one cumulative sum
+    sums = np.cumsum(np.concatenate([[0.0], scores]))
+    means = (sums[width:] - sums[:-width]) / width
+    chosen = []
+    for start in np.argsort(-means, kind="stable"):
+        if all(abs(start - other) >= width for other in chosen):
+            chosen.append(int(start))
+            if len(chosen) == count:
+                break
+    return [{"start": float(s), "end": round(float(min(s + length, duration)), 3), "score": round(float(means[s]), 3)}
+            for s in sorted(chosen)]
+
+
+def summarize_track(track: dict, duration: float = None, window: float = 3.0, highlights: int = 3,
+                    points: int = 12) -> dict:
+    """
+    Compact view of a feature track for the LLM prompt: the best `highlights` windows and the
+    interest curve averaged down to at most `points` values.
+    """
+    scores = interest_scores(track)
+    parts = np.array_split(scores, min(points, len(scores)) or 1)
+    curve = [round(float(part.mean()), 2) for part in parts if len(part)]
+    return {
+        "highlights": best_windows(scores, min(window, len(scores)), highlights, duration),
+        "interest_curve": curve,
+    }
@@ -0,0 +1,287 @@
+import json
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+
+
+def ffmpeg_exe() -> str:
+    """System ffmpeg if on PATH, otherwise the binary bundled with imageio-ffmpeg (a MoviePy dependency)."""
+    exe = shutil.which("ffmpeg")
+    if exe:
+        return exe
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except Exception:
+        return "ffmpeg"
+
+
+def run_ffmpeg(args: list, on_progress=None, duration: float = None) -> str:
+    """
+    Run ffmpeg with the given arguments, returning stderr. Raises RuntimeError on failure.
+    With `on_progress`, ffmpeg's `-progress` stream is parsed and on_progress(info) is called per update:
+    info = {"frames", "bytes", "out_seconds", "fraction"} (fraction of `duration`, None without one).
+    """
+    cmd = [ffmpeg_exe(), "-hide_banner", "-nostdin", "-y"]
+    if on_progress is None:
+        proc = subprocess.run(cmd + [str(a) for a in args], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        stderr = proc.stderr.decode("utf-8", errors="replace")
+        returncode = proc.returncode
+    else:
+        cmd += ["-progress", "pipe:1", "-nostats"] + [str(a) for a in args]
+        # stderr goes to a file: a full stderr pipe would stall ffmpeg while we read stdout
+        with tempfile.TemporaryFile() as err:
+            proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=err)
+            try:
+                _read_progress(proc.stdout, on_progress, duration)
+            except BaseException:
+                # The callback aborted (e.g. the job was cancelled): stop encoding too
+                proc.kill()
+                raise
+            finally:
+                proc.stdout.close()
+                returncode = proc.wait()
+            err.seek(0)
+            stderr = err.read().decode("utf-8", errors="replace")
+    if returncode != 0:
+        tail = "\n".join(stderr.strip().splitlines()[-5:])
+        raise RuntimeError(f"ffmpeg failed ({returncode}): {tail}")
+    return stderr
+
+
+def _read_progress(stream, on_progress, duration: float = None):
+    """Parse `-progress` key=value blocks; each block ends with a `progress=continue|end` line."""
+    block = {}
+    for raw in stream:
+        key, _, value = raw.decode("utf-8", errors="replace").strip().partition("=")
+        if key != "progress":
+            block[key] = value
+            continue
+        # out_time_ms is in microseconds too (an old ffmpeg quirk); both are "N/A" before the first packet
+        out_seconds = max(0, _as_int(block.get("out_time_us") or block.get("out_time_ms"))) / 1e6
+        fraction = None
+        if duration:
+            fraction = 1.0 if value == "end" else min(1.0, out_seconds / duration)
+        on_progress({
+            "frames": _as_int(block.get("frame")),
+            "bytes": _as_int(block.get("total_size")),
+            "out_seconds": out_seconds,
+            "fraction": fraction,
+        })
+        block = {}
+
+
+def _as_int(value) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+def probe_streams(path: str) -> dict:
+    """
+    Stream parameters relevant to lossless concatenation:
+    {"duration", "video": {"codec", "width", "height", "fps", "pix_fmt"}, "audio": {"codec", "sample_rate", "channels"} | None}
+    Uses ffprobe when available, otherwise parses `ffmpeg -i` output.
+    """
+    ffprobe = shutil.which("ffprobe")
+    if ffprobe:
+        return _probe_with_ffprobe(ffprobe, path)
+    return _probe_with_ffmpeg(path)
+
+
+def _probe_with_ffprobe(ffprobe: str, path: str) -> dict:
+    proc = subprocess.run(
+        [ffprobe, "-v", "error", "-print_format", "json", "-show_streams", "-show_format", path],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+    )
+    if proc.returncode != 0:
+        raise ValueError(f"Could not probe file: {path}")
+    data = json.loads(proc.stdout or b"{}")
+
+    info = {"duration": float(data.get("format", {}).get("duration", 0) or 0), "video": None, "audio": None}
+    for stream in data.get("streams", []):
+        if stream.get("codec_type") == "video" and info["video"] is None:
+            num, _, den = stream.get("avg_frame_rate", "0/1").partition("/")
+            fps = float(num) / float(den) if den and float(den) else 0.0
+            info["video"] = {
+                "codec": stream.get("codec_name"),
+                "width": int(stream.get("width", 0)),
+                "height": int(stream.get("height", 0)),
+                "fps": round(fps, 3),
+                "pix_fmt": stream.get("pix_fmt"),
+            }
+        elif stream.get("codec_type") == "audio" and info["audio"] is None:
+            info["audio"] = {
+                "codec": stream.get("codec_name"),
+                "sample_rate": int(stream.get("sample_rate", 0)),
+                "channels": int(stream.get("channels", 0)),
+            }
+    return info
+
+
+_CHANNEL_LAYOUTS = {"mono": 1, "stereo": 2, "2.1": 3, "quad": 4, "5.0": 5, "5.1": 6, "7.1": 8}
+
+
+def _probe_with_ffmpeg(path: str) -> dict:
+    proc = subprocess.run([ffmpeg_exe(), "-hide_banner", "-nostdin", "-i", path],
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    text = proc.stderr.decode("utf-8", errors="replace")
+    if "Stream #" not in text:
+        raise ValueError(f"Could not probe file: {path}")
+
+    info = {"duration": 0.0, "video": None, "audio": None}
+    m = re.search(r"Duration: (\d+):(\d+):([\d.]+)", text)
+    if m:
+        info["duration"] = int(m.group(1)) * 3600 + int(m.group(2)) * 60 + float(m.group(3))
+
+    for line in text.splitlines():
+        line = line.strip()
+        if not line.startswith("Stream #"):
+            continue
+        if ": Video: " in line and info["video"] is None:
+            # Strip parenthesised details so commas inside them don't split fields
+            desc = re.sub(r"\([^()]*\)", "", line.split(": Video: ", 1)[1])
+            fields = [f.strip() for f in desc.split(",")]
+            size = re.search(r"(\d{2,5})x(\d{2,5})", desc)
+            fps = re.search(r"([\d.]+) fps", desc)
+            info["video"] = {
+                "codec": fields[0].split()[0],
+                "width": int(size.group(1)) if size else 0,
+                "height": int(size.group(2)) if size else 0,
+                "fps": round(float(fps.group(1)), 3) if fps else 0.0,
+                "pix_fmt": fields[1].split()[0] if len(fields) > 1 else None,
+            }
+        elif ": Audio: " in line and info["audio"] is None:
+            desc = re.sub(r"\([^()]*\)", "", line.split(": Audio: ", 1)[1])
+            fields = [f.strip() for f in desc.split(",")]
+            rate = re.search(r"(\d+) Hz", desc)
+            layout = fields[2].split()[0] if len(fields) > 2 else ""
+            channels = _CHANNEL_LAYOUTS.get(layout)
+            if channels is None:
+                m = re.match(r"(\d+) channels", fields[2]) if len(fields) > 2 else None
+                channels = int(m.group(1)) if m else 0
+            info["audio"] = {
+                "codec": fields[0].split()[0],
+                "sample_rate": int(rate.group(1)) if rate else 0,
+                "channels": channels,
+            }
+    return info
+
+
+def keyframe_times(path: str) -> list:
+    """Presentation times (seconds) of the video keyframes. Only keyframes are decoded."""
+    stderr = run_ffmpeg(["-skip_frame", "nokey", "-i", path, "-map", "0:v:0", "-vf", "showinfo", "-f", "null", "-"])
+    return sorted({float(t) for t in re.findall(r"pts_time:(-?[\d.]+)", stderr)})
+
+
+def concat_copy(part_paths: list, output_path: str, work_dir: str, video_codec: str = "h264"):
+    """
+    Join MP4 parts with identical stream parameters through the concat demuxer, without re-encoding.
+    Parts may come from different H.264 encoders (stream-copied source vs. re-encoded effects),
+    so parameter sets are repeated in-band at every keyframe instead of relying on the first part's header.
+    """
+    list_path = os.path.join(work_dir, "concat.txt")
+    with open(list_path, "w") as f:
+        for part in part_paths:
+            escaped = os.path.abspath(part).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+
+    args = ["-f", "concat", "-safe", "0", "-i", list_path, "-c", "copy"]
+    if video_codec == "h264":
+        args += ["-bsf:v", "h264_mp4toannexb"]
+    args += ["-movflags", "+faststart", output_path]
+    run_ffmpeg(args)
+
+
+def decode_audio_blocks(path: str, sample_rate: int = 22050, block_samples: int = 65536, channels: int = 1):
+    """
+    Decode the first audio stream to float32 at `sample_rate` and yield it in blocks of
+    `block_samples` (the last one may be shorter): 1-D for mono, (n, channels) otherwise. ffmpeg streams
+    through a pipe, so memory stays bounded by one block regardless of the track length.
+    Raises ValueError if nothing could be decoded.
+    """
+    import numpy as np
+
+    cmd = [ffmpeg_exe(), "-hide_banner", "-nostdin", "-v", "error", "-i", path,
+           "-map", "0:a:0", "-vn", "-ac", str(int(channels)), "-ar", str(int(sample_rate)), "-f", "f32le", "-"]
+    frame_bytes = 4 * channels
+    block_bytes = block_samples * frame_bytes
+    produced = False
+    # Damaged streams log an error per packet; a stderr pipe nobody drains would fill up and stall ffmpeg
+    with tempfile.TemporaryFile() as err:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=err)
+        try:
+            while True:
+                data = proc.stdout.read(block_bytes)
+                if not data:
+                    break
+                usable = len(data) - len(data) % frame_bytes
+                if usable:
+                    produced = True
+                    block = np.frombuffer(data[:usable], dtype=np.float32)
+                    yield block if channels == 1 else block.reshape(-1, channels)
+        finally:
+            proc.stdout.close()
+            if proc.poll() is None:
+                # Consumer stopped early
+                proc.kill()
+            proc.wait()
+            err.seek(0)
+            stderr = err.read().decode("utf-8", errors="replace")
+    if not produced:
+        tail = "\n".join(stderr.strip().splitlines()[-3:])
+        raise ValueError(f"Could not decode audio from {path}: {tail}")
+
+
+def decode_video_frames(path: str, sample_fps: float = 4.0, width: int = 160, block_frames: int = 128,
+                        fast: bool = True):
+    """
+    Decode the first video stream at `sample_fps`, scaled to `width` pixels wide (height keeps the
+    aspect ratio, rounded to even), as BGR uint8. Yields (times, frames) blocks of up to
+    `block_frames` samples, frames shaped (n, h, w, 3); memory stays bounded by one block.
+    `fast` makes the decoder skip non-reference B-frames and the deblocking filter: samples land
+    on the nearest decoded frame instead, which is plenty for analysis and roughly halves decode time.
+    Raises ValueError if nothing could be decoded.
+    """
+    import numpy as np
+
+    video = probe_streams(path).get("video")
+    if not video or not video["width"] or not video["height"]:
+        raise ValueError(f"No video stream in {path}")
+    height = max(2, int(round(width * video["height"] / video["width"] / 2)) * 2)
+
+    cmd = [ffmpeg_exe(), "-hide_banner", "-nostdin", "-v", "error"]
+    if fast:
+        cmd += ["-skip_frame", "bidir", "-skip_loop_filter", "all"]
+    cmd += ["-i", path, "-map", "0:v:0", "-an", "-sn",
+            "-vf", f"fps={sample_fps},scale={width}:{height}:flags=area",
+            "-f", "rawvideo", "-pix_fmt", "bgr24", "-"]
+    frame_bytes = width * height * 3
+    produced = 0
+    # The fast decode logs a warning per skipped reference; keep stderr out of a pipe that could fill up
+    with tempfile.TemporaryFile() as err:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=err)
+        try:
+            while True:
+                data = proc.stdout.read(frame_bytes * block_frames)
+                n = len(data) // frame_bytes
+                if n == 0:
+                    break
+                frames = np.frombuffer(data[:n * frame_bytes], dtype=np.uint8).reshape(n, height, width, 3)
+                times = (produced + np.arange(n)) / float(sample_fps)
+                produced += n
+                yield times, frames
+        finally:
+            proc.stdout.close()
+            if proc.poll() is None:
+                # Consumer stopped early
+                proc.kill()
+            proc.wait()
+            err.seek(0)
+            stderr = err.read().decode("utf-8", errors="replace")
+    if not produced:
+        tail = "\n".join(stderr.strip().splitlines()[-3:])
+        raise ValueError(f"Could not decode video from {path}: {tail}")
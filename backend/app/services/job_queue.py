@@ -0,0 +1,321 @@
+import asyncio
+import json
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from backend.app.services.paths import JOBS_DIR
+from backend.app.services.telemetry import MetricsRegistry
+from backend.app.services.warmup import warm_worker
+
+
+class JobCancelled(Exception):
+    """Raised inside a worker when the job it is running has been cancelled."""
+
+
+class JobContext:
+    """
+    Handle passed to a job function running in a worker process.
+    Progress and cancellation are exchanged through small files in the
+    job state directory, so nothing here needs a live connection to the API process.
+    """
+
+    def __init__(self, job_id: str, state_dir: str):
+        self.job_id = job_id
+        self.state_dir = state_dir
+        self._last_write = 0.0
+
+    @property
+    def progress_path(self) -> str:
+        return os.path.join(self.state_dir, f"{self.job_id}.progress.json")
+
+    @property
+    def cancel_path(self) -> str:
+        return os.path.join(self.state_dir, f"{self.job_id}.cancel")
+
+    def is_cancelled(self) -> bool:
+        return os.path.exists(self.cancel_path)
+
+    def report(self, progress: float, stage: str = None, force: bool = False):
+        """
+        Record progress (0.0 - 1.0) for the current stage.
+        Raises JobCancelled if the job was cancelled, so this doubles as a cancellation checkpoint.
+        """
+        if self.is_cancelled():
+            raise JobCancelled(f"Job {self.job_id} was cancelled")
+
+        now = time.monotonic()
+        # Encoders call this per frame; throttle disk writes
+        if not force and now - self._last_write < 0.25:
+            return
+        self._last_write = now
+
+        tmp_path = self.progress_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"progress": round(min(max(progress, 0.0), 1.0), 4), "stage": stage}, f)
+        os.replace(tmp_path, self.progress_path)
+
+    def read(self) -> dict:
+        try:
+            with open(self.progress_path, "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def cleanup(self):
+        for path in (self.progress_path, self.cancel_path):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def _run_job(fn, payload, ctx: JobContext):
+    """Worker-side trampoline: marks the job as started before running it."""
+    ctx.report(0.0, "starting", force=True)
+    return fn(payload, ctx)
+
+
+class JobManager:
+    """
+    Runs long jobs (renders) in a bounded process pool so the API event loop stays free.
+    Concurrency defaults to RENDER_CONCURRENCY (or 2).
+    Finished jobs (with the timing trace their function returned as result["trace"], or attached to
+    the exception) are folded into `metrics` for the /metrics endpoint.
+    Workers are long-lived; with `warm_modules` each one imports those modules as it starts
+    (see warmup.warm_worker), and warm_up() starts all of them ahead of the first job.
+    A worker that dies (crash, OOM kill) breaks the whole pool; the next submit starts a fresh one.
+    Finished jobs stay queryable for JOB_TTL seconds (default 3600), at most `max_finished` of them.
+    """
+
+    JOB_STATUSES = ("queued", "running", "cancelling", "completed", "failed", "cancelled")
+
+    def __init__(self, max_workers: int = None, state_dir: str = JOBS_DIR, metrics: MetricsRegistry = None,
+                 warm_modules: tuple = None, finished_ttl: float = None, max_finished: int = 500):
+        if max_workers is None:
+            max_workers = int(os.getenv("RENDER_CONCURRENCY", "2"))
+        self.max_workers = max(1, max_workers)
+        self.state_dir = state_dir
+        os.makedirs(state_dir, exist_ok=True)
+
+        self.jobs = {}
+        if finished_ttl is None:
+            finished_ttl = float(os.getenv("JOB_TTL", "3600"))
+        self.finished_ttl = finished_ttl
+        self.max_finished = max_finished
+        self.metrics = metrics if metrics is not None else MetricsRegistry()
+        self.warm_modules = tuple(warm_modules or ())
+        # Reports left by the workers of a previous API process
+        self._clear_warm_reports()
+        # Re-entrant: cancelling a queued future fires _on_done synchronously
+        self._lock = threading.RLock()
+        self._executor = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # Created on first submit so importing the API never forks workers
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=warm_worker if self.warm_modules else None,
+                initargs=(self.warm_modules, self.state_dir) if self.warm_modules else (),
+            )
+        return self._executor
+
+    def _discard_executor(self, executor: ProcessPoolExecutor):
+        """Drop a broken pool so the next submit builds a new one (unless that already happened)."""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def warm_up(self):
+        """
+        Start every worker now (e.g. at API boot) so none of them pays process start-up and heavy
+        imports inside a job; see worker_imports() for what that cost.
+        """
+        executor = self._get_executor()
+        # Each submit finds no idle worker yet and starts a new one
+        for _ in range(self.max_workers):
+            executor.submit(os.getpid)
+
+    def worker_imports(self) -> dict:
+        """
+        Per-module import seconds of every warmed-up worker, {pid: {module: seconds}}, as written
+        by the workers' initializer. Also published as the worker_import_seconds metric.
+        """
+        workers = {}
+        for name in os.listdir(self.state_dir):
+            if not name.endswith(".warm.json"):
+                continue
+            try:
+                with open(os.path.join(self.state_dir, name), "r") as f:
+                    workers[int(name[len("worker_"):-len(".warm.json")])] = json.load(f)
+            except (OSError, ValueError):
+                continue
+        for imports in workers.values():
+            for module, seconds in imports.items():
+                if seconds is not None:
+                    self.metrics.set("worker_import_seconds", seconds, module=module)
+        return workers
+
+    def submit(self, fn, payload: dict, kind: str = "render") -> str:
+        """
+        Queue fn(payload, ctx) for execution. fn must be a module-level (picklable) function.
+        Returns the job id immediately.
+        """
+        job_id = str(uuid.uuid4())
+        ctx = JobContext(job_id, self.state_dir)
+        ctx.cleanup()
+
+        job = {
+            "job_id": job_id,
+            "kind": kind,
+            "status": "queued",
+            "progress": 0.0,
+            "stage": None,
+            "result": None,
+            "error": None,
+            "trace": None,
+            "created_at": time.time(),
+            "finished_at": None,
+            "ctx": ctx,
+            "future": None,
+            "executor": None,
+        }
+        with self._lock:
+            self._evict()
+            self.jobs[job_id] = job
+
+        executor = self._get_executor()
+        try:
+            future = executor.submit(_run_job, fn, payload, ctx)
+        except BrokenProcessPool:
+            # A worker died since the last job; its pool refuses new work
+            self._discard_executor(executor)
+            executor = self._get_executor()
+            future = executor.submit(_run_job, fn, payload, ctx)
+        job["future"] = future
+        job["executor"] = executor
+        future.add_done_callback(lambda f, jid=job_id: self._on_done(jid, f))
+        return job_id
+
+    async def run(self, fn, payload: dict, kind: str = "render"):
+        """Submit like submit() and wait (without blocking the event loop) for the result; job errors are raised."""
+        job_id = self.submit(fn, payload, kind=kind)
+        return await asyncio.wrap_future(self.jobs[job_id]["future"])
+
+    def _on_done(self, job_id: str, future):
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return
+            job["finished_at"] = time.time()
+            if future.cancelled():
+                job["status"] = "cancelled"
+            else:
+                exc = future.exception()
+                if exc is None:
+                    job["status"] = "completed"
+                    job["progress"] = 1.0
+                    job["stage"] = "done"
+                    job["result"] = future.result()
+                    if isinstance(job["result"], dict):
+                        job["trace"] = job["result"].pop("trace", None)
+                else:
+                    job["trace"] = getattr(exc, "trace", None)
+                    if isinstance(exc, BrokenProcessPool) and job["executor"] is not None:
+                        self._discard_executor(job["executor"])
+                    if isinstance(exc, JobCancelled):
+                        job["status"] = "cancelled"
+                    else:
+                        job["status"] = "failed"
+                        job["error"] = str(exc)
+                        print(f"❌ Job {job_id} failed: {exc}")
+            job["ctx"].cleanup()
+            job["executor"] = None
+            self.metrics.record_job(job)
+
+    def _evict(self):
+        """Forget finished jobs older than finished_ttl, then the oldest beyond max_finished. Caller holds the lock."""
+        finished = [job for job in self.jobs.values() if job["finished_at"] is not None]
+        expires = time.time() - self.finished_ttl
+        for job in [j for j in finished if j["finished_at"] <= expires]:
+            del self.jobs[job["job_id"]]
+        finished = sorted((j for j in finished if j["finished_at"] > expires), key=lambda j: j["finished_at"])
+        for job in finished[:max(0, len(finished) - self.max_finished)]:
+            del self.jobs[job["job_id"]]
+
+    @staticmethod
+    def _public(job: dict) -> dict:
+        return {k: v for k, v in job.items() if k not in ("ctx", "future", "executor")}
+
+    def get(self, job_id: str) -> dict:
+        """Public view of a job, or None if unknown."""
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+
+            if job["status"] in ("queued", "running"):
+                state = job["ctx"].read()
+                if state:
+                    job["status"] = "running"
+                    job["progress"] = state.get("progress", job["progress"])
+                    job["stage"] = state.get("stage", job["stage"])
+
+            return self._public(job)
+
+    def list(self) -> list:
+        with self._lock:
+            self._evict()
+            job_ids = list(self.jobs.keys())
+        return [self.get(job_id) for job_id in job_ids]
+
+    def cancel(self, job_id: str) -> dict:
+        """
+        Cancel a job. Queued jobs are dropped from the pool; running jobs
+        stop at their next progress checkpoint.
+        """
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+            if job["status"] in ("completed", "failed", "cancelled"):
+                return self._public(job)
+
+            future = job["future"]
+            if future is not None and future.cancel():
+                job["status"] = "cancelled"
+            else:
+                with open(job["ctx"].cancel_path, "w") as f:
+                    f.write("1")
+                job["status"] = "cancelling"
+
+        return self.get(job_id)
+
+    def status_counts(self) -> dict:
+        """Number of jobs per status (refreshing running ones), e.g. for queue depth gauges."""
+        counts = dict.fromkeys(self.JOB_STATUSES, 0)
+        for job in self.list():
+            if job is not None:
+                counts[job["status"]] = counts.get(job["status"], 0) + 1
+        return counts
+
+    def _clear_warm_reports(self):
+        for name in os.listdir(self.state_dir):
+            if name.endswith(".warm.json"):
+                try:
+                    os.remove(os.path.join(self.state_dir, name))
+                except FileNotFoundError:
+                    pass
+
+    def shutdown(self):
+        self._clear_warm_reports()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,103 @@
+import copy
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future
+
+
+class LLMResponseCache:
+    """
+    In-memory cache of parsed LLM responses with TTL eviction and in-flight coalescing.
+
+    Identical requests (same key) arriving while the first one is still waiting on the model
+    share its result instead of sending their own call. Failures are not cached: every waiter
+    gets the exception and the next request tries again. Values are deep-copied on the way out,
+    since callers post-process the EDL in place.
+    """
+
+    def __init__(self, ttl: float = None, max_entries: int = 256):
+        if ttl is None:
+            ttl = float(os.getenv("DIRECTOR_CACHE_TTL", "3600"))
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = {}   # key -> (expires_at, value)
+        self._inflight = {}  # key -> Future
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    @staticmethod
+    def make_key(prompt: str, vibe: str, assets: list, style: dict = None) -> str:
+        """Key on the request content; prompt case and whitespace do not matter."""
+        payload = json.dumps({
+            "prompt": " ".join((prompt or "").lower().split()),
+            "vibe": vibe,
+            "assets": assets,
+            "style": style,
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get_or_compute(self, key: str, compute):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                self.hits += 1
+                return copy.deepcopy(entry[1])
+            if entry:
+                del self._entries[key]
+
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                self.misses += 1
+                future = Future()
+                self._inflight[key] = future
+            else:
+                self.coalesced += 1
+
+        if not owner:
+            return copy.deepcopy(future.result())
+
+        try:
+            value = compute()
+        except BaseException as e:
+            with self._lock:
+                del self._inflight[key]
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            del self._inflight[key]
+            self._evict()
+        future.set_result(value)
+        return copy.deepcopy(value)
+
+    def _evict(self):
+        """Drop expired entries, then the oldest ones beyond max_entries. Caller holds the lock."""
+        now = time.monotonic()
+        for key in [k for k, (expires, _) in self._entries.items() if expires <= now]:
+            del self._entries[key]
+        if len(self._entries) > self.max_entries:
+            by_age = sorted(self._entries, key=lambda k: self._entries[k][0])
+            for key in by_age[:len(self._entries) - self.max_entries]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "inflight": len(self._inflight),
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "ttl": self.ttl,
+            }
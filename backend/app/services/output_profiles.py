@@ -0,0 +1,96 @@
+# Named output profiles for renders: resolution, frame rate and encoder settings, picked per request
+# ("output_profile": "vertical_1080"). Without one, renders keep the geometry and frame rate of the
+# sources (which is also what lets plain cuts be stream-copied).
+# `crf` and `video_bitrate` are alternatives (a bitrate, when set, wins); `threads` = 0 lets libx264
+# pick; `fit` is "crop" (fill the frame) or "pad" (letterbox).
+
+import re
+
+OUTPUT_PROFILES = {
+    "vertical_1080": {
+        "description": "Vertical short (Reels/TikTok/Shorts)",
+        "width": 1080, "height": 1920, "fps": 30.0,
+        "crf": 20, "video_bitrate": None, "preset": "veryfast", "threads": 0, "fit": "crop",
+    },
+    "landscape_1080p": {
+        "description": "1080p landscape",
+        "width": 1920, "height": 1080, "fps": 30.0,
+        "crf": 20, "video_bitrate": None, "preset": "veryfast", "threads": 0, "fit": "pad",
+    },
+    "preview_720p": {
+        "description": "Fast 720p draft",
+        "width": 1280, "height": 720, "fps": 30.0,
+        "crf": 30, "video_bitrate": None, "preset": "ultrafast", "threads": 0, "fit": "pad",
+    },
+}
+
+# Keys a profile dict may carry into the render profile
+ENCODER_KEYS = ("crf", "video_bitrate", "preset", "threads", "fit")
+
+# What libx264 accepts, checked before a custom profile reaches a render job
+X264_PRESETS = ("ultrafast", "superfast", "veryfast", "faster", "fast", "medium", "slow", "slower", "veryslow",
+                "placebo")
+MAX_FPS = 120.0
+MAX_DIMENSION = 8192
+BITRATE_PATTERN = re.compile(r"^\d+(\.\d+)?[kKM]?$")
+
+
+def get_output_profile(profile) -> dict:
+    """Resolve a profile name (or a dict overriding a named "base" profile). None -> None."""
+    if profile is None:
+        return None
+    if isinstance(profile, str):
+        if profile not in OUTPUT_PROFILES:
+            raise ValueError(f"Unknown output profile: {profile}")
+        return dict(OUTPUT_PROFILES[profile], name=profile)
+    if not isinstance(profile, dict):
+        raise ValueError("Output profile must be a name or a dict")
+    base = get_output_profile(profile.get("base", "landscape_1080p"))
+    resolved = dict(base, **{k: v for k, v in profile.items() if k != "base"})
+    resolved["name"] = profile.get("name", "custom")
+    return _checked(resolved)
+
+
+def _number(profile: dict, key: str, kind, low, high):
+    value = profile[key]
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise ValueError(f"Output {key} must be a number")
+    try:
+        number = kind(value)
+    except ValueError:
+        raise ValueError(f"Output {key} must be a number") from None
+    if kind is int and float(value) != number:
+        raise ValueError(f"Output {key} must be a whole number")
+    if not low <= number <= high:
+        raise ValueError(f"Output {key} must be between {low} and {high}")
+    return number
+
+
+def _checked(profile: dict) -> dict:
+    """Custom values in range and of a kind ffmpeg takes; raises ValueError (a 400 at the API)."""
+    for key in ("width", "height"):
+        profile[key] = _number(profile, key, int, 2, MAX_DIMENSION)
+        if profile[key] % 2:
+            raise ValueError(f"Output {key} must be a positive even number")
+    profile["fps"] = _number(profile, "fps", float, 1.0, MAX_FPS)
+    profile["crf"] = _number(profile, "crf", int, 0, 51)
+    profile["threads"] = _number(profile, "threads", int, 0, 64)
+    if profile["preset"] not in X264_PRESETS:
+        raise ValueError(f"Output preset must be one of {', '.join(X264_PRESETS)}")
+    if profile["fit"] not in ("crop", "pad"):
+        raise ValueError("Output fit must be \"crop\" or \"pad\"")
+    bitrate = profile["video_bitrate"]
+    if bitrate is not None and not (isinstance(bitrate, str) and BITRATE_PATTERN.match(bitrate)):
+        raise ValueError("Output video_bitrate must be like \"6M\" or \"2500k\"")
+    return profile
+
+
+def scaled_for_preview(profile: dict, short_side: int = 360) -> dict:
+    """Same aspect ratio and frame rate, shrunk so the short side matches the preview proxies."""
+    if profile is None:
+        return None
+    scale = short_side / min(profile["width"], profile["height"])
+    if scale >= 1.0:
+        return dict(profile)
+    even = lambda v: max(2, int(round(v * scale / 2)) * 2)
+    return dict(profile, width=even(profile["width"]), height=even(profile["height"]))
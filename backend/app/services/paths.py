@@ -0,0 +1,28 @@
+import os
+
+# Everything the app writes (uploads, caches, the asset and shot indexes, job state, downloads) lives
+# under APP_DATA_DIR; the default keeps it in backend/ as laid out in the repository.
+DATA_ROOT = os.getenv("APP_DATA_DIR", "backend")
+UPLOAD_DIR = os.path.join(DATA_ROOT, "uploads")
+MUSIC_DIR = os.path.join(UPLOAD_DIR, "music")
+PROXY_DIR = os.path.join(UPLOAD_DIR, ".proxies")
+CACHE_DIR = os.path.join(DATA_ROOT, "cache")
+DATA_DIR = os.path.join(DATA_ROOT, "data")
+JOBS_DIR = os.path.join(DATA_ROOT, "jobs")
+REFERENCE_DIR = os.path.join(DATA_ROOT, "downloads", "references")
+
+
+def is_local_reference(url: str) -> bool:
+    """A file:// URL, an absolute path or an existing relative path, as opposed to a URL for yt-dlp."""
+    path = url[len("file://"):] if url.startswith("file://") else url
+    return url.startswith("file://") or os.path.isabs(path) or os.path.exists(path)
+
+
+def within_dirs(path: str, dirs) -> bool:
+    """`path` (symlinks resolved) is inside one of `dirs`."""
+    real = os.path.realpath(path)
+    for d in dirs:
+        root = os.path.realpath(d)
+        if os.path.commonpath([real, root]) == root:
+            return True
+    return False
@@ -0,0 +1,346 @@
+import asyncio
+import os
+
+from backend.app.services.job_queue import JobContext
+from backend.app.services.paths import UPLOAD_DIR
+from backend.app.services.telemetry import JobTrace
+
+
+def run_edit_job(request: dict, ctx: JobContext) -> dict:
+    """
+    Full edit pipeline, executed inside a render worker process:
+    1. Optional reference download + style analysis.
+    2. Metadata and per-second feature track for each resolved asset, beat analysis of the music track.
+    3. Director creates an EDL, checked and normalized against the assets (see EDLValidator) and with
+       cuts snapped to the beat when there is music.
+    4. VideoProcessor renders it (from low-res proxies with a fast preset when "preview" is set).
+
+    `request` carries already-resolved paths: {"assets": [{"file_id", "path"}], "prompt",
+    "reference_url", "music_path", "render_workers", "preview", "output_profile"}.
+    The returned EDL always points at the original sources, so it can be promoted with run_render_job.
+    Every stage is timed into result["trace"] (see JobTrace), which the JobManager turns into metrics.
+    """
+    from backend.app.services.analyzer import AssetAnalyzer
+    from backend.app.services.director import get_director
+    from backend.app.services.edl_schema import EDLValidator
+
+    prompt = request.get("prompt", "Make a cool video")
+    music_path = request.get("music_path")
+
+    trace = JobTrace()
+    with trace.job():
+        analyzer = AssetAnalyzer()
+        reference_style, assets_metadata, music_analysis = _gather_inputs(request, ctx, analyzer, trace)
+
+        # 2. Director -> EDL
+        ctx.report(0.2, "director", force=True)
+        director = get_director()
+        with trace.span("director") as span:
+            edl = asyncio.run(director.generate_edit_script_async(
+                _styled_prompt(prompt, reference_style), assets_metadata, reference_style, music_analysis,
+                timeout=request.get("director_timeout"), hedge_after=request.get("hedge_after"),
+                validator=EDLValidator(assets_metadata),
+            ))
+            span["path"] = (edl.get("director") or {}).get("path")
+
+        if music_path:
+            edl['audio_track'] = music_path
+
+        # 3. Render (mapped onto the remaining 30% - 100% of job progress)
+        result = _render(edl, ctx, analyzer.cache, request.get("render_workers"), bool(request.get("preview")), 0.3,
+                         request.get("output_profile"), trace)
+        result["analysis_cache"] = analyzer.cache.stats()
+        result["director_cache"] = director.llm_cache.stats()
+        result["trace"] = trace.to_dict()
+        return result
+
+
+def run_batch_job(request: dict, ctx: JobContext) -> dict:
+    """
+    Several edits of one asset set in a single worker process. The reference style, asset metadata
+    and music analysis are computed once; the Director plans every variant concurrently; all renders
+    are scheduled together, so parts the variants share are rendered once and overlapping source
+    ranges are decoded once (see VideoProcessor.render_batch).
+
+    `request`: the asset fields of run_edit_job plus "variants": [{"name", "prompt", "style",
+    "output_profile"}] ("style" forces a styles.json vibe instead of detecting it from the prompt;
+    missing fields fall back to the request's own "prompt" / "output_profile").
+    result["variants"] holds each variant's EDL, output_url and render report, in order.
+    """
+    from backend.app.services.analyzer import AssetAnalyzer
+    from backend.app.services.director import get_director
+    from backend.app.services.edl_schema import EDLValidator
+
+    music_path = request.get("music_path")
+    variants = [dict(v, name=v.get("name") or f"variant_{n}") for n, v in enumerate(request["variants"])]
+
+    trace = JobTrace()
+    with trace.job():
+        analyzer = AssetAnalyzer()
+        reference_style, assets_metadata, music_analysis = _gather_inputs(request, ctx, analyzer, trace)
+
+        ctx.report(0.2, "director", force=True)
+        director = get_director()
+        validator = EDLValidator(assets_metadata)
+
+        async def direct_all():
+            return await asyncio.gather(*[director.generate_edit_script_async(
+                _styled_prompt(v.get("prompt") or request.get("prompt", "Make a cool video"), reference_style),
+                assets_metadata, reference_style, music_analysis, vibe=v.get("style"),
+                timeout=request.get("director_timeout"), hedge_after=request.get("hedge_after"),
+                validator=validator,
+            ) for v in variants])
+
+        with trace.span("director", variants=len(variants)) as span:
+            edls = asyncio.run(direct_all())
+            span["paths"] = [(edl.get("director") or {}).get("path") for edl in edls]
+
+        for edl in edls:
+            if music_path:
+                edl['audio_track'] = music_path
+
+        renders = _render_many(
+            [(edl, v.get("output_profile", request.get("output_profile"))) for edl, v in zip(edls, variants)],
+            ctx, analyzer.cache, request.get("render_workers"), bool(request.get("preview")), 0.3, trace)
+        result = {
+            "status": "success",
+            "preview": bool(request.get("preview")),
+            "variants": [dict(render, name=v["name"], prompt=v.get("prompt"), style=v.get("style"))
+                         for render, v in zip(renders, variants)],
+            "analysis_cache": analyzer.cache.stats(),
+            "director_cache": director.llm_cache.stats(),
+        }
+        result["trace"] = trace.to_dict()
+        return result
+
+
+def run_analysis_job(request: dict, ctx: JobContext) -> dict:
+    """
+    Asset analysis for /analyze, run in a worker so the API process never loads the media libraries.
+    `request`: {"file_type": "video" | "audio", "path", "file_id"}. Returns {"metadata", "scenes", "interest",
+    "shots_indexed"} or {"audio"}; "interest" summarizes the video's feature track, which is cached for the
+    Director on the way, and the scenes are added to the shot search index (None if that failed).
+    """
+    from backend.app.services.analyzer import AssetAnalyzer
+    from backend.app.services.feature_track import summarize_track
+
+    analyzer = AssetAnalyzer()
+    if request["file_type"] == "video":
+        metadata = analyzer.get_video_metadata(request["path"])
+        scenes = analyzer.detect_scenes(request["path"])
+        return {"metadata": metadata,
+                "scenes": scenes,
+                "interest": summarize_track(analyzer.get_feature_track(request["path"]), metadata.get("duration")),
+                "shots_indexed": _index_shots(request.get("file_id"), request["path"], scenes)}
+    return {"audio": analyzer.analyze_audio(request["path"])}
+
+
+def _index_shots(file_id: str, path: str, scenes: list):
+    """Add a video's scenes to the shot index; None when there is no file id or no usable embedder."""
+    from backend.app.services.shot_index import get_shot_index
+
+    if not file_id:
+        return None
+    try:
+        return get_shot_index().add_video(file_id, path, scenes)
+    except Exception as e:
+        print(f"⚠️ Shot indexing of {path} failed: {e}")
+        return None
+
+
+def run_shot_search_job(request: dict, ctx: JobContext) -> dict:
+    """
+    Text search over the shot index, run in a worker where the embedding model stays loaded.
+    `request`: {"query", "k", "file_ids"}. Returns {"shots": [{"file_id", "path", "start", "end", "score"}]}.
+    """
+    from backend.app.services.shot_index import get_shot_index
+
+    index = get_shot_index()
+    return {"shots": index.search(request["query"], k=request.get("k", 10), file_ids=request.get("file_ids")),
+            "index": index.stats()}
+
+
+def _gather_inputs(request: dict, ctx: JobContext, analyzer, trace: JobTrace):
+    """
+    Stages shared by every edit of an asset set: reference style, asset metadata (with each video's
+    per-second feature track under "features", and under "shots" its indexed shots matching the
+    request's prompt) and music analysis.
+    Returns (reference_style, assets_metadata, music_analysis); a failed reference or music analysis is None.
+    """
+    from backend.app.services.reference_extractor import ReferenceExtractor
+
+    reference_url = request.get("reference_url")
+    music_path = request.get("music_path")
+
+    # 0. Process Reference (if any)
+    reference_style = None
+    if reference_url:
+        ctx.report(0.02, "reference", force=True)
+        ref_extractor = ReferenceExtractor(cache=analyzer.cache)
+        try:
+            print(f"Downloading reference: {reference_url}")
+            with trace.span("reference_download"):
+                ref_path = ref_extractor.download_reference(reference_url)
+            with trace.span("analyze_style"):
+                reference_style = ref_extractor.analyze_style(ref_path)
+            print(f"Extracted Style: {reference_style}")
+        except Exception:
+            pass  # Recorded on the span; continue without reference
+
+    # 1. Gather Metadata
+    ctx.report(0.1, "metadata", force=True)
+    assets_metadata = []
+    with trace.span("metadata", assets=len(request.get("assets", []))):
+        for asset in request.get("assets", []):
+            meta = analyzer.get_video_metadata(asset["path"])
+            assets_metadata.append({
+                "file_id": asset["file_id"],
+                "path": asset["path"],
+                "type": "video",
+                "metadata": meta
+            })
+
+    # Per-second interest features (cached per file) so the Director can pick the best moments
+    with trace.span("features", assets=len(assets_metadata)):
+        for asset in assets_metadata:
+            try:
+                asset["features"] = analyzer.get_feature_track(asset["path"])
+            except Exception as e:
+                print(f"⚠️ No feature track for {asset['path']}: {e}")
+
+    # Shots of these assets that match the prompt, when they were indexed at analysis time
+    _match_shots(request.get("prompt"), assets_metadata, trace)
+
+    # Beat grid of the music track (cached per file) so the Director can cut on rhythm
+    music_analysis = None
+    if music_path:
+        ctx.report(0.15, "music", force=True)
+        try:
+            with trace.span("music_analysis"):
+                music_analysis = analyzer.analyze_audio(music_path)
+        except Exception:
+            pass  # Recorded on the span; cut without a beat grid
+    return reference_style, assets_metadata, music_analysis
+
+
+def _match_shots(prompt: str, assets_metadata: list, trace: JobTrace, k: int = 8):
+    from backend.app.services.shot_index import get_shot_index
+
+    if not prompt or not assets_metadata:
+        return
+    try:
+        index = get_shot_index()
+        file_ids = [asset["file_id"] for asset in assets_metadata]
+        if not any(index.has_asset(fid) for fid in file_ids):
+            return  # Nothing indexed: do not load the embedding model for nothing
+        with trace.span("shot_search"):
+            # Only shots that clearly match: a generic prompt should not override the interest windows
+            shots = index.search(prompt, k=k, file_ids=file_ids, min_score=index.min_score)
+    except Exception as e:
+        print(f"⚠️ Shot search failed: {e}")
+        return
+    for asset in assets_metadata:
+        matches = [{"start": s["start"], "end": s["end"], "score": s["score"]}
+                   for s in shots if s["file_id"] == asset["file_id"]]
+        if matches:
+            asset["shots"] = matches
+
+
+def _styled_prompt(prompt: str, reference_style: dict = None) -> str:
+    """Mix the user prompt with reference insights."""
+    if not reference_style:
+        return prompt
+    pacing = reference_style.get("pacing", "normal")
+    prompt += f". STYLE REFERENCE: Match this pacing: {pacing} (avg shot {reference_style.get('avg_shot_length', 3):.1f}s)."
+    color, motion = reference_style.get("color"), reference_style.get("motion")
+    if color and motion:
+        prompt += (f" Colour: {color['vibe']}, {color['tone']} (saturation {color['saturation']:.2f})."
+                   f" Motion: {motion['level']}.")
+    return prompt
+
+
+def run_render_job(request: dict, ctx: JobContext) -> dict:
+    """
+    Render an existing EDL (e.g. promote a preview to a full-quality render).
+    `request`: {"edl", "render_workers", "preview", "output_profile"}.
+    """
+    from backend.app.services.analysis_cache import AnalysisCache
+
+    cache = AnalysisCache()
+    trace = JobTrace()
+    with trace.job():
+        result = _render(request["edl"], ctx, cache, request.get("render_workers"), bool(request.get("preview")),
+                         0.0, request.get("output_profile"), trace)
+    result["analysis_cache"] = cache.stats()
+    result["trace"] = trace.to_dict()
+    return result
+
+
+def _render(edl: dict, ctx: JobContext, cache, workers, preview: bool, start: float, output_profile=None,
+            trace: JobTrace = None) -> dict:
+    return _render_many([(edl, output_profile)], ctx, cache, workers, preview, start, trace)[0]
+
+
+def _render_many(items: list, ctx: JobContext, cache, workers, preview: bool, start: float,
+                 trace: JobTrace = None) -> list:
+    """
+    Render [(edl, output_profile)] in one VideoProcessor.render_batch; one result dict per item.
+    A request's `workers` can lower the segment worker count but not raise it past this job's share of the cores.
+    """
+    from backend.app.services.output_profiles import get_output_profile, scaled_for_preview
+    from backend.app.services.proxy_service import ProxyManager
+    from backend.app.services.video_processor import VideoProcessor, default_segment_workers
+
+    trace = trace if trace is not None else JobTrace()
+    render_edls = [edl for edl, _ in items]
+    outputs = [get_output_profile(output_profile) for _, output_profile in items]
+    if preview:
+        # Same framing as the final render, at proxy resolution
+        outputs = [scaled_for_preview(output) for output in outputs]
+        # Proxies are normally built right after upload; any missing one is built here
+        ctx.report(start, "proxies", force=True)
+        with trace.span("proxies"):
+            proxies = ProxyManager(cache=cache)
+            render_edls = [proxies.proxy_edl(edl) for edl in render_edls]
+
+    ctx.report(start, "render", force=True)
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    names = [f"render_{ctx.job_id}.mp4"] if len(items) == 1 else \
+        [f"render_{ctx.job_id}_{n}.mp4" for n in range(len(items))]
+    variants = [{"edl": edl, "output_path": os.path.join(UPLOAD_DIR, name), "output_profile": output}
+                for edl, name, output in zip(render_edls, names, outputs)]
+
+    workers = min(int(workers), default_segment_workers()) if workers else None
+    processor = VideoProcessor(cache=cache, workers=workers, quality="preview" if preview else "final")
+    with trace.span("render", segments=sum(len(edl.get("timeline", [])) for edl in render_edls)):
+        reports = processor.render_batch(
+            variants,
+            progress_callback=lambda p: ctx.report(start + (1.0 - start) * p, "render"),
+        )
+    # Sub-stages as timed by the renderer (segments, clip loading, effects, concat, audio mix).
+    # The segment stage is shared by a batch; per-output stages add up.
+    stages = {}
+    for report in reports:
+        for name, seconds in report.get("timings", {}).items():
+            if name in ("segments", "clip_load", "effects_encode"):
+                stages[name] = max(stages.get(name, 0.0), seconds)
+            elif name != "total":
+                stages[name] = stages.get(name, 0.0) + seconds
+    for name, seconds in stages.items():
+        trace.add_span(f"render.{name}", seconds)
+    frames = sum(r.get("counters", {}).get("frames_encoded", 0) for r in reports)
+    trace.count("frames_encoded", frames)
+    trace.count("bytes_written", sum(r.get("counters", {}).get("bytes_written", 0) for r in reports))
+    encode_seconds = stages.get("segments", stages.get("encode", 0.0))
+    if frames and encode_seconds > 0:
+        trace.gauge("encode_fps", round(frames / encode_seconds, 2))
+
+    return [{
+        "status": "success",
+        "preview": preview,
+        "output_profile": output_profile,
+        "edl": edl,
+        "output_url": f"/static/{name}",
+        "output_path": variant["output_path"],
+        "render": report,
+    } for (edl, output_profile), name, variant, report in zip(items, names, variants, reports)]
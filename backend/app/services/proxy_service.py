@@ -0,0 +1,84 @@
+import os
+import uuid
+
+from backend.app.services.analysis_cache import AnalysisCache
+from backend.app.services.ffmpeg_tools import run_ffmpeg, probe_streams
+from backend.app.services.paths import PROXY_DIR
+from backend.app.services.telemetry import JobTrace
+
+# Proxy encode: small, fast to decode, a keyframe every second so preview cuts are stream-copied
+PROXY_ENCODE_ARGS = ["-c:v", "libx264", "-preset", "ultrafast", "-crf", "28", "-pix_fmt", "yuv420p",
+                     "-force_key_frames", "expr:gte(t,n_forced*1)", "-bf", "0"]
+PROXY_AUDIO_ARGS = ["-c:a", "aac", "-b:a", "96k", "-ar", "44100", "-ac", "2"]
+
+
+class ProxyManager:
+    """
+    Low-resolution proxies of uploaded videos for preview renders.
+
+    Proxies live next to the uploads (`<upload_dir>/.proxies/`) and are named after the source's
+    content hash, so a source that changes on disk gets a new proxy instead of a stale one.
+    They keep the source timing exactly (same duration and frame rate), so an EDL made against the
+    originals can be rendered from proxies by swapping paths, and promoted back the same way.
+    """
+
+    def __init__(self, proxy_dir: str = PROXY_DIR, cache: AnalysisCache = None, height: int = 360):
+        self.proxy_dir = proxy_dir
+        self.cache = cache if cache is not None else AnalysisCache()
+        self.height = height
+        os.makedirs(proxy_dir, exist_ok=True)
+
+    def proxy_path(self, source_path: str) -> str:
+        digest = self.cache.file_hash(source_path)
+        return os.path.join(self.proxy_dir, f"{digest}_{self.height}p.mp4")
+
+    def get(self, source_path: str) -> str:
+        """Existing proxy for the current content of `source_path`, or None."""
+        if not os.path.isfile(source_path):
+            return None
+        path = self.proxy_path(source_path)
+        return path if os.path.exists(path) else None
+
+    def ensure(self, source_path: str) -> str:
+        """Proxy path for `source_path`, generating it first if needed."""
+        path = self.proxy_path(source_path)
+        if os.path.exists(path):
+            return path
+
+        has_audio = bool(probe_streams(source_path).get("audio"))
+        # Write under a unique name and rename, so concurrent builders never expose a partial file
+        tmp_path = os.path.join(self.proxy_dir, f".{uuid.uuid4().hex}.tmp.mp4")
+        args = ["-i", source_path, "-map", "0:v:0",
+                "-vf", f"scale=-2:'min({self.height},ih)'"] + PROXY_ENCODE_ARGS
+        args += (["-map", "0:a:0"] + PROXY_AUDIO_ARGS) if has_audio else ["-an"]
+        try:
+            run_ffmpeg(args + ["-movflags", "+faststart", tmp_path])
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        print(f"🎞️ Built proxy for {os.path.basename(source_path)}")
+        return path
+
+    def proxy_edl(self, edl: dict) -> dict:
+        """Copy of `edl` with every timeline entry pointing at its proxy (built on demand)."""
+        proxies = {}
+        timeline = []
+        for cut in edl.get('timeline', []):
+            source = cut.get('source_path')
+            if source and os.path.isfile(source):
+                if source not in proxies:
+                    proxies[source] = self.ensure(source)
+                cut = dict(cut, source_path=proxies[source])
+            timeline.append(cut)
+        return dict(edl, timeline=timeline)
+
+
+def build_proxy_job(request: dict, ctx) -> dict:
+    """Job function (see JobManager): build the proxy for one uploaded video in the background."""
+    ctx.report(0.0, "proxy", force=True)
+    trace = JobTrace()
+    with trace.job(), trace.span("proxy"):
+        proxies = ProxyManager(proxy_dir=request.get("proxy_dir", PROXY_DIR))
+        path = proxies.ensure(request["path"])
+    return {"status": "success", "source_path": request["path"], "proxy_path": path, "trace": trace.to_dict()}
@@ -1,60 +1,117 @@
 import yt_dlp
 import os
-import cv2
-import numpy as np
+from backend.app.services.analysis_cache import AnalysisCache
+from backend.app.services.paths import REFERENCE_DIR, UPLOAD_DIR, is_local_reference, within_dirs
+from backend.app.services.style_analyzer import StyleAnalyzer
+
+# Bump when the style fingerprint changes so stale cache entries are ignored
+STYLE_VERSION = "1"
+
 
 class ReferenceExtractor:
-    def __init__(self, download_dir="backend/downloads/references"):
+    def __init__(self, download_dir=REFERENCE_DIR, cache: AnalysisCache = None,
+                 analyzer: StyleAnalyzer = None, local_dirs=None):
+        """Local references are only read from `local_dirs` (default: the upload dir and `download_dir`)."""
         self.download_dir = download_dir
+        self.local_dirs = list(local_dirs) if local_dirs is not None else [UPLOAD_DIR, download_dir]
+        self.cache = cache if cache is not None else AnalysisCache()
+        self.analyzer = analyzer if analyzer is not None else StyleAnalyzer()
         os.makedirs(download_dir, exist_ok=True)
 
+    # Style analysis samples small thumbnails and never listens: a low-res, video-only H.264 stream
+    # (cheapest to fetch and decode) is enough. Muxed low-res files are the fallback.
+    REFERENCE_FORMAT = ("bestvideo[height<=360][vcodec^=avc1]/bestvideo[height<=360]/worstvideo"
+                        "/best[height<=360]/worst")
+
+    # Partial or temporary files yt-dlp leaves behind
+    _INCOMPLETE = (".part", ".ytdl", ".temp", ".tmp")
+
     def download_reference(self, url: str) -> str:
         """
-        Downloads a YouTube video and returns the local path.
+        Local path of a reference video. `url` can be a local file path (or file:// URL) under
+        `local_dirs`, used as is, or anything yt-dlp supports; other local paths raise ValueError. Downloads are kept in `download_dir` under their video id, so a
+        reference fetched before is returned without touching the network.
         """
+        local = self._local_path(url)
+        if local:
+            return local
+
+        video_id = self.video_id(url)
+        cached = self.cached_path(video_id) if video_id else None
+        if cached:
+            print(f"🎬 Reference {video_id} already downloaded")
+            return cached
+
         ydl_opts = {
-            'format': 'bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best',
+            'format': self.REFERENCE_FORMAT,
             'outtmpl': os.path.join(self.download_dir, '%(id)s.%(ext)s'),
             'noplaylist': True,
+            'quiet': True,
         }
-        
+
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=True)
-            filename = ydl.prepare_filename(info)
-            return filename
+            # Resolve the id first (metadata only): URLs we could not parse offline may still be cached
+            info = ydl.extract_info(url, download=False)
+            cached = self.cached_path(info.get('id'))
+            if cached:
+                return cached
+            info = ydl.process_ie_result(info, download=True)
+            downloads = info.get('requested_downloads') or []
+            return downloads[0].get('filepath') if downloads and downloads[0].get('filepath') \
+                else ydl.prepare_filename(info)
 
-    def analyze_style(self, video_path: str):
+    def _local_path(self, url: str):
+        if not is_local_reference(url):
+            return None
+        path = url[len("file://"):] if url.startswith("file://") else url
+        if not os.path.isfile(path) or not within_dirs(path, self.local_dirs):
+            raise ValueError(f"Local reference is not a file in the upload or download directories: {url}")
+        return path
+
+    @staticmethod
+    def video_id(url: str):
+        """Video id of a URL as yt-dlp's extractors see it, without network access; None if unknown."""
+        from yt_dlp.extractor import gen_extractor_classes
+        for ie in gen_extractor_classes():
+            if ie.ie_key() != 'Generic' and ie.suitable(url):
+                return ie.get_temp_id(url)
+        return None
+
+    def cached_path(self, video_id: str):
+        """Previously downloaded file for `video_id`, or None."""
+        if not video_id:
+            return None
+        for name in os.listdir(self.download_dir):
+            stem, ext = os.path.splitext(name)
+            if stem == video_id and ext and not name.endswith(self._INCOMPLETE):
+                return os.path.join(self.download_dir, name)
+        return None
+
+    def analyze_style(self, video_path: str, video_id: str = None):
         """
-        Analyze the video to extract 'style' metrics:
-        - Average Shot Length (ASL): Fast vs Slow pacing.
-        - Color Vibe: Saturation/Brightness levels.
+        Style fingerprint of a reference video (see StyleAnalyzer):
+        - Pacing: shot boundaries, average shot length and its distribution
+          (Action/Hype = ~1-2s average shot length, Vlog/Cinematic = ~4-8s).
+        - Color Vibe: saturation/brightness histograms.
+        - Motion intensity within shots.
+        Cached by `video_id` (downloads are named after theirs), so the same reference is analyzed
+        once; other files are cached by content. Returns None if the video cannot be decoded.
         """
-        cap = cv2.VideoCapture(video_path)
-        if not cap.isOpened():
+        if video_id is None and os.path.dirname(os.path.abspath(video_path)) == os.path.abspath(self.download_dir):
+            video_id = os.path.splitext(os.path.basename(video_path))[0]
+        params = {"sample_fps": self.analyzer.sample_fps, "analysis_width": self.analyzer.analysis_width,
+                  "threshold": self.analyzer.detector.threshold}
+
+        try:
+            if video_id is None:
+                style = self.cache.get_or_compute(video_path, "style", params,
+                                                  lambda: self.analyzer.analyze(video_path), version=STYLE_VERSION)
+            else:
+                key = self.cache.make_key(f"video_id:{video_id}", "style", params, STYLE_VERSION)
+                style = self.cache.get(key)
+                if style is None:
+                    style = self.analyzer.analyze(video_path)
+                    self.cache.put(key, style)
+        except (ValueError, OSError):
             return None
-            
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        duration = frame_count / fps if fps > 0 else 0
-        
-        # 1. Pacing Analysis (Shot detection)
-        # Simplified: Use standard deviation of pixel intensity to find hard cuts
-        # Real implementation would use pyscenedetect, here we mock for speed
-        # Assume a cut every time pixel difference spikes
-        
-        # Heuristic for "Pacing":
-        # Action/Hype = ~1-2s average shot length
-        # Vlog/Cinematic = ~4-8s average shot length
-        
-        # For this demo, let's just use the duration and a heuristic or random mock
-        # Real implementation: Iterate frames, calc diff, find peaks.
-        
-        shot_count = max(1, int(duration / 3)) # Mock: assuming 3s cuts on average
-        avg_shot_length = duration / shot_count
-        
-        return {
-            "pacing": "fast" if avg_shot_length < 2.5 else "slow",
-            "avg_shot_length": avg_shot_length,
-            "duration": duration,
-            "source_path": video_path
-        }
+        return dict(style, source_path=video_path, video_id=video_id)
@@ -0,0 +1,231 @@
+import bisect
+import math
+
+from backend.app.services.ffmpeg_tools import probe_streams, keyframe_times
+from backend.app.services.output_profiles import ENCODER_KEYS
+
+# Codecs the concat demuxer can join losslessly into an MP4 output
+COPYABLE_VIDEO_CODECS = ("h264",)
+COPYABLE_AUDIO_CODECS = ("aac",)
+
+PLAIN_TRANSITIONS = (None, "cut", "cross_dissolve")
+PLAIN_FILTERS = (None, "none")
+
+
+def effect_reasons(cut: dict) -> list:
+    """
+    Why a timeline entry cannot be stream-copied. Empty list means it is a plain cut.
+    Mirrors what VideoProcessor applies through MoviePy.
+    """
+    reasons = []
+    if float(cut.get('speed', 1.0) or 1.0) != 1.0:
+        reasons.append("speed")
+    if 'saturation' in cut:
+        reasons.append("saturation")
+    if 'contrast' in cut:
+        reasons.append("contrast")
+    if 'brightness' in cut:
+        reasons.append("brightness")
+    if cut.get('filter') not in PLAIN_FILTERS:
+        reasons.append(f"filter:{cut.get('filter')}")
+    if cut.get('effect'):
+        reasons.append(f"effect:{cut.get('effect')}")
+    if cut.get('transition') not in PLAIN_TRANSITIONS:
+        reasons.append(f"transition:{cut.get('transition')}")
+    return reasons
+
+
+def frame_span(start: float, end: float, fps: float) -> int:
+    """
+    Frames of a source's frame grid at `fps` in [start, end), with both cut points rounded to the
+    nearest frame; the parts of a cut split at frame times add up to the frames of the whole cut.
+    """
+    return int(math.floor(end * fps + 0.5)) - int(math.floor(start * fps + 0.5))
+
+
+def stream_profile(streams: dict) -> tuple:
+    """Parameters that must match for parts to be concatenated without re-encoding."""
+    v = streams.get("video") or {}
+    a = streams.get("audio")
+    audio = (a.get("codec"), a.get("sample_rate"), a.get("channels")) if a else None
+    return (v.get("codec"), v.get("width"), v.get("height"), v.get("fps"), v.get("pix_fmt"), audio)
+
+
+class RenderPlanner:
+    """
+    Splits an EDL timeline into render actions:
+    - "copy":    plain cut from one keyframe to another (or the end of the source); packets are copied.
+    - "smart":   plain cut spanning whole GOPs but starting/ending between keyframes; the head
+                 [start, copy_start) and tail [copy_end, end) are re-encoded, the GOPs between copied.
+    - "encode":  plain cut that cannot be copied (codec/profile mismatch, no whole GOP inside); ffmpeg re-encode.
+    - "effects": cut with speed/colour/zoom/fade; rendered through MoviePy.
+
+    All parts are conformed to one target stream profile (the one covering most plain-cut time,
+    or an H.264/AAC profile matching the first source when nothing is copyable),
+    so they can be joined with the concat demuxer. With an `output` profile (see output_profiles)
+    the geometry and frame rate are fixed by it and only sources already matching it are copied.
+    """
+
+    def __init__(self, cache=None):
+        self.cache = cache
+
+    def streams(self, path: str) -> dict:
+        if self.cache is None:
+            return probe_streams(path)
+        return self.cache.get_or_compute(path, "streams", {}, lambda: probe_streams(path))
+
+    def keyframes(self, path: str) -> list:
+        if self.cache is None:
+            return keyframe_times(path)
+        return self.cache.get_or_compute(path, "keyframes", {}, lambda: keyframe_times(path))
+
+    def plan(self, timeline: list, output: dict = None) -> dict:
+        streams = {}
+        for cut in timeline:
+            path = cut['source_path']
+            if path not in streams:
+                try:
+                    streams[path] = self.streams(path)
+                except (OSError, ValueError, RuntimeError):
+                    streams[path] = {}
+
+        profile = self._target_profile(timeline, streams, output)
+        copyable = profile is not None
+        if not copyable:
+            # Nothing can be copied; still render every entry to one common profile
+            profile = self._conform_profile(timeline, streams, output)
+        if profile is not None and output is not None:
+            profile.update({k: output[k] for k in ENCODER_KEYS if k in output})
+            profile["output"] = output.get("name")
+
+        segments = []
+        for index, cut in enumerate(timeline):
+            info = streams.get(cut['source_path']) or {}
+            segment = {"index": index, "cut": cut, "action": "effects", "reason": None,
+                       "source_audio": bool(info.get("audio"))}
+            reasons = effect_reasons(cut)
+            if reasons:
+                segment["reason"] = ",".join(reasons)
+            elif not copyable or stream_profile(info) != profile["key"]:
+                segment["action"] = "encode"
+                segment["reason"] = "stream profile differs from target"
+            else:
+                self._plan_copy(segment, cut, profile["fps"] or 30.0, info.get("duration"))
+            segments.append(segment)
+
+        return {"profile": profile, "segments": segments}
+
+    def _target_profile(self, timeline: list, streams: dict, output: dict = None):
+        weight = {}
+        for cut in timeline:
+            info = streams.get(cut['source_path']) or {}
+            video, audio = info.get("video"), info.get("audio")
+            if effect_reasons(cut) or not video or video.get("codec") not in COPYABLE_VIDEO_CODECS:
+                continue
+            if audio and audio.get("codec") not in COPYABLE_AUDIO_CODECS:
+                continue
+            if output is not None and not self._matches_output(video, output):
+                continue
+            key = stream_profile(info)
+            weight[key] = weight.get(key, 0.0) + max(0.0, float(cut['end']) - float(cut['start']))
+
+        if not weight:
+            return None
+        key = max(weight, key=weight.get)
+        codec, width, height, fps, pix_fmt, audio = key
+        return {
+            "key": key,
+            "video_codec": codec,
+            "width": width,
+            "height": height,
+            "fps": fps,
+            "pix_fmt": pix_fmt,
+            "audio": {"codec": audio[0], "sample_rate": audio[1], "channels": audio[2]} if audio else None,
+        }
+
+    @staticmethod
+    def _matches_output(video: dict, output: dict) -> bool:
+        if (video.get("width"), video.get("height")) != (output["width"], output["height"]):
+            return False
+        return not output.get("fps") or abs((video.get("fps") or 0) - output["fps"]) < 0.01
+
+    def _conform_profile(self, timeline: list, streams: dict, output: dict = None):
+        """H.264/AAC profile at the output geometry, or that of the first readable source."""
+        infos = [streams.get(cut['source_path']) or {} for cut in timeline]
+        video = next((i["video"] for i in infos if i.get("video")), None)
+        if video is None:
+            return None
+        if output is not None:
+            video = dict(video, width=output["width"], height=output["height"], fps=output.get("fps") or video.get("fps"))
+        audio = next((i["audio"] for i in infos if i.get("audio")), None)
+        return {
+            "key": None,
+            "video_codec": "h264",
+            "width": video["width"] - video["width"] % 2,
+            "height": video["height"] - video["height"] % 2,
+            "fps": video.get("fps") or 30.0,
+            "pix_fmt": "yuv420p",
+            "audio": {"codec": "aac", "sample_rate": audio.get("sample_rate") or 44100,
+                      "channels": min(2, audio.get("channels") or 2)} if audio else None,
+        }
+
+    def _plan_copy(self, segment: dict, cut: dict, fps: float, duration: float = None):
+        start, end = float(cut['start']), float(cut['end'])
+        try:
+            keyframes = self.keyframes(cut['source_path'])
+        except RuntimeError:
+            keyframes = []
+
+        # Copied packets cannot be trimmed: starting at an earlier keyframe would lengthen the cut,
+        # and past a later one B-frames reference frames beyond the cut. So only whole GOPs inside
+        # [start, end) are copied; a keyframe on the same frame as a cut point counts as on it.
+        tolerance = 0.5 / fps
+        i = bisect.bisect_left(keyframes, start - tolerance)
+        copy_start = keyframes[i] if i < len(keyframes) else None
+        if duration and end >= duration - tolerance:
+            copy_end = end  # Nothing follows the last frame of the source
+        else:
+            j = bisect.bisect_right(keyframes, end + tolerance)
+            copy_end = keyframes[j - 1] if j > 0 else None
+
+        if copy_start is None or copy_end is None or frame_span(copy_start, copy_end, fps) < 1:
+            segment["action"] = "encode"
+            segment["reason"] = "no whole GOP inside segment"
+            return
+        segment["copy_start"], segment["copy_end"] = copy_start, copy_end
+        head, tail = frame_span(start, copy_start, fps), frame_span(copy_end, end, fps)
+        if head or tail:
+            segment["action"] = "smart"
+            segment["reason"] = f"re-encode {head / fps:.2f}s head and {tail / fps:.2f}s tail around keyframes"
+        else:
+            segment["action"] = "copy"
+
+    @staticmethod
+    def shared_decode_groups(segments: list, max_gap: float = 1.0, max_outputs: int = 8) -> list:
+        """
+        Batch (segment, profile) pairs into units of work. Re-encoded ranges ("encode", and the head
+        of "smart") of the same source that overlap or lie within `max_gap` seconds of each other form
+        one unit, so that stretch of the source is decoded once for all of them (render_shared);
+        everything else is a unit of its own. Units keep the order of their first segment.
+        """
+        units, open_groups, ranged = [], {}, []
+        for pair in segments:
+            segment = pair[0]
+            start = float(segment["cut"]['start'])
+            end = segment["copy_start"] if segment["action"] == "smart" else float(segment["cut"]['end'])
+            if segment["action"] not in ("encode", "smart") or frame_span(start, end, pair[1]["fps"]) < 1:
+                units.append([pair])
+                continue
+            ranged.append((segment["cut"]['source_path'], start, end, pair))
+
+        for source, start, end, pair in sorted(ranged, key=lambda r: (r[0], r[1])):
+            group = open_groups.get(source)
+            if group is not None and start - group["end"] <= max_gap and len(group["unit"]) < max_outputs:
+                group["unit"].append(pair)
+                group["end"] = max(group["end"], end)
+            else:
+                open_groups[source] = {"unit": [pair], "end": end}
+                units.append(open_groups[source]["unit"])
+
+        order = {id(pair[0]): n for n, pair in enumerate(segments)}
+        return sorted(units, key=lambda unit: min(order[id(pair[0])] for pair in unit))
@@ -0,0 +1,161 @@
+import cv2
+import numpy as np
+
+
+class SceneDetector:
+    """
+    Shot-boundary detector working on a downsampled, frame-skipped decode.
+
+    Frames are sampled at `sample_fps` (skipped frames are only grab()bed, never converted),
+    shrunk by pixel striding to roughly `analysis_width` pixels wide and collected into blocks.
+    Each block is converted to HSV in a single cvtColor call and scored in NumPy:
+    - mean absolute H/S/V delta between consecutive samples (same 0-255 scale as
+      PySceneDetect's ContentDetector, so the usual threshold of ~30 applies)
+    - L1 distance between normalized HSV histograms (robust to camera/object motion)
+    """
+
+    HIST_BINS = (16, 8, 8)
+
+    def __init__(self, threshold: float = 30.0, sample_fps: float = 8.0, analysis_width: int = 160,
+                 block_size: int = 64, min_scene_len: float = 0.5):
+        self.threshold = threshold
+        self.sample_fps = sample_fps
+        self.analysis_width = analysis_width
+        self.block_size = block_size
+        self.min_scene_len = min_scene_len
+
+    def detect(self, video_path: str) -> list:
+        """
+        Returns scenes as [{"start", "end", "description"}] covering the whole clip.
+        """
+        cut_times, duration = self.detect_cuts(video_path)
+        return self.cuts_to_scenes(cut_times, duration)
+
+    @staticmethod
+    def cuts_to_scenes(cut_times, duration: float) -> list:
+        bounds = [0.0] + [float(t) for t in cut_times] + [float(duration)]
+        return [
+            {"start": round(bounds[i], 3), "end": round(bounds[i + 1], 3), "description": f"Scene {i + 1}"}
+            for i in range(len(bounds) - 1)
+        ]
+
+    def detect_cuts(self, video_path: str):
+        """
+        Returns (cut_times, duration). Cut times are the timestamps of the first sampled frame of each new shot.
+        """
+        times, scores, duration = self.score_video(video_path)
+        return self.pick_cuts(times, scores, duration), duration
+
+    def pick_cuts(self, times, scores, duration: float) -> list:
+        """Cut times from per-sample change scores: above `threshold`, at least `min_scene_len` apart."""
+        if len(scores) == 0:
+            return []
+        candidates = np.flatnonzero(np.asarray(scores) >= self.threshold)
+        cuts = []
+        last = 0.0
+        for idx in candidates:
+            t = float(times[idx])
+            if t - last >= self.min_scene_len and duration - t >= self.min_scene_len:
+                cuts.append(t)
+                last = t
+        return cuts
+
+    def score_video(self, video_path: str):
+        """
+        Decode the sampled frames and return (times, scores, duration), where scores[i] is the
+        change between consecutive samples and times[i] the time of the later one.
+        """
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            raise ValueError(f"Could not open video file: {video_path}")
+
+        try:
+            fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+            frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            duration = frame_count / fps if fps > 0 else 0.0
+            step = max(1, int(round(fps / self.sample_fps))) if self.sample_fps else 1
+
+            block, stride = None, 1
+            all_times, all_scores = [], []
+            prev_hsv, prev_hist = None, None
+            frame_idx = 0
+            eof = False
+
+            while not eof:
+                n, block_times = 0, []
+                while n < self.block_size:
+                    ok, frame = cap.read()
+                    if not ok:
+                        eof = True
+                        break
+                    if block is None:
+                        # Size the block from the first decoded frame, not the container header
+                        stride = max(1, frame.shape[1] // self.analysis_width)
+                        small = frame[::stride, ::stride]
+                        block = np.empty((self.block_size,) + small.shape, dtype=np.uint8)
+                    block[n] = frame[::stride, ::stride]
+                    block_times.append(frame_idx / fps)
+                    n += 1
+
+                    # Skip to the next sample without retrieving (no colour conversion)
+                    skipped = 0
+                    while skipped < step - 1 and cap.grab():
+                        skipped += 1
+                    frame_idx += 1 + skipped
+                    if skipped < step - 1:
+                        eof = True
+                        break
+
+                if n == 0:
+                    break
+
+                hsv, hist = self.block_features(block[:n])
+                if prev_hsv is not None:
+                    hsv = np.concatenate([prev_hsv[None], hsv])
+                    hist = np.concatenate([prev_hist[None], hist])
+                    times = block_times
+                else:
+                    times = block_times[1:]
+
+                if len(hsv) > 1:
+                    all_scores.append(self.score_pairs(hsv, hist))
+                    all_times.extend(times)
+
+                prev_hsv, prev_hist = hsv[-1], hist[-1]
+        finally:
+            cap.release()
+
+        if frame_idx and not duration:
+            duration = frame_idx / fps
+        if not all_scores:
+            return np.empty(0), np.empty(0), duration
+        return np.asarray(all_times), np.concatenate(all_scores), duration
+
+    def block_features(self, frames: np.ndarray):
+        """HSV pixels and normalized per-frame histograms for a block of BGR frames."""
+        n, h, w, _ = frames.shape
+        # One cvtColor call for the whole block by stacking frames vertically
+        hsv = cv2.cvtColor(frames.reshape(n * h, w, 3), cv2.COLOR_BGR2HSV).reshape(n, h, w, 3)
+
+        hb, sb, vb = self.HIST_BINS
+        hist = np.empty((n, hb + sb + vb), dtype=np.float32)
+        for i in range(n):
+            hist[i, :hb] = cv2.calcHist([hsv[i]], [0], None, [hb], [0, 180]).ravel()
+            hist[i, hb:hb + sb] = cv2.calcHist([hsv[i]], [1], None, [sb], [0, 256]).ravel()
+            hist[i, hb + sb:] = cv2.calcHist([hsv[i]], [2], None, [vb], [0, 256]).ravel()
+        hist /= float(h * w)
+        return hsv, hist
+
+    @staticmethod
+    def score_pairs(hsv: np.ndarray, hist: np.ndarray) -> np.ndarray:
+        """Change score between each consecutive pair of samples."""
+        flat = hsv.reshape(len(hsv), -1, 3)
+        delta = cv2.absdiff(flat[1:], flat[:-1])
+        # Hue is circular (0-179 in OpenCV), rescale to 0-255 like S and V
+        hue = np.minimum(delta[..., 0], 180 - delta[..., 0]).sum(axis=1, dtype=np.int64) * (255.0 / 90.0)
+        sat_val = delta[..., 1:].sum(axis=(1, 2), dtype=np.int64)
+        content = (hue + sat_val) / (3.0 * flat.shape[1])
+
+        # Histogram L1 distance is in [0, 6] (three normalized histograms); map to 0-255
+        hist_delta = np.abs(hist[1:] - hist[:-1]).sum(axis=1) * (255.0 / 6.0)
+        return 0.5 * content + 0.5 * hist_delta
@@ -0,0 +1,137 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+
+from backend.app.services.paths import CACHE_DIR
+
+# Timeline entry fields that do not change the rendered pixels/samples
+NON_RENDER_FIELDS = ("clip_id", "description", "source_path")
+
+
+class SegmentCache:
+    """
+    Rendered timeline parts, keyed by everything that determines their bytes: the source's content
+    hash, the render-relevant fields of the EDL entry (start, end, speed, filter, transition, ...),
+    the planned action and the output profile. Re-rendering an EDL where one cut changed only
+    encodes that entry; every other part is reused and re-joined.
+
+    Each entry is a directory `<cache_dir>/<key[:2]>/<key>/` holding the part files and a manifest.
+    Total size is bounded by `max_bytes` (RENDER_CACHE_MAX_MB, default 2048); least recently used
+    entries go first, with recency tracked through the manifest's mtime.
+    """
+
+    def __init__(self, cache_dir: str = os.path.join(CACHE_DIR, "segments"), max_bytes: int = None):
+        if max_bytes is None:
+            max_bytes = int(os.getenv("RENDER_CACHE_MAX_MB", "2048")) * 1024 * 1024
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(segment: dict, profile: dict, source_hash: str) -> str:
+        cut = {k: v for k, v in segment["cut"].items() if k not in NON_RENDER_FIELDS}
+        payload = json.dumps({
+            "source": source_hash,
+            "cut": cut,
+            "action": segment["action"],
+            "copy_start": segment.get("copy_start"),
+            "copy_end": segment.get("copy_end"),
+            "source_audio": segment.get("source_audio"),
+            "profile": profile,
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _entry_dir(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def get(self, key: str) -> list:
+        """Cached part paths for `key`, or None."""
+        manifest = os.path.join(self._entry_dir(key), "manifest.json")
+        try:
+            with open(manifest, "r") as f:
+                parts = [os.path.join(self._entry_dir(key), name) for name in json.load(f)["parts"]]
+        except (FileNotFoundError, ValueError, KeyError):
+            with self._lock:
+                self.misses += 1
+            return None
+        if not all(os.path.exists(p) for p in parts):
+            with self._lock:
+                self.misses += 1
+            return None
+        try:
+            os.utime(manifest)
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+        return parts
+
+    def put(self, key: str, parts: list) -> list:
+        """Move freshly rendered parts into the cache; returns their new paths."""
+        final_dir = self._entry_dir(key)
+        os.makedirs(os.path.dirname(final_dir), exist_ok=True)
+        tmp_dir = os.path.join(os.path.dirname(final_dir), f".{uuid.uuid4().hex}.tmp")
+        os.makedirs(tmp_dir)
+        names = []
+        for i, part in enumerate(parts):
+            name = f"part_{i}{os.path.splitext(part)[1]}"
+            shutil.move(part, os.path.join(tmp_dir, name))
+            names.append(name)
+        with open(os.path.join(tmp_dir, "manifest.json"), "w") as f:
+            json.dump({"parts": names, "created_at": time.time()}, f)
+
+        try:
+            os.rename(tmp_dir, final_dir)
+        except OSError:
+            # Another render stored the same segment first; theirs is identical
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            existing = self.get(key)
+            if existing is None:
+                raise
+            return existing
+        return [os.path.join(final_dir, name) for name in names]
+
+    def _entries(self):
+        for prefix in os.listdir(self.cache_dir):
+            prefix_dir = os.path.join(self.cache_dir, prefix)
+            if not os.path.isdir(prefix_dir):
+                continue
+            for key in os.listdir(prefix_dir):
+                entry_dir = os.path.join(prefix_dir, key)
+                manifest = os.path.join(entry_dir, "manifest.json")
+                if key.startswith(".") or not os.path.exists(manifest):
+                    continue
+                size = sum(os.path.getsize(os.path.join(entry_dir, n)) for n in os.listdir(entry_dir))
+                yield entry_dir, size, os.path.getmtime(manifest)
+
+    def evict(self, target_ratio: float = 0.9):
+        """Drop least recently used segments once the cache is over `max_bytes`."""
+        entries = sorted(self._entries(), key=lambda e: e[2])
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_bytes:
+            return
+        target = self.max_bytes * target_ratio
+        for entry_dir, size, _ in entries:
+            if total <= target:
+                break
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            total -= size
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "max_bytes": self.max_bytes,
+        }
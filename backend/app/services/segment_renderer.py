@@ -0,0 +1,414 @@
+try:
+    from moviepy.editor import VideoFileClip, vfx
+except ImportError:
+    # Fallback for MoviePy v2.0+
+    from moviepy import VideoFileClip, vfx
+from proglog import ProgressBarLogger
+import os
+import time
+
+from backend.app.services.effects import FramePipeline
+from backend.app.services.ffmpeg_tools import run_ffmpeg, probe_streams
+from backend.app.services.render_planner import frame_span
+
+# Encoder settings per render quality. Final re-encodes inside the fast path only cover short
+# boundary pieces, so keep them near-lossless; previews trade quality for speed.
+RENDER_QUALITY = {
+    "final": {"preset": "veryfast", "crf": 18},
+    "preview": {"preset": "ultrafast", "crf": 30},
+}
+
+
+def part_encode_args(profile: dict) -> list:
+    """libx264 arguments for a part. No B-frames, so parts start at dts 0 and join cleanly after the previous part."""
+    quality = RENDER_QUALITY["final"]
+    args = ["-c:v", "libx264", "-preset", profile.get("preset", quality["preset"])]
+    if profile.get("video_bitrate"):
+        args += ["-b:v", str(profile["video_bitrate"])]
+    else:
+        args += ["-crf", str(profile.get("crf", quality["crf"]))]
+    if profile.get("threads"):
+        args += ["-threads", str(profile["threads"])]
+    return args + ["-bf", "0"]
+
+
+def scale_filter(profile: dict) -> str:
+    """ffmpeg filter fitting any source into the profile geometry ("crop" fills, "pad" letterboxes)."""
+    w, h = profile["width"], profile["height"]
+    if profile.get("fit") == "crop":
+        return f"scale={w}:{h}:force_original_aspect_ratio=increase,crop={w}:{h},setsar=1"
+    return f"scale={w}:{h}:force_original_aspect_ratio=decrease,pad={w}:{h}:(ow-iw)/2:(oh-ih)/2,setsar=1"
+
+
+class ProgressLogger(ProgressBarLogger):
+    """Forwards MoviePy's frame-writing progress bar to a callback(fraction)."""
+
+    def __init__(self, callback):
+        super().__init__()
+        # Not `self.callback`: proglog calls that with every log message
+        self.progress_callback = callback
+
+    def bars_callback(self, bar, attr, value, old_value=None):
+        # The video frame bar is 't' in MoviePy 1 and 'frame_index' in v2; 'chunk' (audio) is ignored
+        if bar in ('t', 'frame_index') and attr == 'index':
+            total = self.bars[bar].get('total') or 0
+            if total and self.progress_callback:
+                self.progress_callback(min(1.0, (value + 1) / total))
+
+
+class RenderAborted(Exception):
+    """Raised inside a pool worker when the render its segment belongs to was abandoned."""
+
+
+class FileProgress:
+    """
+    Picklable progress callback for segments rendered in pool workers: the latest fraction goes to a
+    small file (throttled, replaced atomically) that the parent process polls, like JobContext does.
+    Once `cancel_path` exists every call raises RenderAborted, so the encode in progress is killed
+    (see run_ffmpeg) instead of running to the end.
+    """
+
+    def __init__(self, path: str, interval: float = 0.25, cancel_path: str = None):
+        self.path = path
+        self.interval = interval
+        self.cancel_path = cancel_path
+        self._last_write = 0.0
+
+    def __call__(self, fraction: float):
+        if self.cancel_path and os.path.exists(self.cancel_path):
+            raise RenderAborted(f"Render abandoned: {self.cancel_path}")
+        now = time.monotonic()
+        if fraction < 1.0 and now - self._last_write < self.interval:
+            return
+        self._last_write = now
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as f:
+            f.write(f"{fraction:.4f}")
+        os.replace(tmp, self.path)
+
+    @staticmethod
+    def read(path: str) -> float:
+        try:
+            with open(path, "r") as f:
+                return float(f.read() or 0.0)
+        except (OSError, ValueError):
+            return 0.0
+
+
+def build_clip(cut: dict, output: dict = None, pool=None):
+    """
+    Load one timeline entry and apply its effects.
+    With `output` ({"width", "height", "fit"}) frames are also fitted to that size in the same pass.
+    With a DecoderPool the source is shared with other cuts (and closed by the pool), otherwise the
+    clip owns its reader.
+    """
+    source_path = cut['source_path']
+    start = cut['start']
+    end = cut['end']
+
+    # Load Clip
+    if pool is not None:
+        clip = pool.subclip(source_path, start, end)
+    else:
+        source = VideoFileClip(source_path)
+        clip = source.subclip(start, end) if hasattr(source, 'subclip') else source.subclipped(start, end)
+
+    # --- APPLY EFFECTS ---
+
+    # 1. Speed Ramping
+    if 'speed' in cut:
+        speed = getattr(clip, 'speedx', None) or clip.with_speed_scaled  # MoviePy v1 / v2
+        clip = speed(cut['speed'])
+
+    # 2. Colour grade (saturation/contrast/brightness/B&W), Ken Burns zoom and the resize to the
+    # output size, fused into one vectorized pass per frame (see FramePipeline)
+    output_size = (output["width"], output["height"]) if output else None
+    pipeline = FramePipeline.from_cut(cut, clip.size, output_size, (output or {}).get("fit") or "pad")
+    if pipeline is not None:
+        transform = getattr(clip, 'fl', None) or clip.transform  # MoviePy v1 / v2
+        clip = transform(lambda get_frame, t: pipeline.apply(get_frame(t), t))
+
+    # 3. Transitions (Fades)
+    if cut.get('transition') == 'fade_in':
+        clip = clip.fadein(0.5) if hasattr(clip, 'fadein') else clip.with_effects([vfx.FadeIn(0.5)])
+    elif cut.get('transition') == 'fade_out':
+        clip = clip.fadeout(0.5) if hasattr(clip, 'fadeout') else clip.with_effects([vfx.FadeOut(0.5)])
+
+    return clip
+
+
+def _silence_source(audio: dict) -> str:
+    layout = 'mono' if audio['channels'] == 1 else 'stereo'
+    return f"anullsrc=r={audio['sample_rate']}:cl={layout}"
+
+
+def part_duration(start: float, end: float, fps: float) -> float:
+    """
+    Length of the part rendered for [start, end): whole frames (see frame_span), so its audio can end
+    exactly where its video does. The concat demuxer places each part after the longer stream of the
+    previous one, so any audio overhang would open a gap in the video.
+    """
+    return max(1, frame_span(start, end, fps)) / fps
+
+
+def _fit_audio(duration: float) -> str:
+    """Audio filter padding with silence or cutting to exactly `duration`."""
+    return f"apad=whole_dur={duration:.6f},atrim=duration={duration:.6f}"
+
+
+def _audio_args(audio: dict, duration: float) -> list:
+    """AAC conformed to the profile, exactly `duration` long."""
+    return ["-af", _fit_audio(duration), "-c:a", "aac", "-ar", str(audio["sample_rate"]), "-ac", str(audio["channels"])]
+
+
+def copy_part(source: str, start: float, end: float, profile: dict, part: str):
+    """
+    Copy the video packets of the whole GOPs between the keyframes at `start` and `end` (see
+    RenderPlanner). They are counted out in frames: with B-frames, a time limit on copied packets
+    (which goes by decode time) lets frames from past `end` through. Audio packets do not end on
+    frame boundaries, so audio is re-encoded (cheap) to exactly the same length.
+    """
+    duration = part_duration(start, end, profile["fps"])
+    args = ["-ss", f"{start:.6f}", "-i", source, "-map", "0:v:0", "-c:v", "copy",
+            "-frames:v", str(frame_span(start, end, profile["fps"]))]
+    if profile["audio"]:
+        args += ["-map", "0:a:0"] + _audio_args(profile["audio"], duration)
+    else:
+        args += ["-an"]
+    run_ffmpeg(args + [part])
+
+
+def encode_part(source: str, start: float, end: float, profile: dict, part: str, has_source_audio: bool = True,
+                progress_callback=None) -> int:
+    """Re-encode [start, end) of a source with ffmpeg, conformed to `profile`. Returns the frames encoded."""
+    audio = profile["audio"]
+    duration = part_duration(start, end, profile["fps"])
+
+    args = ["-ss", f"{start:.6f}", "-t", f"{end - start:.6f}", "-i", source]
+    if audio and not has_source_audio:
+        args += ["-f", "lavfi", "-t", f"{end - start:.6f}", "-i", _silence_source(audio)]
+    args += [
+        "-map", "0:v:0",
+        "-vf", scale_filter(profile),
+        "-r", str(profile["fps"]), "-pix_fmt", profile["pix_fmt"] or "yuv420p", "-t", f"{duration:.6f}",
+    ] + part_encode_args(profile)
+    if audio:
+        args += ["-map", "1:a:0" if not has_source_audio else "0:a:0"] + _audio_args(audio, duration)
+    else:
+        args += ["-an"]
+
+    frames = [0]
+
+    def on_progress(info):
+        frames[0] = info["frames"]
+        if progress_callback and info["fraction"] is not None:
+            progress_callback(info["fraction"])
+
+    run_ffmpeg(args + [part], on_progress=on_progress, duration=end - start)
+    return frames[0]
+
+
+def encode_parts_shared(source: str, start: float, end: float, outputs: list, has_source_audio: bool = True,
+                        progress_callback=None) -> list:
+    """
+    Re-encode several ranges of one source with a single ffmpeg call: [start, end) is decoded once
+    and split into every output, each trimmed to its own range and conformed to its own profile.
+    `outputs`: [{"start", "end", "profile", "part"}] with absolute source times inside [start, end).
+    Returns the frames encoded per output.
+    """
+    args = ["-ss", f"{start:.6f}", "-t", f"{end - start:.6f}", "-i", source]
+    n = len(outputs)
+    graph = [f"[0:v]split={n}" + "".join(f"[s{i}]" for i in range(n))] if n > 1 else []
+    with_audio = [i for i, o in enumerate(outputs) if o["profile"]["audio"] and has_source_audio]
+    if len(with_audio) > 1:
+        graph.append(f"[0:a]asplit={len(with_audio)}" + "".join(f"[t{i}]" for i in with_audio))
+    durations = [part_duration(o["start"], o["end"], o["profile"]["fps"]) for o in outputs]
+    for i, o in enumerate(outputs):
+        offset, length = o["start"] - start, o["end"] - o["start"]
+        video_in = f"[s{i}]" if n > 1 else "[0:v]"
+        graph.append(f"{video_in}trim=start={offset:.6f}:end={offset + length:.6f},setpts=PTS-STARTPTS,"
+                     f"{scale_filter(o['profile'])}[v{i}]")
+        fit = _fit_audio(durations[i])
+        if i in with_audio:
+            audio_in = f"[t{i}]" if len(with_audio) > 1 else "[0:a]"
+            graph.append(f"{audio_in}atrim=start={offset:.6f}:end={offset + length:.6f},asetpts=PTS-STARTPTS,"
+                         f"{fit}[a{i}]")
+        elif o["profile"]["audio"]:
+            graph.append(f"{_silence_source(o['profile']['audio'])},{fit}[a{i}]")
+    args += ["-filter_complex", ";".join(graph)]
+
+    for i, o in enumerate(outputs):
+        profile, audio = o["profile"], o["profile"]["audio"]
+        args += ["-map", f"[v{i}]", "-r", str(profile["fps"]), "-pix_fmt", profile["pix_fmt"] or "yuv420p",
+                 "-t", f"{durations[i]:.6f}"]
+        args += part_encode_args(profile)
+        if audio:
+            args += ["-map", f"[a{i}]", "-c:a", "aac", "-ar", str(audio["sample_rate"]), "-ac", str(audio["channels"])]
+        else:
+            args += ["-an"]
+        args += [o["part"]]
+
+    def on_progress(info):
+        if progress_callback and info["fraction"] is not None:
+            progress_callback(info["fraction"])
+
+    # Outputs advance together with the decode, so the longest one tracks overall progress
+    run_ffmpeg(args, on_progress=on_progress, duration=max(o["end"] - o["start"] for o in outputs))
+    return [int(round(d * o["profile"]["fps"])) for d, o in zip(durations, outputs)]
+
+
+def conform_audio(raw: str, profile: dict, part: str, duration: float):
+    """Copy video, re-encode (or synthesize silent) audio so it matches the target profile, both `duration` long."""
+    audio = profile["audio"]
+    if not audio:
+        run_ffmpeg(["-i", raw, "-map", "0:v:0", "-c", "copy", "-an", "-t", f"{duration:.6f}", part])
+        return
+    has_audio = bool(probe_streams(raw).get("audio"))
+    args = ["-i", raw]
+    if not has_audio:
+        args += ["-f", "lavfi", "-i", _silence_source(audio)]
+    args += ["-map", "0:v:0", "-map", "0:a:0" if has_audio else "1:a:0", "-c:v", "copy", "-t", f"{duration:.6f}"]
+    run_ffmpeg(args + _audio_args(audio, duration) + [part])
+
+
+def effects_part(cut: dict, profile: dict, raw: str, part: str, progress_callback=None) -> dict:
+    """
+    Render a timeline entry with effects through MoviePy, conformed to `profile`.
+    Returns {"frames", "timings": {"clip_load", "effects_encode"}}.
+    """
+    started = time.perf_counter()
+    clip = build_clip(cut, profile)
+    loaded = time.perf_counter()
+    try:
+        frames = int(round(clip.duration * profile["fps"]))
+        audio = profile["audio"]
+        clip.write_videofile(
+            raw, fps=profile["fps"], codec='libx264', audio_codec='aac',
+            audio_fps=audio["sample_rate"] if audio else 44100,
+            audio=audio is not None,
+            preset=profile.get("preset", RENDER_QUALITY["final"]["preset"]),
+            threads=profile.get("threads") or None,
+            ffmpeg_params=["-pix_fmt", profile["pix_fmt"] or "yuv420p"] + (
+                ["-b:v", str(profile["video_bitrate"])] if profile.get("video_bitrate")
+                else ["-crf", str(profile.get("crf", RENDER_QUALITY["final"]["crf"]))]),
+            logger=ProgressLogger(progress_callback),
+        )
+    finally:
+        clip.close()
+    encoded = time.perf_counter()
+    conform_audio(raw, profile, part, frames / profile["fps"])
+    return {"frames": frames, "timings": {"clip_load": round(loaded - started, 3),
+                                          "effects_encode": round(encoded - loaded, 3)}}
+
+
+def render_segment(segment: dict, profile: dict, work_dir: str, progress_callback=None) -> dict:
+    """
+    Render one planned segment to one or two MP4 parts matching `profile`.
+    Module-level so it can run in a worker process.
+    Returns {"index", "action", "parts", "seconds", "frames" (re-encoded), "bytes"} plus "timings" for effects.
+    """
+    started = time.perf_counter()
+    cut = segment["cut"]
+    source = cut['source_path']
+    start, end = float(cut['start']), float(cut['end'])
+    base = os.path.join(work_dir, f"part_{segment['index']:04d}")
+    action = segment["action"]
+    result = {"index": segment["index"], "action": action, "frames": 0}
+
+    if action == "copy":
+        parts = [f"{base}.mp4"]
+        copy_part(source, segment["copy_start"], segment["copy_end"], profile, parts[0])
+    elif action == "smart":
+        # The re-encoded head and tail are the slow parts (progress is split by their length);
+        # the copied GOPs between them are near-instant
+        head, tail = max(0.0, segment["copy_start"] - start), max(0.0, end - segment["copy_end"])
+        share = head / (head + tail) if head + tail > 0 else 1.0
+        parts = []
+        if frame_span(start, segment["copy_start"], profile["fps"]) > 0:
+            parts.append(f"{base}_head.mp4")
+            result["frames"] = encode_part(source, start, segment["copy_start"], profile, parts[0],
+                                           segment.get("source_audio", True), _scaled(progress_callback, 0.0, share))
+        result["frames"] += _smart_rest(segment, profile, base, parts,
+                                        _scaled(progress_callback, share, 1.0 - share))
+    elif action == "encode":
+        parts = [f"{base}.mp4"]
+        result["frames"] = encode_part(source, start, end, profile, parts[0], segment.get("source_audio", True),
+                                       progress_callback)
+    else:
+        parts = [f"{base}.mp4"]
+        result.update(effects_part(cut, profile, f"{base}_raw.mp4", parts[0], progress_callback))
+
+    result["parts"] = parts
+    result["bytes"] = sum(os.path.getsize(p) for p in parts)
+    result["seconds"] = round(time.perf_counter() - started, 3)
+    return result
+
+
+def _scaled(callback, offset: float, share: float):
+    """Progress callback for one step that makes up `share` of the work, after `offset` of it is done."""
+    if callback is None:
+        return None
+    return lambda p: callback(offset + share * p)
+
+
+def _smart_rest(segment: dict, profile: dict, base: str, parts: list, progress_callback=None) -> int:
+    """
+    Render what follows the head of a "smart" segment: its copied GOPs, then its re-encoded tail
+    if it ends between keyframes. Appends the part paths to `parts`; returns the frames re-encoded.
+    """
+    cut = segment["cut"]
+    source, end = cut['source_path'], float(cut['end'])
+    parts.append(f"{base}_copy.mp4")
+    copy_part(source, segment["copy_start"], segment["copy_end"], profile, parts[-1])
+    if frame_span(segment["copy_end"], end, profile["fps"]) < 1:
+        return 0
+    parts.append(f"{base}_tail.mp4")
+    return encode_part(source, segment["copy_end"], end, profile, parts[-1], segment.get("source_audio", True),
+                       progress_callback)
+
+
+def render_shared(segments: list, work_dir: str, progress_callback=None) -> list:
+    """
+    Render a group of planned segments whose re-encoded ranges come from one stretch of one source
+    (see RenderPlanner.shared_decode_groups) with a single decode. `segments` is a list of
+    (segment, profile) pairs; profiles may differ (e.g. variants with different output profiles).
+    Returns one render_segment-style result per segment; "seconds" splits the group time by frames.
+    """
+    started = time.perf_counter()
+    source = segments[0][0]["cut"]['source_path']
+    outputs, results = [], []
+    for segment, profile in segments:
+        cut = segment["cut"]
+        base = os.path.join(work_dir, f"part_{segment['index']:04d}")
+        # Only "encode" and "smart" segments are grouped; "smart" re-encodes just its head
+        end = segment["copy_start"] if segment["action"] == "smart" else float(cut['end'])
+        part = f"{base}_head.mp4" if segment["action"] == "smart" else f"{base}.mp4"
+        outputs.append({"start": float(cut['start']), "end": end, "profile": profile, "part": part})
+        results.append({"index": segment["index"], "action": segment["action"], "parts": [part],
+                        "shared_decode": len(segments)})
+
+    start = min(o["start"] for o in outputs)
+    end = max(o["end"] for o in outputs)
+    frames = encode_parts_shared(source, start, end, outputs, segments[0][0].get("source_audio", True),
+                                 progress_callback)
+    for (segment, profile), result, count in zip(segments, results, frames):
+        if segment["action"] == "smart":
+            # The shared pass already reported the group done; the callback still lets tails be aborted
+            count += _smart_rest(segment, profile, os.path.join(work_dir, f"part_{segment['index']:04d}"),
+                                 result["parts"], _scaled(progress_callback, 1.0, 0.0))
+        result["frames"] = count
+        result["bytes"] = sum(os.path.getsize(p) for p in result["parts"])
+
+    elapsed = time.perf_counter() - started
+    total = sum(frames) or 1
+    for result, count in zip(results, frames):
+        result["seconds"] = round(elapsed * count / total, 3)
+    return results
+
+
+def render_unit(unit: list, work_dir: str, progress_callback=None) -> list:
+    """One unit of RenderPlanner.shared_decode_groups: a single segment, or a shared-decode group."""
+    if len(unit) == 1:
+        segment, profile = unit[0]
+        return [render_segment(segment, profile, work_dir, progress_callback)]
+    return render_shared(unit, work_dir, progress_callback)
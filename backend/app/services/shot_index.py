@@ -0,0 +1,368 @@
+import fcntl
+import importlib.util
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+from backend.app.services.ffmpeg_tools import decode_video_frames
+from backend.app.services.paths import DATA_DIR
+
+DEFAULT_CLIP_MODEL = "openai/clip-vit-base-patch32"
+# Rows scored per matrix product, so a search over a large library pages the memmap in bounded chunks
+SEARCH_CHUNK_ROWS = 65536
+
+_shot_index = None
+_shot_index_lock = threading.Lock()
+
+
+def get_shot_index() -> "ShotIndex":
+    """Per-process shared index, so a job worker loads the embedding model once."""
+    global _shot_index
+    if _shot_index is None:
+        with _shot_index_lock:
+            if _shot_index is None:
+                _shot_index = ShotIndex()
+    return _shot_index
+
+
+def get_embedder(name: str = None):
+    """
+    Embedder by name (SHOT_EMBEDDER: "clip", the default, or "color"). "clip" falls back to the
+    colour embedder when torch or transformers is not installed.
+    """
+    name = name or os.getenv("SHOT_EMBEDDER", "clip")
+    if name == "clip":
+        missing = [m for m in ("torch", "transformers") if importlib.util.find_spec(m) is None]
+        if missing:
+            print(f"⚠️ {', '.join(missing)} not installed; indexing shots by colour instead of CLIP")
+            return ColorEmbedder()
+        return ClipEmbedder()
+    if name == "color":
+        return ColorEmbedder()
+    raise ValueError(f"Unknown shot embedder: {name}")
+
+
+def _normalized(vectors) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+
+class ClipEmbedder:
+    """
+    CLIP image and text embeddings on CPU. transformers/torch and the model weights
+    (SHOT_EMBEDDER_MODEL, default openai/clip-vit-base-patch32) are loaded on first use; weights that
+    are not in the Hugging Face cache yet are downloaded then (about 600 MB for the default model),
+    so the first analysis of a fresh install waits for it. Fetch them ahead of time, or use
+    SHOT_EMBEDDER=color, on machines without network access.
+    """
+
+    def __init__(self, model_name: str = None):
+        self.model_name = model_name or os.getenv("SHOT_EMBEDDER_MODEL", DEFAULT_CLIP_MODEL)
+        self.name = f"clip:{self.model_name}"
+        # Cosine similarity of a caption with an image it describes; unrelated pairs score around 0.15-0.2
+        self.min_score = 0.25
+        self._model = None
+        self._processor = None
+
+    def _load(self):
+        if self._model is None:
+            from transformers import CLIPModel, CLIPProcessor
+
+            self._processor = CLIPProcessor.from_pretrained(self.model_name)
+            self._model = CLIPModel.from_pretrained(self.model_name).eval()
+        return self._model, self._processor
+
+    def embed_images(self, frames: np.ndarray) -> np.ndarray:
+        """(n, h, w, 3) RGB uint8 -> (n, dim) unit vectors."""
+        import torch
+
+        model, processor = self._load()
+        with torch.no_grad():
+            inputs = processor(images=list(frames), return_tensors="pt")
+            return _normalized(model.get_image_features(**inputs).numpy())
+
+    def embed_text(self, texts: list) -> np.ndarray:
+        import torch
+
+        model, processor = self._load()
+        with torch.no_grad():
+            inputs = processor(text=list(texts), return_tensors="pt", padding=True, truncation=True)
+            return _normalized(model.get_text_features(**inputs).numpy())
+
+
+# RGB of the colour words ColorEmbedder understands
+COLOR_WORDS = {
+    "black": (0, 0, 0), "white": (255, 255, 255), "gray": (128, 128, 128), "grey": (128, 128, 128),
+    "red": (255, 0, 0), "green": (0, 128, 0), "blue": (0, 0, 255), "yellow": (255, 255, 0),
+    "orange": (255, 165, 0), "purple": (128, 0, 128), "pink": (255, 192, 203),
+}
+
+
+class ColorEmbedder:
+    """
+    Deterministic local stand-in for CLIP (tests, offline setups): an image is its coarse RGB
+    histogram (4 levels per channel), a text query the histogram of the colour words it contains.
+    """
+
+    name = "color-histogram"
+    levels = 4
+    min_score = 0.5
+
+    def embed_images(self, frames: np.ndarray) -> np.ndarray:
+        frames = np.asarray(frames)
+        dim = self.levels ** 3
+        bins = self._bins(frames[..., 0], frames[..., 1], frames[..., 2]).reshape(len(frames), -1)
+        # One bincount for the whole batch: each frame gets its own range of `dim` bins
+        offsets = (np.arange(len(frames)) * dim)[:, None]
+        counts = np.bincount((bins + offsets).ravel(), minlength=len(frames) * dim)
+        return _normalized(counts.reshape(len(frames), dim))
+
+    def embed_text(self, texts: list) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.levels ** 3), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for word in text.lower().replace(",", " ").split():
+                if word in COLOR_WORDS:
+                    vectors[i, self._bins(*(np.array(c) for c in COLOR_WORDS[word]))] += 1.0
+        return _normalized(vectors)
+
+    def _bins(self, r, g, b):
+        shift = 8 - int(np.log2(self.levels))
+        r, g, b = (np.asarray(c, dtype=np.int64) >> shift for c in (r, g, b))
+        return (r * self.levels + g) * self.levels + b
+
+
+class ShotIndex:
+    """
+    Library-wide index of shots (scenes of the analyzed videos) for text queries like "sunset".
+
+    Each shot is represented by up to `keyframes_per_shot` keyframes, sampled by one downsampled
+    decode of the video and embedded in batches of `batch_size`. The unit vectors live in one
+    float32 matrix on disk (`vectors.f32`, opened as a read-only memmap) with one row per keyframe,
+    and `shots.json` maps rows back to (file id, path, start, end). A query is one text embedding
+    and a chunked matrix-vector product over the memmap; a shot scores its best keyframe.
+
+    Rows are only ever appended, under an exclusive file lock, so several worker processes can
+    index at once; a video is decoded and embedded before the lock is taken, so it is only held
+    for the append. The metadata file is replaced atomically after the rows are written, so readers
+    never see rows without their shots. An index built with another embedder is discarded.
+    """
+
+    def __init__(self, index_dir: str = os.path.join(DATA_DIR, "shots"), embedder=None, keyframes_per_shot: int = 3,
+                 sample_fps: float = 2.0, analysis_width: int = 320, batch_size: int = 32, min_score: float = None):
+        """`min_score` (SHOT_MIN_SCORE, default per embedder): similarity a shot needs to count as a match."""
+        self.index_dir = index_dir
+        self.embedder = embedder if embedder is not None else get_embedder()
+        if min_score is None:
+            min_score = float(os.getenv("SHOT_MIN_SCORE", getattr(self.embedder, "min_score", 0.0)))
+        self.min_score = min_score
+        self.keyframes_per_shot = keyframes_per_shot
+        self.sample_fps = sample_fps
+        self.analysis_width = analysis_width
+        self.batch_size = batch_size
+        os.makedirs(index_dir, exist_ok=True)
+        self.vectors_path = os.path.join(index_dir, "vectors.f32")
+        self.meta_path = os.path.join(index_dir, "shots.json")
+        self._meta_stamp = None
+        self._vectors = None
+        self._load()
+
+    # --- Storage ---
+
+    def _load(self):
+        """(Re)read the metadata when another process has changed it."""
+        try:
+            st = os.stat(self.meta_path)
+            stamp = (st.st_ino, st.st_mtime_ns)  # every write replaces the file, so the inode changes
+        except FileNotFoundError:
+            stamp = None
+        if stamp is not None and stamp == self._meta_stamp:
+            return
+        meta = {}
+        if stamp is not None:
+            with open(self.meta_path) as f:
+                meta = json.load(f)
+        self._set_state(meta, stamp)
+
+    def _set_state(self, meta: dict, stamp):
+        if meta.get("embedder") != self.embedder.name:
+            meta = {}
+        self.dim = meta.get("dim")
+        self.rows = meta.get("rows", 0)
+        self.shots = meta.get("shots", [])
+        self._first_rows = np.array([shot["first_row"] for shot in self.shots], dtype=np.int64)
+        self._shot_assets = np.array([shot["file_id"] for shot in self.shots], dtype=object)
+        self._meta_stamp = stamp
+        self._vectors = None
+
+    def _matrix(self) -> np.ndarray:
+        if self._vectors is None:
+            if os.path.getsize(self.vectors_path) < self.rows * self.dim * 4:
+                # The matrix was just rewritten (remove_asset) and its metadata is being replaced
+                self._meta_stamp = None
+                self._load()
+            self._vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(self.rows, self.dim))
+        return self._vectors
+
+    @contextmanager
+    def _locked(self):
+        with open(os.path.join(self.index_dir, ".lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                self._load()
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _write_meta(self, shots: list, rows: int, dim: int):
+        meta = {"embedder": self.embedder.name, "dim": dim, "rows": rows, "shots": shots}
+        tmp_path = f"{self.meta_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(json.dumps(meta))  # the C encoder; json.dump streams through the pure-Python one
+        os.replace(tmp_path, self.meta_path)
+        st = os.stat(self.meta_path)
+        self._set_state(meta, (st.st_ino, st.st_mtime_ns))
+
+    def append(self, shots: list, vectors: np.ndarray):
+        """
+        Add shots ({"file_id", "path", "start", "end", "keyframes"}) and their keyframe vectors, in
+        order: shot i owns the next shots[i]["keyframes"] rows.
+        """
+        with self._locked():
+            self._append(shots, vectors)
+
+    def _append(self, shots: list, vectors: np.ndarray):
+        vectors = _normalized(vectors)
+        if not self.shots:
+            self.dim, self.rows = vectors.shape[1], 0
+        elif vectors.shape[1] != self.dim:
+            raise ValueError(f"Expected {self.dim}-dimensional vectors, got {vectors.shape[1]}")
+        first_row = self.rows
+        records = []
+        for shot in shots:
+            records.append(dict(shot, first_row=first_row))
+            first_row += shot["keyframes"]
+        if first_row != self.rows + len(vectors):
+            raise ValueError("Keyframe counts do not match the number of vectors")
+
+        with open(self.vectors_path, "ab" if os.path.exists(self.vectors_path) else "wb") as f:
+            f.truncate(self.rows * self.dim * 4)  # rows of an interrupted write are not in the metadata
+            f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+        self._write_meta(self.shots + records, first_row, self.dim)
+
+    # --- Indexing ---
+
+    def has_asset(self, file_id: str) -> bool:
+        self._load()
+        return any(shot["file_id"] == file_id for shot in self.shots)
+
+    def add_video(self, file_id: str, path: str, scenes: list) -> int:
+        """
+        Index the shots of a video (AssetAnalyzer.detect_scenes output). Returns the number of shots
+        added; 0 when the file id is already indexed.
+        """
+        if self.has_asset(file_id):
+            return 0
+        shots, vectors = self._embed_keyframes(file_id, path, scenes)
+        with self._locked():
+            # Another worker may have indexed the same file meanwhile
+            if any(shot["file_id"] == file_id for shot in self.shots):
+                return 0
+            if shots:
+                self._append(shots, vectors)
+        print(f"🔎 Indexed {len(shots)} shots of {os.path.basename(path)}")
+        return len(shots)
+
+    def _embed_keyframes(self, file_id: str, path: str, scenes: list):
+        """
+        Shots and their keyframe vectors (in shot order), from one decode at `sample_fps`: each shot
+        gets up to keyframes_per_shot samples spread evenly over it, at least one. Keyframes are
+        embedded as soon as a batch is full, so memory stays bounded by one batch of thumbnails.
+        """
+        wanted, shots = [], []
+        for scene in scenes:
+            start, end = float(scene["start"]), float(scene["end"])
+            count = max(1, min(self.keyframes_per_shot, int((end - start) * self.sample_fps)))
+            frames = sorted({int(round((start + (i + 0.5) * (end - start) / count) * self.sample_fps))
+                             for i in range(count)})
+            wanted.extend(frames)
+            shots.append({"file_id": file_id, "path": path, "start": round(start, 3), "end": round(end, 3),
+                          "keyframes": len(frames)})
+
+        picked, vectors, position, last = [], [], 0, None
+        for times, frames in decode_video_frames(path, self.sample_fps, self.analysis_width):
+            first = int(round(times[0] * self.sample_fps))
+            while position < len(wanted) and wanted[position] < first + len(frames):
+                picked.append(frames[max(0, wanted[position] - first)][..., ::-1])  # BGR -> RGB
+                position += 1
+                if len(picked) == self.batch_size:
+                    vectors.append(self.embedder.embed_images(np.stack(picked)))
+                    picked = []
+            last = frames[-1]
+        # Samples past the last decoded frame (rounding at the very end of the clip)
+        picked.extend(last[..., ::-1] for _ in range(len(wanted) - position))
+        if picked:
+            vectors.append(self.embedder.embed_images(np.stack(picked)))
+        return shots, np.concatenate(vectors) if vectors else None
+
+    def remove_asset(self, file_id: str) -> int:
+        """Drop a file's shots (rewrites the matrix without their rows). Returns the number removed."""
+        with self._locked():
+            keep = [shot for shot in self.shots if shot["file_id"] != file_id]
+            removed = len(self.shots) - len(keep)
+            if not removed:
+                return 0
+            matrix = self._matrix()
+            records, rows, first_row = [], [], 0
+            for shot in keep:
+                rows.append(matrix[shot["first_row"]:shot["first_row"] + shot["keyframes"]])
+                records.append(dict(shot, first_row=first_row))
+                first_row += shot["keyframes"]
+            tmp_path = f"{self.vectors_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                for block in rows:
+                    f.write(np.ascontiguousarray(block).tobytes())
+            os.replace(tmp_path, self.vectors_path)
+            self._write_meta(records, first_row, self.dim)
+        return removed
+
+    # --- Queries ---
+
+    def search(self, query, k: int = 10, file_ids: list = None, min_score: float = None) -> list:
+        """
+        Top-k shots for a text query (or a query vector), best first:
+        [{"file_id", "path", "start", "end", "score"}]; `file_ids` restricts the search to those files,
+        `min_score` drops shots scoring below it. A query the embedder maps to nothing (no colour word
+        for ColorEmbedder) matches no shot.
+        """
+        self._load()
+        if not self.shots or k <= 0:
+            return []
+        q = self.embedder.embed_text([query]) if isinstance(query, str) else _normalized(np.atleast_2d(query))
+        if not q.any():
+            return []
+        vectors = self._matrix()
+        scores = np.empty(self.rows, dtype=np.float32)
+        for start in range(0, self.rows, SEARCH_CHUNK_ROWS):
+            scores[start:start + SEARCH_CHUNK_ROWS] = vectors[start:start + SEARCH_CHUNK_ROWS] @ q[0]
+        # Rows of a shot are contiguous: its score is the best of its keyframes
+        best = np.maximum.reduceat(scores, self._first_rows)
+        if file_ids is not None:
+            best[~np.isin(self._shot_assets, list(file_ids))] = -np.inf
+        if min_score is not None:
+            best[best < min_score] = -np.inf
+        k = min(k, int(np.isfinite(best).sum()))
+        if k == 0:
+            return []
+        top = np.argpartition(-best, k - 1)[:k]
+        top = top[np.argsort(-best[top], kind="stable")]
+        return [{"file_id": self.shots[i]["file_id"], "path": self.shots[i]["path"], "start": self.shots[i]["start"],
+                 "end": self.shots[i]["end"], "score": round(float(best[i]), 4)} for i in top]
+
+    def stats(self) -> dict:
+        self._load()
+        return {"embedder": self.embedder.name, "shots": len(self.shots), "keyframes": self.rows,
+                "files": len(set(self._shot_assets)), "dim": self.dim}
@@ -0,0 +1,127 @@
+import numpy as np
+
+from backend.app.services.ffmpeg_tools import decode_video_frames, probe_streams
+from backend.app.services.scene_detector import SceneDetector
+
+# Shot length histogram edges (seconds); the last bucket is open-ended
+ASL_BINS = (0.0, 1.0, 2.0, 3.0, 5.0, 8.0, 13.0)
+TONE_BINS = 16
+
+
+class StyleAnalyzer:
+    """
+    Style fingerprint of a reference video: pacing (shot boundaries and the shot length
+    distribution), colour (saturation / brightness histograms) and motion intensity.
+
+    Frames are sampled at `sample_fps` by ffmpeg, which decodes a reduced set of frames (see
+    decode_video_frames) and hands back `analysis_width`-pixel thumbnails in blocks. Each block
+    is scored in NumPy with SceneDetector's HSV measures, so a long reference is one
+    streaming pass with bounded memory.
+    """
+
+    def __init__(self, sample_fps: float = 4.0, analysis_width: int = 160, threshold: float = 30.0,
+                 min_scene_len: float = 0.5, block_frames: int = 128):
+        self.sample_fps = sample_fps
+        self.analysis_width = analysis_width
+        self.block_frames = block_frames
+        self.detector = SceneDetector(threshold=threshold, sample_fps=sample_fps,
+                                      analysis_width=analysis_width, min_scene_len=min_scene_len)
+
+    def analyze(self, video_path: str) -> dict:
+        times, scores, motion = [], [], []
+        sat_hist = np.zeros(TONE_BINS, dtype=np.int64)
+        val_hist = np.zeros(TONE_BINS, dtype=np.int64)
+        prev_hsv, prev_hist, last_time = None, None, 0.0
+
+        for block_times, frames in decode_video_frames(video_path, self.sample_fps, self.analysis_width,
+                                                       self.block_frames):
+            hsv, hist = self.detector.block_features(frames)
+            sat_hist += np.bincount((hsv[..., 1].ravel().astype(np.int32) * TONE_BINS) >> 8, minlength=TONE_BINS)
+            val_hist += np.bincount((hsv[..., 2].ravel().astype(np.int32) * TONE_BINS) >> 8, minlength=TONE_BINS)
+
+            # Pair the first sample of this block with the last one of the previous block
+            if prev_hsv is not None:
+                hsv = np.concatenate([prev_hsv[None], hsv])
+                hist = np.concatenate([prev_hist[None], hist])
+            else:
+                block_times = block_times[1:]
+            if len(hsv) > 1:
+                scores.append(self.detector.score_pairs(hsv, hist))
+                value = hsv[..., 2].astype(np.int16)
+                motion.append(np.abs(value[1:] - value[:-1]).mean(axis=(1, 2)) / 255.0)
+                times.append(block_times)
+            prev_hsv, prev_hist = hsv[-1], hist[-1]
+            last_time = float(block_times[-1]) if len(block_times) else last_time
+
+        duration = float(probe_streams(video_path).get("duration") or 0.0) or last_time + 1.0 / self.sample_fps
+        times = np.concatenate(times) if times else np.empty(0)
+        scores = np.concatenate(scores) if scores else np.empty(0)
+        motion = np.concatenate(motion) if motion else np.empty(0)
+
+        cuts = self.detector.pick_cuts(times, scores, duration)
+        shots = np.diff(np.concatenate([[0.0], cuts, [duration]]))
+        # Motion inside shots only: the sample pairs straddling a cut are picture changes, not movement
+        in_shot = motion[scores < self.detector.threshold] if len(motion) else motion
+
+        fingerprint = {
+            "duration": round(duration, 3),
+            "sample_fps": self.sample_fps,
+            "cut_times": [round(t, 3) for t in cuts],
+        }
+        fingerprint.update(self._pacing(shots, duration))
+        fingerprint["color"] = self._color(sat_hist, val_hist)
+        fingerprint["motion"] = self._motion(in_shot)
+        return fingerprint
+
+    @staticmethod
+    def _pacing(shots: np.ndarray, duration: float) -> dict:
+        asl = float(shots.mean()) if len(shots) else duration
+        edges = list(ASL_BINS) + [max(ASL_BINS[-1], float(shots.max(initial=0.0))) + 1.0]
+        counts = np.histogram(shots, bins=edges)[0]
+        return {
+            "pacing": "fast" if asl < 2.5 else "slow",
+            "avg_shot_length": round(asl, 3),
+            "shot_count": int(len(shots)),
+            "cuts_per_minute": round(60.0 * max(0, len(shots) - 1) / duration, 2) if duration else 0.0,
+            "shot_lengths": {
+                "median": round(float(np.median(shots)), 3) if len(shots) else 0.0,
+                "p10": round(float(np.percentile(shots, 10)), 3) if len(shots) else 0.0,
+                "p90": round(float(np.percentile(shots, 90)), 3) if len(shots) else 0.0,
+                "std": round(float(shots.std()), 3) if len(shots) else 0.0,
+                "bins": list(ASL_BINS),
+                "histogram": counts.tolist(),
+            },
+        }
+
+    @staticmethod
+    def _color(sat_hist: np.ndarray, val_hist: np.ndarray) -> dict:
+        centres = (np.arange(TONE_BINS) + 0.5) / TONE_BINS
+        sat = sat_hist / max(1, sat_hist.sum())
+        val = val_hist / max(1, val_hist.sum())
+        saturation, brightness = float(sat @ centres), float(val @ centres)
+        if saturation < 0.08:
+            vibe = "black_white"
+        elif saturation > 0.45:
+            vibe = "vibrant"
+        elif saturation < 0.2:
+            vibe = "muted"
+        else:
+            vibe = "natural"
+        return {
+            "vibe": vibe,
+            "saturation": round(saturation, 4),
+            "brightness": round(brightness, 4),
+            "tone": "dark" if brightness < 0.35 else "bright" if brightness > 0.65 else "balanced",
+            "saturation_hist": np.round(sat, 4).tolist(),
+            "brightness_hist": np.round(val, 4).tolist(),
+        }
+
+    @staticmethod
+    def _motion(values: np.ndarray) -> dict:
+        """Mean absolute brightness change between consecutive samples (0-1) within shots."""
+        mean = float(values.mean()) if len(values) else 0.0
+        return {
+            "mean": round(mean, 4),
+            "p90": round(float(np.percentile(values, 90)), 4) if len(values) else 0.0,
+            "level": "low" if mean < 0.02 else "medium" if mean < 0.06 else "high",
+        }
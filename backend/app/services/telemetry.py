@@ -0,0 +1,180 @@
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds (seconds) of the stage / job duration histogram buckets
+DURATION_BUCKETS = (0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+
+METRIC_HELP = {
+    "jobs_total": "Finished jobs by kind and final status",
+    "jobs": "Jobs currently known to the API process, by status",
+    "job_duration_seconds": "Job wall time from submission to completion",
+    "stage_duration_seconds": "Time spent per pipeline stage",
+    "stage_errors_total": "Errors recorded per pipeline stage (including recovered ones)",
+    "frames_encoded_total": "Video frames encoded by renders",
+    "bytes_written_total": "Bytes of rendered parts and outputs written",
+    "last_encode_fps": "Encode throughput (frames per second) of the most recent render",
+    "worker_import_seconds": "Import time per module when a job worker warmed up",
+}
+
+
+class JobTrace:
+    """
+    Timing spans, counters and errors of one job, recorded inside the worker process.
+    Everything is kept as plain dicts so the trace travels back with the job result
+    (or attached to the exception when the job fails) and can be returned as JSON.
+    """
+
+    def __init__(self):
+        self._started = time.perf_counter()
+        self.spans = []     # {"stage", "start", "seconds", "status", ...}
+        self.counters = {}  # name -> running total (frames_encoded, bytes_written, ...)
+        self.gauges = {}    # name -> last value (encode_fps, ...)
+        self.errors = []    # {"stage", "type", "message"}
+
+    @contextmanager
+    def span(self, stage: str, **attrs):
+        """Time a block. Exceptions are recorded against the stage and re-raised."""
+        start = time.perf_counter()
+        entry = {"stage": stage, "start": round(start - self._started, 3), "status": "ok"}
+        entry.update(attrs)
+        try:
+            yield entry
+        except BaseException as e:
+            entry["status"] = "error"
+            self.error(stage, e)
+            raise
+        finally:
+            entry["seconds"] = round(time.perf_counter() - start, 3)
+            self.spans.append(entry)
+
+    def add_span(self, stage: str, seconds: float, **attrs):
+        """Record a stage that was timed elsewhere (e.g. the render report's own timings)."""
+        entry = {"stage": stage, "start": None, "seconds": round(float(seconds), 3), "status": "ok"}
+        entry.update(attrs)
+        self.spans.append(entry)
+
+    def count(self, name: str, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def gauge(self, name: str, value: float):
+        self.gauges[name] = value
+
+    def error(self, stage: str, exc: BaseException):
+        """Record a failure; used for errors the pipeline recovers from as well as fatal ones."""
+        if getattr(exc, "_trace_recorded", False):
+            return  # already recorded by an inner span
+        try:
+            exc._trace_recorded = True
+        except AttributeError:
+            pass
+        print(f"⚠️ {stage} failed: {exc}")
+        self.errors.append({"stage": stage, "type": type(exc).__name__, "message": str(exc)})
+
+    @contextmanager
+    def job(self):
+        """Wrap a whole job function: a failing job carries its trace on the exception (`exc.trace`)."""
+        try:
+            yield self
+        except BaseException as e:
+            e.trace = self.to_dict()
+            raise
+
+    def to_dict(self) -> dict:
+        return {
+            "total_seconds": round(time.perf_counter() - self._started, 3),
+            "spans": list(self.spans),
+            "counters": dict(self.counters),
+            "gauges": dict(self.gauges),
+            "errors": list(self.errors),
+        }
+
+
+class MetricsRegistry:
+    """
+    Process-wide counters, gauges and histograms, rendered in the Prometheus text exposition format.
+    Series are keyed by (name, sorted label items); the JobManager feeds it every finished job's trace.
+    """
+
+    def __init__(self, prefix: str = "ai_editor"):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}  # key -> {"buckets": [counts], "sum", "count"}
+
+    def _key(self, name: str, labels: dict):
+        return f"{self.prefix}_{name}", tuple(sorted((labels or {}).items()))
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels):
+        with self._lock:
+            self._gauges[self._key(name, labels)] = value
+
+    def observe(self, name: str, value: float, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = {"buckets": [0] * len(DURATION_BUCKETS), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if value <= bound:
+                    hist["buckets"][i] += 1
+            hist["sum"] += value
+            hist["count"] += 1
+
+    def record_job(self, job: dict):
+        """Fold a finished job (status, kind, timestamps and trace) into the metrics."""
+        kind, status = job.get("kind", "render"), job.get("status")
+        self.inc("jobs_total", kind=kind, status=status)
+        if job.get("finished_at") and job.get("created_at"):
+            self.observe("job_duration_seconds", job["finished_at"] - job["created_at"], kind=kind)
+
+        trace = job.get("trace") or {}
+        for span in trace.get("spans", []):
+            self.observe("stage_duration_seconds", span["seconds"], kind=kind, stage=span["stage"])
+        for name, value in trace.get("counters", {}).items():
+            self.inc(f"{name}_total", value, kind=kind)
+        for name, value in trace.get("gauges", {}).items():
+            self.set(f"last_{name}", value, kind=kind)
+        for error in trace.get("errors", []):
+            self.inc("stage_errors_total", stage=error["stage"], type=error["type"])
+
+    def render(self) -> str:
+        """Prometheus text format (version 0.0.4)."""
+        lines = []
+        with self._lock:
+            series = [(k, "counter", v) for k, v in self._counters.items()]
+            series += [(k, "gauge", v) for k, v in self._gauges.items()]
+            series += [(k, "histogram", v) for k, v in self._histograms.items()]
+        described = set()
+        for (name, labels), kind, value in sorted(series, key=lambda s: s[0]):
+            if name not in described:
+                described.add(name)
+                short = name[len(self.prefix) + 1:]
+                lines.append(f"# HELP {name} {METRIC_HELP.get(short, short.replace('_', ' '))}")
+                lines.append(f"# TYPE {name} {kind}")
+            if kind != "histogram":
+                lines.append(f"{name}{_labels(labels)} {_number(value)}")
+                continue
+            for bound, count in zip(DURATION_BUCKETS, value["buckets"]):
+                lines.append(f"{name}_bucket{_labels(labels + (('le', _number(bound)),))} {count}")
+            lines.append(f"{name}_bucket{_labels(labels + (('le', '+Inf'),))} {value['count']}")
+            lines.append(f"{name}_sum{_labels(labels)} {_number(value['sum'])}")
+            lines.append(f"{name}_count{_labels(labels)} {value['count']}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(items) -> str:
+    if not items:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n") for _, v in items)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(items, escaped)) + "}"
+
+
+def _number(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
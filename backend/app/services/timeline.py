@@ -0,0 +1,115 @@
+import os
+from collections import OrderedDict
+
+
+def compile_timeline(timeline: list) -> dict:
+    """
+    Validate an EDL timeline and index it by source, before anything is opened.
+    Returns {"cuts": [...], "sources": {path: [cut indices]}} where every cut has a source_path and
+    float start < end (and a float speed when set); sources keep their first-use order.
+    Raises ValueError naming the first bad entry.
+    """
+    cuts, sources = [], OrderedDict()
+    for index, entry in enumerate(timeline):
+        path = entry.get('source_path')
+        if not path:
+            raise ValueError(f"Timeline entry {index} has no source_path")
+        try:
+            cut = dict(entry, start=float(entry['start']), end=float(entry['end']))
+            if 'speed' in cut:
+                cut['speed'] = float(cut['speed'])
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f"Timeline entry {index} needs numeric start/end (and speed)")
+        if cut['start'] < 0 or cut['end'] <= cut['start']:
+            raise ValueError(f"Timeline entry {index} has an empty range: {cut['start']} - {cut['end']}")
+        if 'speed' in cut and cut['speed'] <= 0:
+            raise ValueError(f"Timeline entry {index} has a non-positive speed")
+        sources.setdefault(path, []).append(index)
+        cuts.append(cut)
+    return {"cuts": cuts, "sources": sources}
+
+
+class DecoderPool:
+    """
+    One MoviePy reader per distinct source, shared by every cut taken from it, so a montage that
+    reuses one source 20 times runs one ffmpeg decoder instead of 20.
+    At most `max_open` (RENDER_MAX_OPEN_READERS, default 4) video decoders run at once: when a cut
+    needs a source whose decoder is not running, the least recently used one is stopped (its clip
+    stays valid; MoviePy restarts the decoder at the right position on the next frame).
+    Every clip is closed on close() / leaving the `with` block, whether the render succeeded or not.
+    """
+
+    def __init__(self, max_open: int = None, opener=None):
+        if max_open is None:
+            max_open = int(os.getenv("RENDER_MAX_OPEN_READERS", "4"))
+        self.max_open = max(1, max_open)
+        self.opener = opener
+        self._clips = {}
+        self._running = OrderedDict()  # paths with a live decoder, least recently used first
+        self.opened = 0
+        self.restarts = 0
+        self.peak_running = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def source(self, path: str):
+        """The shared clip of `path`, opened on first use."""
+        clip = self._clips.get(path)
+        if clip is None:
+            opener = self.opener
+            if opener is None:
+                try:
+                    from moviepy.editor import VideoFileClip as opener
+                except ImportError:
+                    # Fallback for MoviePy v2.0+
+                    from moviepy import VideoFileClip as opener
+            clip = self._clips[path] = opener(path)
+            self.opened += 1
+            # Opening starts a decoder; count it against the cap right away
+            self._running[path] = True
+            self._enforce_cap(path)
+        return clip
+
+    def subclip(self, path: str, start: float, end: float):
+        """[start, end) of the shared source clip; reading its frames keeps the source's decoder running."""
+        source = self.source(path)
+        clip = source.subclip(start, end) if hasattr(source, 'subclip') else source.subclipped(start, end)
+        transform = getattr(clip, 'fl', None) or clip.transform  # MoviePy v1 / v2
+        return transform(lambda get_frame, t: self._read(path, get_frame, t))
+
+    def _read(self, path: str, get_frame, t):
+        if path in self._running:
+            self._running.move_to_end(path)
+        else:
+            # Its decoder was stopped; MoviePy restarts it inside get_frame
+            self._running[path] = True
+            self.restarts += 1
+            self._enforce_cap(path)
+        return get_frame(t)
+
+    def _enforce_cap(self, keep: str):
+        while len(self._running) > self.max_open:
+            path = next(p for p in self._running if p != keep)
+            del self._running[path]
+            reader = getattr(self._clips[path], 'reader', None)
+            if reader is not None:
+                reader.close()
+        self.peak_running = max(self.peak_running, len(self._running))
+
+    def close(self):
+        for clip in self._clips.values():
+            try:
+                clip.close()
+            except Exception:
+                pass
+        self._clips.clear()
+        self._running.clear()
+
+    def stats(self) -> dict:
+        return {"sources": self.opened, "decoder_restarts": self.restarts, "peak_decoders": self.peak_running,
+                "max_open": self.max_open}
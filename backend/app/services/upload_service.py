@@ -0,0 +1,228 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+import uuid
+
+import anyio
+
+from backend.app.services.analysis_cache import AnalysisCache, HASH_CHUNK_SIZE
+from backend.app.services.asset_registry import AssetRegistry, asset_kind
+from backend.app.services.paths import MUSIC_DIR, UPLOAD_DIR
+
+
+class UploadNotFound(Exception):
+    """Unknown or already finalized upload id."""
+
+
+class UploadOffsetMismatch(Exception):
+    """A chunk was sent for an offset past what the server has received."""
+
+    def __init__(self, expected: int):
+        super().__init__(f"Expected chunk at offset {expected}")
+        self.expected = expected
+
+
+class UploadManager:
+    """
+    Chunked, resumable uploads written straight to disk.
+
+    Flow: init() -> write_chunk(offset, stream) ... -> finalize().
+    Chunks are appended to `<upload_dir>/.partial/` (same filesystem as the final location, so
+    finalize is a rename, not a copy) while a SHA-256 is updated incrementally. The bytes already
+    on disk are the source of truth for the resume offset, so a client that lost its connection asks
+    status() and continues from there. Finalized files are recorded in the asset registry; a file whose
+    content hash is already registered is dropped and the existing asset id is returned instead.
+    """
+
+    def __init__(self, upload_dir: str = UPLOAD_DIR, music_dir: str = MUSIC_DIR,
+                 cache: AnalysisCache = None, registry: AssetRegistry = None):
+        self.upload_dir = upload_dir
+        self.music_dir = music_dir
+        self.partial_dir = os.path.join(upload_dir, ".partial")
+        self.sessions_dir = os.path.join(upload_dir, ".sessions")
+        self.cache = cache
+        self.registry = registry if registry is not None else AssetRegistry()
+        for d in (upload_dir, music_dir, self.partial_dir, self.sessions_dir):
+            os.makedirs(d, exist_ok=True)
+
+        self._hashers = {}  # upload_id -> (hasher, bytes hashed)
+        self._locks = {}
+
+    # --- Sessions ---
+
+    def _session_path(self, upload_id: str) -> str:
+        return os.path.join(self.sessions_dir, f"{upload_id}.json")
+
+    def _load_session(self, upload_id: str) -> dict:
+        try:
+            with open(self._session_path(os.path.basename(upload_id)), "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            raise UploadNotFound(upload_id)
+
+    def _lock(self, upload_id: str) -> asyncio.Lock:
+        if upload_id not in self._locks:
+            self._locks[upload_id] = asyncio.Lock()
+        return self._locks[upload_id]
+
+    async def init(self, filename: str, size: int = None, kind: str = None) -> dict:
+        """
+        Start an upload. `kind` is "music", or "video"/"audio" for assets; by default the asset kind
+        follows the file extension.
+        """
+        kind = kind or asset_kind(filename or "")
+        if kind not in ("video", "audio", "music"):
+            raise ValueError(f"Unknown upload kind: {kind}")
+        upload_id = str(uuid.uuid4())
+        extension = os.path.splitext(filename or "")[1]
+        if not extension and kind == "music":
+            extension = ".mp3" # Default
+
+        session = {
+            "upload_id": upload_id,
+            "filename": filename,
+            "extension": extension,
+            "kind": kind,
+            "size": size,
+            "partial_path": os.path.join(self.partial_dir, f"{upload_id}{extension}"),
+            "created_at": time.time(),
+        }
+        async with await anyio.open_file(session["partial_path"], "wb"):
+            pass
+        async with await anyio.open_file(self._session_path(upload_id), "w") as f:
+            await f.write(json.dumps(session))
+        self._hashers[upload_id] = (hashlib.sha256(), 0)
+        return self.status(upload_id)
+
+    def status(self, upload_id: str) -> dict:
+        session = self._load_session(upload_id)
+        received = os.path.getsize(session["partial_path"]) if os.path.exists(session["partial_path"]) else 0
+        return {
+            "upload_id": upload_id,
+            "filename": session["filename"],
+            "kind": session["kind"],
+            "size": session["size"],
+            "offset": received,
+            "complete": session["size"] is not None and received >= session["size"],
+        }
+
+    # --- Chunks ---
+
+    async def _hasher_at(self, upload_id: str, path: str, offset: int):
+        """Hasher positioned at `offset`; re-hashes the partial file after a restart or rewind."""
+        hasher, position = self._hashers.get(upload_id, (None, -1))
+        if hasher is not None and position == offset:
+            return hasher
+
+        def rehash():
+            h = hashlib.sha256()
+            remaining = offset
+            with open(path, "rb") as f:
+                while remaining > 0:
+                    chunk = f.read(min(HASH_CHUNK_SIZE, remaining))
+                    if not chunk:
+                        break
+                    h.update(chunk)
+                    remaining -= len(chunk)
+            return h
+
+        return await anyio.to_thread.run_sync(rehash)
+
+    async def write_chunk(self, upload_id: str, offset: int, chunks) -> dict:
+        """
+        Write an async iterable of bytes at `offset`. Re-sending from an earlier offset
+        (e.g. a chunk whose response was lost) truncates and overwrites from there.
+        """
+        async with self._lock(upload_id):
+            session = self._load_session(upload_id)
+            path = session["partial_path"]
+            received = os.path.getsize(path)
+            if offset > received or offset < 0:
+                raise UploadOffsetMismatch(received)
+
+            hasher = await self._hasher_at(upload_id, path, offset)
+            position = offset
+            async with await anyio.open_file(path, "r+b") as f:
+                await f.seek(offset)
+                await f.truncate()
+                async for chunk in chunks:
+                    if not chunk:
+                        continue
+                    await f.write(chunk)
+                    hasher.update(chunk)
+                    position += len(chunk)
+            self._hashers[upload_id] = (hasher, position)
+
+            if session["size"] is not None and position > session["size"]:
+                raise ValueError(f"Upload exceeds declared size of {session['size']} bytes")
+        return self.status(upload_id)
+
+    # --- Finalize / dedup ---
+
+    def lookup_hash(self, digest: str, kind: str = None):
+        entry = self.registry.find_by_hash(digest, kind)
+        if entry and os.path.exists(entry["path"]):
+            return entry
+        return None
+
+    def register(self, digest: str, entry: dict):
+        self.registry.add(entry["file_id"], entry["path"], entry["kind"], filename=entry.get("filename"),
+                          size=entry.get("size"), sha256=digest)
+        if self.cache is not None:
+            self.cache.remember_hash(entry["path"], digest)
+
+    async def finalize(self, upload_id: str, expected_sha256: str = None) -> dict:
+        async with self._lock(upload_id):
+            session = self._load_session(upload_id)
+            path = session["partial_path"]
+            received = os.path.getsize(path)
+            if session["size"] is not None and received != session["size"]:
+                raise UploadOffsetMismatch(received)
+
+            hasher = await self._hasher_at(upload_id, path, received)
+            digest = hasher.hexdigest()
+            if expected_sha256 and expected_sha256.lower() != digest:
+                raise ValueError("Checksum mismatch")
+
+            existing = self.lookup_hash(digest, session["kind"])
+            if existing:
+                # Same bytes already uploaded: keep the original asset
+                os.remove(path)
+                result = {"file_id": existing["file_id"], "path": existing["path"], "kind": existing["kind"],
+                          "size": existing["size"], "filename": session["filename"], "sha256": digest,
+                          "deduplicated": True}
+                if existing["kind"] == "music":
+                    result["url"] = f"/static/music/{os.path.basename(existing['path'])}"
+            else:
+                file_id = str(uuid.uuid4())
+                target_dir = self.music_dir if session["kind"] == "music" else self.upload_dir
+                final_name = f"{file_id}{session['extension']}"
+                final_path = os.path.join(target_dir, final_name)
+                os.replace(path, final_path)
+                entry = {"file_id": file_id, "path": final_path, "kind": session["kind"], "size": received,
+                         "filename": session["filename"]}
+                if session["kind"] == "music":
+                    entry["url"] = f"/static/music/{final_name}"
+                self.register(digest, entry)
+                result = dict(entry, sha256=digest, deduplicated=False)
+
+            os.remove(self._session_path(upload_id))
+            self._hashers.pop(upload_id, None)
+        self._locks.pop(upload_id, None)
+        return result
+
+    async def save_upload(self, file, kind: str = None) -> dict:
+        """Single-request upload (multipart UploadFile), hashed while written and deduplicated."""
+        session = await self.init(file.filename, kind=kind)
+
+        async def chunks():
+            while True:
+                chunk = await file.read(HASH_CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+
+        await self.write_chunk(session["upload_id"], 0, chunks())
+        return await self.finalize(session["upload_id"])
@@ -1,123 +1,370 @@
 try:
-    from moviepy.editor import VideoFileClip, concatenate_videoclips, AudioFileClip, vfx
+    from moviepy.editor import concatenate_videoclips
 except ImportError:
     # Fallback for MoviePy v2.0+
-    from moviepy import VideoFileClip, concatenate_videoclips, AudioFileClip, vfx
+    from moviepy import concatenate_videoclips
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+import multiprocessing
 import os
+import shutil
+import tempfile
+import time
+
+from backend.app.services.analysis_cache import AnalysisCache
+from backend.app.services.audio_mixer import AudioMixer
+from backend.app.services.ffmpeg_tools import concat_copy
+from backend.app.services.output_profiles import get_output_profile
+from backend.app.services.render_planner import RenderPlanner
+from backend.app.services.segment_cache import SegmentCache
+from backend.app.services.segment_renderer import FileProgress, ProgressLogger, build_clip, render_unit, RENDER_QUALITY
+from backend.app.services.timeline import DecoderPool, compile_timeline
+
+
+def default_segment_workers() -> int:
+    """
+    Segment workers per render (RENDER_SEGMENT_WORKERS): by default the cores are shared between
+    the RENDER_CONCURRENCY renders the job queue runs side by side, each with its own pool.
+    """
+    if os.getenv("RENDER_SEGMENT_WORKERS"):
+        return max(1, int(os.getenv("RENDER_SEGMENT_WORKERS")))
+    return max(1, (os.cpu_count() or 1) // max(1, int(os.getenv("RENDER_CONCURRENCY", "2"))))
+
 
 class VideoProcessor:
-    def __init__(self):
-        pass
+    """
+    Renders EDLs. Two modes:
+    - "segments" (default): every timeline entry becomes its own MP4 part matching one common
+      stream profile (stream-copied where possible, see RenderPlanner), parts are rendered in a
+      process pool of `workers` (default_segment_workers()) and joined losslessly; music is mixed in a final pass.
+    - "moviepy": the original single compose + write_videofile pass.
+    `quality` picks the encoder settings for re-encoded parts: "final" or "preview" (see RENDER_QUALITY).
+    Rendered parts are kept in a SegmentCache, so re-rendering an edited EDL only encodes changed entries
+    (pass segment_cache=False to disable).
+    `output_profile` (a name from OUTPUT_PROFILES or a dict) fixes resolution, fps and encoder settings;
+    without one the output follows the sources.
+    Background music ("audio_track") is looped and ducked under the clips' own audio by `audio_mixer`.
+    """
+
+    def __init__(self, cache: AnalysisCache = None, mode: str = "segments", workers: int = None,
+                 quality: str = "final", segment_cache: SegmentCache = None, output_profile=None,
+                 audio_mixer: AudioMixer = None):
+        if workers is None:
+            workers = default_segment_workers()
+        if quality not in RENDER_QUALITY:
+            raise ValueError(f"Unknown render quality: {quality}")
+        self.cache = cache if cache is not None else AnalysisCache()
+        self.mode = mode
+        self.quality = quality
+        self.output = get_output_profile(output_profile)
+        self.workers = max(1, workers)
+        self.planner = RenderPlanner(cache=self.cache)
+        if segment_cache is None:
+            segment_cache = SegmentCache()
+        self.segment_cache = segment_cache or None
+        self.audio_mixer = audio_mixer if audio_mixer is not None else AudioMixer()
 
-    def render_video(self, edl: dict, output_path: str):
+    def render_video(self, edl: dict, output_path: str, progress_callback=None) -> dict:
         """
         Executes the Edit Decision List (EDL) to render the final video.
+        progress_callback(fraction) is called as rendering advances; it may raise to abort.
+        Returns a report of how each entry was rendered, how long each stage took and what was encoded
+        ("counters": frames_encoded, bytes_written, encode_fps).
         """
         timeline = edl.get('timeline', [])
-        clips = []
-        
+        if not timeline:
+            raise ValueError("No clips in timeline to render.")
+        compiled = compile_timeline(timeline)
+
+        if self.mode == "segments":
+            plan = self._plan(compiled["cuts"], self.output)
+            if plan["profile"]:
+                return self._render_segmented([(edl, plan, output_path)], progress_callback)[0]
+
+        started = time.perf_counter()
+        timings = {}
+        bg_music_path = edl.get('audio_track')
+        has_music = bool(bg_music_path and os.path.exists(bg_music_path))
+        work_dir = tempfile.mkdtemp(prefix="render_", dir=os.path.dirname(output_path) or ".") if has_music else None
         try:
-            for cut in timeline:
-                source_path = cut['source_path']
-                start = cut['start']
-                end = cut['end']
-                
-                # Load Clip
-                clip = VideoFileClip(source_path).subclip(start, end)
-                
-                # --- APPLY EFFECTS ---
-                
-                # 1. Speed Ramping
-                if 'speed' in cut:
-                    clip = clip.speedx(cut['speed'])
-                
-                # 2. Color Grading (Saturation/Contrast)
-                if 'saturation' in cut:
-                    # multiplier: 1.0 is normal, 0.0 is B&W, 2.0 is highly saturated
-                    clip = clip.fx(vfx.colorx, cut['saturation'])
-                if 'contrast' in cut:
-                     clip = clip.fx(vfx.lum_contrast, lum=0, contrast=cut['contrast']) # contrast=0 is original? No, moviepy lum_contrast is tricky. 
-                     # actually moviepy doesn't have a direct 'contrast' easy fx without numpy.
-                     # Let's stick to colorx (saturation) and brightness (lum_contrast)
-                     # For simplicity/safety, let's just use painting effect or blackwhite if requested
-                     pass
-                
-                if cut.get('filter') == 'black_white':
-                    clip = clip.fx(vfx.blackwhite)
-                
-                # 3. Dynamic Zoom (Ken Burns style - simple center crop zoom)
-                # This is computationally expensive, so use with care
-                if cut.get('effect') == 'zoom_in':
-                    # Simple hack: progressive crop
-                    w, h = clip.size
-                    clip = clip.resize(lambda t: 1 + 0.1*t) # Zooms in 10% per second
-                    # We must set the size back to original to avoid fitting issues in composite
-                    # But resize changes size. We need to crop it back to WxH center.
-                    # This is complex in pure moviepy without custom func. 
-                    # Simpler: just a static zoom? No that's a crop.
-                    # Let's skip dynamic zoom for this iteration to ensure stability.
-                    pass
-                
-                # 4. Transitions (Fades)
-                if cut.get('transition') == 'fade_in':
-                    clip = clip.fadein(0.5)
-                elif cut.get('transition') == 'fade_out':
-                    clip = clip.fadeout(0.5)
-                
-                # Resize to standard 1080p (vertical or horizontal based on aspect)
-                # target_h = 1920
-                # if clip.h != target_h:
-                #    ratio = target_h / clip.h
-                #    clip = clip.resize(ratio)
-                
-                clips.append(clip)
-            
-            if not clips:
-                raise ValueError("No clips in timeline to render.")
+            video_path = os.path.join(work_dir, "video.mp4") if has_music else output_path
+            frames, has_audio, decoders = self._render_moviepy(compiled, video_path, progress_callback)
+            timings["encode"] = round(time.perf_counter() - started, 3)
+            if has_music:
+                print(f"Adding background music: {bg_music_path}")
+                step = time.perf_counter()
+                self.audio_mixer.mix(video_path, bg_music_path, output_path, has_audio=has_audio)
+                timings["audio_mix"] = round(time.perf_counter() - step, 3)
+        finally:
+            if work_dir:
+                shutil.rmtree(work_dir, ignore_errors=True)
+        timings["total"] = round(time.perf_counter() - started, 3)
+        return {
+            "mode": "moviepy",
+            "quality": self.quality,
+            "output_profile": (self.output or {}).get("name"),
+            "segments": [{"index": i, "action": "effects"} for i in range(len(timeline))],
+            "decoders": decoders,
+            "timings": timings,
+            "counters": _counters(frames, os.path.getsize(output_path), timings["encode"]),
+        }
+
+    def render_batch(self, variants: list, progress_callback=None) -> list:
+        """
+        Render several EDLs (e.g. variants cut from the same footage) as one job.
+        `variants`: [{"edl", "output_path", "output_profile" (optional; this processor's by default)}].
+        Their parts are scheduled together: a part several variants share (same source range, effects
+        and profile) is rendered once, and re-encoded ranges that overlap in a source are decoded once
+        for all of them (see RenderPlanner.shared_decode_groups).
+        Returns one render_video report per variant, in order.
+        """
+        jobs, fallback = [], []
+        for n, variant in enumerate(variants):
+            timeline = variant["edl"].get('timeline', [])
+            if not timeline:
+                raise ValueError(f"No clips in timeline to render (variant {n}).")
+            output = get_output_profile(variant["output_profile"]) if "output_profile" in variant else self.output
+            plan = self._plan(compile_timeline(timeline)["cuts"], output) if self.mode == "segments" \
+                else {"profile": None}
+            if plan["profile"]:
+                jobs.append((n, (variant["edl"], plan, variant["output_path"])))
+            else:
+                fallback.append((n, variant, output))
+
+        reports = [None] * len(variants)
+        share = len(jobs) / len(variants)
+        if jobs:
+            def batch_progress(p):
+                progress_callback(p * share)
+
+            rendered = self._render_segmented([job for _, job in jobs], batch_progress if progress_callback else None)
+            for (n, _), report in zip(jobs, rendered):
+                reports[n] = report
+        for k, (n, variant, output) in enumerate(fallback):
+            def fallback_progress(p, k=k):
+                progress_callback(share + (k + p) / len(variants))
+
+            processor = VideoProcessor(cache=self.cache, mode="moviepy", workers=self.workers, quality=self.quality,
+                                       segment_cache=self.segment_cache or False, output_profile=output,
+                                       audio_mixer=self.audio_mixer)
+            reports[n] = processor.render_video(variant["edl"], variant["output_path"],
+                                                fallback_progress if progress_callback else None)
+        return reports
+
+    def _plan(self, timeline: list, output: dict = None) -> dict:
+        plan = self.planner.plan(timeline, output=output)
+        if plan["profile"] and (output is None or self.quality != "final"):
+            # Output profiles carry their own encoder settings; previews always use the fast ones
+            plan["profile"].update(RENDER_QUALITY[self.quality])
+        return plan
+
+    def _render_moviepy(self, compiled: dict, output_path: str, progress_callback=None):
+        """
+        Full decode/re-encode of a compiled timeline (see compile_timeline) through MoviePy; music is
+        mixed in afterwards. Each source is opened once and shared by its cuts (DecoderPool), and every
+        reader is closed when this returns or fails.
+        Returns (frames written, whether the clips had audio, decoder pool stats).
+        """
+        with DecoderPool() as pool:
+            clips = [build_clip(cut, self.output, pool) for cut in compiled["cuts"]]
 
             # Concatenate
             final_clip = concatenate_videoclips(clips, method="compose")
-            
-            # Add External Audio if present
-            # audio_path = edl.get('audio_track')
-            # if audio_path and os.path.exists(audio_path):
-            #     audio = AudioFileClip(audio_path)
-            #     final_clip = final_clip.set_audio(audio)
-
-            # Write Output
-            # Check for background music in EDL
-            bg_music_path = edl.get('audio_track')
-            
-            if bg_music_path and os.path.exists(bg_music_path):
-                print(f"Adding background music: {bg_music_path}")
-                # Load Music
-                music = AudioFileClip(bg_music_path)
-                
-                # Loop music if video is longer, or trim music if video is shorter
-                video_duration = final_clip.duration
-                
-                if music.duration < video_duration:
-                    music = vfx.loop(music, duration=video_duration)
-                else:
-                    music = music.subclip(0, video_duration)
-                    
-                # Mix: Lower original audio volume (optional autoducking could go here)
-                original_audio = final_clip.audio.volumex(1.0) if final_clip.audio else None
-                music_audio = music.volumex(0.3) # Background level
-                
-                from moviepy.audio.AudioClip import CompositeAudioClip
-                if original_audio:
-                    final_audio = CompositeAudioClip([original_audio, music_audio])
-                else:
-                    final_audio = music_audio
-                    
-                final_clip = final_clip.set_audio(final_audio)
-
-            final_clip.write_videofile(output_path, fps=24, codec='libx264', audio_codec='aac')
-
-        except Exception as e:
-            # Ensure cleanup on failure
-            for clip in clips:
-                try: clip.close() 
-                except: pass
-            raise e
+
+            # Output profile frame rate, else keep the source frame rate instead of forcing 24 fps
+            fps = (self.output or {}).get("fps") or getattr(final_clip, 'fps', None) or 24
+            logger = ProgressLogger(progress_callback) if progress_callback else 'bar'
+            encoder = dict(RENDER_QUALITY[self.quality])
+            if self.output is not None and self.quality == "final":
+                encoder.update({k: self.output[k] for k in ("preset", "crf", "video_bitrate", "threads")})
+            rate = ["-b:v", str(encoder["video_bitrate"])] if encoder.get("video_bitrate") else ["-crf", str(encoder["crf"])]
+            final_clip.write_videofile(output_path, fps=fps, codec='libx264', audio_codec='aac', logger=logger,
+                                       preset=encoder["preset"], threads=encoder.get("threads") or None,
+                                       ffmpeg_params=rate)
+            return int(round(final_clip.duration * fps)), final_clip.audio is not None, pool.stats()
+
+    # --- Segmented path: per-entry parts + concat demuxer ---
+
+    def _render_segmented(self, jobs: list, progress_callback=None) -> list:
+        """Render planned EDLs [(edl, plan, output_path)] with one shared pool of parts; one report each."""
+        work_dir = tempfile.mkdtemp(prefix="render_", dir=os.path.dirname(jobs[0][2]) or ".")
+        timings = {}
+        started = time.perf_counter()
+        reports = []
+
+        try:
+            # Every distinct part across all jobs; entries with the same segment cache key render once
+            tasks, keys, refs, first_use, index_of = [], [], [], {}, {}
+            for j, (_, plan, _) in enumerate(jobs):
+                job_refs = []
+                for position, segment in enumerate(plan["segments"]):
+                    key = self._segment_key(segment, plan["profile"])
+                    n = index_of.get(key) if key is not None else None
+                    if n is None:
+                        n = len(tasks)
+                        if key is not None:
+                            index_of[key] = n
+                        first_use[n] = (j, position)
+                        tasks.append((dict(segment, index=n), plan["profile"]))
+                        keys.append(key)
+                    job_refs.append(n)
+                refs.append(job_refs)
+
+            results = {}
+            if self.segment_cache is not None:
+                for n, key in enumerate(keys):
+                    parts = self.segment_cache.get(key) if key else None
+                    if parts:
+                        results[n] = {"index": n, "action": tasks[n][0]["action"], "parts": parts,
+                                      "seconds": 0.0, "cache_hit": True}
+            pending = [task for task in tasks if task[0]["index"] not in results]
+            if pending:
+                for r in self._render_parts(pending, work_dir, progress_callback):
+                    if keys[r["index"]] and self.segment_cache is not None:
+                        r["parts"] = self.segment_cache.put(keys[r["index"]], r["parts"])
+                    results[r["index"]] = r
+            elif progress_callback:
+                progress_callback(1.0)
+            timings["segments"] = round(time.perf_counter() - started, 3)
+            for name in ("clip_load", "effects_encode"):
+                spent = sum(r.get("timings", {}).get(name, 0.0) for r in results.values())
+                if spent:
+                    timings[name] = round(spent, 3)
+
+            for j, ((edl, plan, output_path), job_refs) in enumerate(zip(jobs, refs)):
+                job_timings = dict(timings)
+                self._join(edl, plan["profile"], [p for n in job_refs for p in results[n]["parts"]], output_path,
+                           os.path.join(work_dir, f"joined_{j}.mp4"), work_dir, job_timings)
+                job_timings["total"] = round(timings["segments"] + sum(
+                    v for k, v in job_timings.items() if k in ("concat", "audio_mix")), 3)
+                owned = [first_use.get(n) == (j, position) for position, n in enumerate(job_refs)]
+                reports.append(self._segmented_report(plan, output_path, [results[n] for n in job_refs], owned,
+                                                      len(tasks), job_timings))
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+            if self.segment_cache is not None:
+                # Only after the join, so parts of this render are never evicted mid-way
+                self.segment_cache.evict()
+        return reports
+
+    def _join(self, edl: dict, profile: dict, parts: list, output_path: str, joined_path: str, work_dir: str,
+              timings: dict):
+        """Concatenate the parts into `output_path`, mixing in the EDL's background music if it has any."""
+        bg_music_path = edl.get('audio_track')
+        has_music = bool(bg_music_path and os.path.exists(bg_music_path))
+        if not has_music:
+            joined_path = output_path
+
+        step = time.perf_counter()
+        concat_copy(parts, joined_path, work_dir, video_codec=profile["video_codec"])
+        timings["concat"] = round(time.perf_counter() - step, 3)
+
+        if has_music:
+            print(f"Adding background music: {bg_music_path}")
+            step = time.perf_counter()
+            audio = profile["audio"] or {"sample_rate": 44100, "channels": 2}
+            self.audio_mixer.mix(joined_path, bg_music_path, output_path, has_audio=profile["audio"] is not None,
+                                 sample_rate=audio["sample_rate"], channels=audio["channels"])
+            timings["audio_mix"] = round(time.perf_counter() - step, 3)
+
+    def _segmented_report(self, plan: dict, output_path: str, results: list, owned: list, rendered_parts: int,
+                          timings: dict) -> dict:
+        """
+        Report of one segmented render. Parts reused from an earlier entry (of this EDL or another one
+        in the batch) are marked "reused" and count no time, frames or bytes of their own.
+        """
+        profile = plan["profile"]
+        report = []
+        frames = written = 0
+        for segment, result, own in zip(plan["segments"], results, owned):
+            entry = {k: v for k, v in segment.items() if k != "cut"}
+            entry["seconds"] = result["seconds"] if own else 0.0
+            entry["cache_hit"] = result.get("cache_hit", False)
+            entry["frames"] = result.get("frames", 0) if own else 0
+            if not own:
+                entry["reused"] = True
+            if result.get("shared_decode"):
+                entry["shared_decode"] = result["shared_decode"]
+            frames += entry["frames"]
+            written += result.get("bytes", 0) if own else 0
+            report.append(entry)
+        hits = sum(1 for entry in report if entry["cache_hit"])
+        written += os.path.getsize(output_path)
+
+        return {
+            "mode": "segments",
+            "quality": self.quality,
+            "output_profile": profile.get("output"),
+            "workers": min(self.workers, rendered_parts),
+            "profile": {k: v for k, v in profile.items() if k != "key"},
+            "segments": report,
+            "segment_cache": {"hits": hits, "misses": len(report) - hits},
+            "timings": timings,
+            "counters": _counters(frames, written, timings["segments"]),
+        }
+
+    def _segment_key(self, segment: dict, profile: dict) -> str:
+        """Content key of a planned part (see SegmentCache.make_key), or None if its source cannot be read."""
+        try:
+            source_hash = self.cache.file_hash(segment["cut"]['source_path'])
+        except OSError:
+            return None
+        return SegmentCache.make_key(segment, profile, source_hash)
+
+    def _render_parts(self, tasks: list, work_dir: str, progress_callback=None) -> list:
+        """
+        Render (segment, profile) pairs, in a process pool when more than one worker is allowed.
+        Overlapping re-encodes of one source are batched into a single decode (render_unit).
+        """
+        total = len(tasks)
+        units = RenderPlanner.shared_decode_groups(tasks)
+        results = []
+
+        if self.workers <= 1 or len(units) == 1:
+            done = 0
+            for unit in units:
+                def unit_progress(p, done=done, size=len(unit)):
+                    if progress_callback:
+                        progress_callback((done + size * p) / total)
+
+                results += render_unit(unit, work_dir, unit_progress)
+                done += len(unit)
+                if progress_callback:
+                    progress_callback(done / total)
+            return results
+
+        # Spawned, not forked: this often runs in a threaded job worker, and a fork copies its locks mid-use
+        executor = ProcessPoolExecutor(max_workers=min(self.workers, len(units)),
+                                       mp_context=multiprocessing.get_context("spawn"))
+        cancel_path = os.path.join(work_dir, "cancel")
+        try:
+            # Workers write their encoder progress to files; poll them for a smooth overall fraction
+            progress_files = {}
+            for unit in units:
+                path = os.path.join(work_dir, f"part_{unit[0][0]['index']:04d}.progress")
+                future = executor.submit(render_unit, unit, work_dir, FileProgress(path, cancel_path=cancel_path))
+                progress_files[future] = (path, len(unit))
+            pending = set(progress_files)
+            while pending:
+                done, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+                for future in done:
+                    results += future.result()
+                if progress_callback:
+                    running = sum(size * FileProgress.read(path) for path, size in map(progress_files.get, pending))
+                    progress_callback((len(results) + running) / total)
+        except BaseException:
+            # Failure/cancellation: running units abort at their next progress update
+            with open(cancel_path, "w") as f:
+                f.write("1")
+            raise
+        finally:
+            # Drops units that have not started yet, then waits for the aborting ones
+            executor.shutdown(wait=True, cancel_futures=True)
+        return results
+
+
+def _counters(frames: int, bytes_written: int, encode_seconds: float) -> dict:
+    return {
+        "frames_encoded": frames,
+        "bytes_written": bytes_written,
+        "encode_fps": round(frames / encode_seconds, 2) if frames and encode_seconds > 0 else 0.0,
+    }
@@ -0,0 +1,57 @@
+import importlib
+import json
+import os
+import time
+
+# What a render worker needs, cheapest dependencies first so each entry is timed on its own cost
+# (numpy is paid by "numpy", not by whatever imports it next). librosa loads its submodules lazily,
+# so the ones BeatAnalyzer uses are listed explicitly.
+WORKER_MODULES = (
+    "numpy",
+    "cv2",
+    "librosa",
+    "librosa.beat",
+    "librosa.onset",
+    "librosa.filters",
+    "moviepy",
+    "yt_dlp",
+    "google.generativeai",
+    "backend.app.services.analyzer",
+    "backend.app.services.director",
+    "backend.app.services.shot_index",
+    "backend.app.services.reference_extractor",
+    "backend.app.services.video_processor",
+    "backend.app.services.pipeline",
+)
+
+
+def timed_imports(modules) -> dict:
+    """
+    Import each module in order; returns {module: seconds}, None for a module that failed to import.
+    Modules already loaded cost (almost) nothing, so the figures are the incremental cold-start cost.
+    """
+    timings = {}
+    for name in modules:
+        started = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            print(f"⚠️ Warm-up import of {name} failed: {e}")
+            timings[name] = None
+            continue
+        timings[name] = round(time.perf_counter() - started, 4)
+    return timings
+
+
+def warm_worker(modules=WORKER_MODULES, report_dir: str = None):
+    """
+    ProcessPoolExecutor initializer: pay the import cost once when the worker starts instead of
+    inside the first job it runs. With `report_dir` the timings are left in
+    `<report_dir>/worker_<pid>.warm.json` for the API process to pick up.
+    """
+    timings = timed_imports(modules)
+    if report_dir:
+        path = os.path.join(report_dir, f"worker_{os.getpid()}.warm.json")
+        with open(f"{path}.tmp", "w") as f:
+            json.dump(timings, f)
+        os.replace(f"{path}.tmp", path)
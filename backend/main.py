@@ -1,6 +1,7 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from backend.app.api import endpoints
+from backend.app.services.paths import MUSIC_DIR, UPLOAD_DIR
 
 from fastapi.staticfiles import StaticFiles
 import os
@@ -8,7 +9,7 @@ import os
 app = FastAPI(title="AI Director-in-a-Box API")
 
 # Ensure uploads dir exists
-os.makedirs("backend/uploads", exist_ok=True)
+os.makedirs(UPLOAD_DIR, exist_ok=True)
 
 # Configure CORS
 app.add_middleware(
@@ -20,14 +21,24 @@ app.add_middleware(
 )
 
 # Serve static files (uploaded and rendered videos)
-app.mount("/static", StaticFiles(directory="backend/uploads"), name="static")
+app.mount("/static", StaticFiles(directory=UPLOAD_DIR), name="static")
 
 # Ensure music dir exists
-os.makedirs("backend/uploads/music", exist_ok=True)
+os.makedirs(MUSIC_DIR, exist_ok=True)
 
 
 app.include_router(endpoints.router, prefix="/api")
 
+@app.on_event("startup")
+async def prewarm_workers():
+    # Start the render workers (and their heavy imports) now rather than in the first request
+    if os.getenv("PREWARM_WORKERS", "1") != "0":
+        endpoints.jobs.warm_up()
+
+@app.on_event("shutdown")
+async def shutdown_workers():
+    endpoints.jobs.shutdown()
+
 @app.get("/health")
 async def health_check():
     return {"status": "ok", "message": "AI Director Service is running"}
@@ -0,0 +1,81 @@
+"""
+EDL validation benchmark: cost of EDLValidator.normalize per plan and per timeline entry.
+
+    python bench_edl_validation.py                   # 10, 100 and 1000 entries, 50 assets
+    python bench_edl_validation.py --entries 5000 --assets 200 --repeat 200
+
+Plans mix what an LLM emits: clip ids only, string times, ranges past the end of the asset,
+continuing cuts to merge, graded entries and unknown transitions. The invalid plan has one bad
+entry at the end, i.e. the worst case for rejection. Validation runs before any file is opened,
+so these figures are the whole cost of turning away a bad plan.
+"""
+import argparse
+import random
+import timeit
+
+from backend.app.services.edl_schema import EDLValidationError, EDLValidator
+
+
+def make_assets(count: int) -> list:
+    return [{"file_id": str(i), "path": f"backend/uploads/{i}_clip.mp4", "type": "video",
+             "metadata": {"duration": 30.0}} for i in range(count)]
+
+
+def make_edl(entries: int, assets: int, seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    timeline = []
+    for i in range(entries):
+        if timeline and rng.random() < 0.2:
+            previous = timeline[-1]
+            entry = {"clip_id": previous["clip_id"], "start": previous["end"], "end": previous["end"] + 1.5}
+        else:
+            start = round(rng.uniform(0, 32), 2)
+            entry = {"clip_id": str(rng.randrange(assets)), "start": str(start), "end": start + rng.uniform(0.5, 4)}
+        if rng.random() < 0.2:
+            entry.update(filter="vibrant", speed=1.2)
+        entry["transition"] = rng.choice(["cut", "cross_dissolve", "flash"])
+        entry["description"] = f"shot {i}"
+        timeline.append(entry)
+    return {"timeline": timeline, "explanation": "benchmark"}
+
+
+def time_call(fn, repeat: int) -> float:
+    """Best per-call seconds over `repeat` calls."""
+    return min(timeit.repeat(fn, number=1, repeat=repeat))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entries", type=int, nargs="*", default=[10, 100, 1000])
+    parser.add_argument("--assets", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=500)
+    args = parser.parse_args()
+
+    assets = make_assets(args.assets)
+    index_seconds = time_call(lambda: EDLValidator(assets), args.repeat)
+    print(f"Asset index ({args.assets} assets): {index_seconds * 1e6:.1f} us")
+    validator = EDLValidator(assets)
+
+    for entries in args.entries:
+        edl = make_edl(entries, args.assets)
+        normalized = validator.normalize(edl)
+        report = normalized["validation"]
+        valid = time_call(lambda: validator.normalize(edl), args.repeat)
+
+        invalid_edl = dict(edl, timeline=edl["timeline"] + [{"clip_id": "missing", "start": 0, "end": 1}])
+
+        def reject():
+            try:
+                validator.normalize(invalid_edl)
+            except EDLValidationError:
+                pass
+
+        invalid = time_call(reject, args.repeat)
+        print(f"{entries:6d} entries -> {len(normalized['timeline']):5d} "
+              f"(clamped {report['clamped']}, dropped {report['dropped']}, merged {report['merged']}): "
+              f"valid {valid * 1e6:9.1f} us ({valid * 1e6 / entries:.2f} us/entry), "
+              f"rejected {invalid * 1e6:9.1f} us")
+
+
+if __name__ == "__main__":
+    main()
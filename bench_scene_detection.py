@@ -0,0 +1,79 @@
+"""
+Benchmark for SceneDetector.
+
+    python bench_scene_detection.py                      # synthesizes a 60s 1080p clip
+    python bench_scene_detection.py --duration 600       # the 10-minute target
+    python bench_scene_detection.py --video my_clip.mp4  # any local file
+
+Reports wall time, the real-time factor (processing time / clip duration) and,
+for synthetic clips, how many of the planted cuts were found.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from backend.app.services.scene_detector import SceneDetector
+
+
+def make_synthetic_clip(path, duration, fps=30, size=(1920, 1080), shot_len=4.0):
+    """Writes shots of moving gradients/noise with a hard cut every `shot_len` seconds."""
+    w, h = size
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (w, h))
+    rng = np.random.default_rng(0)
+    xx = np.linspace(0, 1, w, dtype=np.float32)[None, :]
+    yy = np.linspace(0, 1, h, dtype=np.float32)[:, None]
+
+    total = int(duration * fps)
+    frames_per_shot = int(shot_len * fps)
+    for i in range(total):
+        if i % frames_per_shot == 0:
+            base = rng.integers(0, 255, 3).astype(np.float32)
+            tint = rng.uniform(-120, 120, 3).astype(np.float32)
+            grad = (xx * 0.6 + yy * 0.4) % 1.0
+            shot = np.clip(base[None, None, :] + grad[..., None] * tint[None, None, :], 0, 255).astype(np.uint8)
+        frame = shot.copy()
+        # A moving block so there is in-shot motion to ignore
+        x0 = int((i % frames_per_shot) / frames_per_shot * (w - 200))
+        frame[h // 3:h // 3 + 200, x0:x0 + 200] = 255 - frame[h // 3:h // 3 + 200, x0:x0 + 200]
+        writer.write(frame)
+    writer.release()
+
+    expected = [s * shot_len for s in range(1, int(np.ceil(duration / shot_len)))]
+    return expected
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--video", help="Existing video to analyze")
+    parser.add_argument("--duration", type=float, default=60.0, help="Synthetic clip length (s)")
+    parser.add_argument("--sample-fps", type=float, default=8.0)
+    args = parser.parse_args()
+
+    expected = None
+    video = args.video
+    if not video:
+        video = os.path.join(tempfile.mkdtemp(), "synthetic_1080p.mp4")
+        print(f"Synthesizing {args.duration:.0f}s 1080p clip -> {video}")
+        expected = make_synthetic_clip(video, args.duration)
+
+    detector = SceneDetector(sample_fps=args.sample_fps)
+    start = time.perf_counter()
+    cuts, duration = detector.detect_cuts(video)
+    elapsed = time.perf_counter() - start
+
+    print(f"Clip duration:    {duration:.1f}s")
+    print(f"Detection time:   {elapsed:.2f}s")
+    print(f"Real-time factor: {elapsed / duration:.3f} ({duration / elapsed:.1f}x faster than real time)")
+    print(f"Cuts detected:    {len(cuts)}")
+    if expected is not None:
+        tolerance = 1.0 / args.sample_fps + 1e-6
+        hits = sum(1 for e in expected if any(abs(c - e) <= tolerance for c in cuts))
+        print(f"Planted cuts found: {hits}/{len(expected)} (false positives: {len(cuts) - hits})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Shot search benchmark: top-k query latency over a memmapped keyframe matrix.
+
+    python bench_shot_search.py                          # 10k and 100k shots, 512-d, 3 keyframes each
+    python bench_shot_search.py --shots 1000000 --dim 512 --queries 20
+
+Random unit vectors stand in for CLIP embeddings (the cost of a query does not depend on what
+the vectors mean), and queries are given as vectors, so the timings cover the index itself:
+the chunked matrix-vector product over the memmap, the per-shot max over its keyframes and
+the top-k selection. Text embedding adds one model forward pass per query on top.
+The first query after opening pages the matrix in from disk; later ones hit the page cache.
+"""
+import argparse
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from backend.app.services.shot_index import ColorEmbedder, ShotIndex
+
+
+class RandomEmbedder(ColorEmbedder):
+    name = "random"
+
+
+def build(index_dir: str, shots: int, dim: int, keyframes: int, seed: int = 0) -> float:
+    rng = np.random.default_rng(seed)
+    index = ShotIndex(index_dir, embedder=RandomEmbedder())
+    started = time.perf_counter()
+    per_file = 1000
+    for first in range(0, shots, per_file):
+        count = min(per_file, shots - first)
+        records = [{"file_id": str(first // per_file), "path": f"clip_{first // per_file}.mp4",
+                    "start": float(i), "end": float(i + 1), "keyframes": keyframes} for i in range(count)]
+        index.append(records, rng.standard_normal((count * keyframes, dim), dtype=np.float32))
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--shots", type=int, nargs="*", default=[10000, 100000])
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--keyframes", type=int, default=3)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=50)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(1)
+    for shots in args.shots:
+        index_dir = tempfile.mkdtemp(prefix="bench_shots_")
+        try:
+            build_seconds = build(index_dir, shots, args.dim, args.keyframes)
+            index = ShotIndex(index_dir, embedder=RandomEmbedder())
+            queries = rng.standard_normal((args.queries, args.dim), dtype=np.float32)
+
+            started = time.perf_counter()
+            index.search(queries[0], k=args.k)
+            cold = time.perf_counter() - started
+            timings = []
+            for query in queries[1:]:
+                started = time.perf_counter()
+                index.search(query, k=args.k)
+                timings.append(time.perf_counter() - started)
+            filtered_started = time.perf_counter()
+            index.search(queries[0], k=args.k, file_ids=["0", "1"])
+            filtered = time.perf_counter() - filtered_started
+
+            rows = shots * args.keyframes
+            warm = float(np.median(timings)) if timings else cold
+            print(f"{shots:8d} shots ({rows} rows x {args.dim}, {rows * args.dim * 4 / 1e6:.0f} MB): "
+                  f"build {build_seconds:.2f}s, first query {cold * 1e3:.1f} ms, "
+                  f"median {warm * 1e3:.1f} ms ({rows / warm / 1e6:.1f}M rows/s), "
+                  f"filtered {filtered * 1e3:.1f} ms")
+        finally:
+            shutil.rmtree(index_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Cold-start benchmark: API process import time and worker warm-up cost, per module.
+
+    python bench_startup.py              # API import + worker warm-up, top 15 modules each
+    python bench_startup.py --top 40
+    python bench_startup.py --api-only
+
+The API import is measured with `python -X importtime -c "import backend.main"` in a fresh
+interpreter; any heavy library showing up there is a cold-start regression. The worker side
+runs warmup.timed_imports(WORKER_MODULES) in a fresh interpreter, i.e. what each job worker
+pays once when it starts.
+"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+HEAVY_MODULES = ("numpy", "cv2", "librosa", "moviepy", "yt_dlp", "google.generativeai", "torch", "transformers")
+
+
+def api_import_times() -> dict:
+    """{module: (self_seconds, cumulative_seconds)} from -X importtime, plus the wall time."""
+    started = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "import backend.main"],
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, check=True)
+    wall = time.perf_counter() - started
+    modules = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        modules[name] = (int(own) / 1e6, int(cumulative) / 1e6)
+    return {"wall": wall, "modules": modules}
+
+
+def worker_import_times() -> dict:
+    code = ("import json; from backend.app.services.warmup import WORKER_MODULES, timed_imports; "
+            "print(json.dumps(timed_imports(WORKER_MODULES)))")
+    proc = subprocess.run([sys.executable, "-c", code], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                          text=True, check=True)
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--api-only", action="store_true")
+    args = parser.parse_args()
+
+    api = api_import_times()
+    modules = api["modules"]
+    print(f"API process: import backend.main in {modules.get('backend.main', (0, 0))[1]:.3f}s "
+          f"({api['wall']:.2f}s wall incl. interpreter start)")
+    for name, (own, cumulative) in sorted(modules.items(), key=lambda m: -m[1][1])[:args.top]:
+        print(f"  {cumulative:8.3f}s cumulative {own:8.3f}s self  {name}")
+    loaded = [m for m in HEAVY_MODULES if m in modules]
+    print(f"Heavy modules loaded by the API: {', '.join(loaded) if loaded else 'none'}")
+
+    if args.api_only:
+        return
+    worker = worker_import_times()
+    total = sum(s for s in worker.values() if s is not None)
+    print(f"\nWorker warm-up: {total:.2f}s of imports per worker process")
+    for name, seconds in sorted(worker.items(), key=lambda m: -(m[1] or 0))[:args.top]:
+        print(f"  {'failed' if seconds is None else f'{seconds:8.3f}s'}  {name}")
+
+
+if __name__ == "__main__":
+    main()
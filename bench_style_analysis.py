@@ -0,0 +1,58 @@
+"""
+Benchmark for StyleAnalyzer (reference style fingerprints).
+
+    python bench_style_analysis.py                      # synthesizes a 60s 360p clip
+    python bench_style_analysis.py --duration 600       # the 10-minute target (< 10s)
+    python bench_style_analysis.py --video my_ref.mp4   # any local file, e.g. a downloaded reference
+
+Reports wall time, the real-time factor and the fingerprint summary. Synthetic clips are encoded
+with B-frames like real streaming video, since the fast decode path skips those.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from backend.app.services.ffmpeg_tools import run_ffmpeg
+from backend.app.services.style_analyzer import StyleAnalyzer
+from bench_scene_detection import make_synthetic_clip
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--video", help="Existing video to analyze")
+    parser.add_argument("--duration", type=float, default=60.0, help="Synthetic clip length (s)")
+    parser.add_argument("--sample-fps", type=float, default=4.0)
+    args = parser.parse_args()
+
+    expected = None
+    video = args.video
+    if not video:
+        tmp = tempfile.mkdtemp()
+        raw = os.path.join(tmp, "synthetic_raw.mp4")
+        video = os.path.join(tmp, "synthetic_360p.mp4")
+        print(f"Synthesizing {args.duration:.0f}s 360p clip -> {video}")
+        expected = make_synthetic_clip(raw, args.duration, size=(640, 360))
+        run_ffmpeg(["-i", raw, "-c:v", "libx264", "-preset", "veryfast", "-pix_fmt", "yuv420p", video])
+
+    analyzer = StyleAnalyzer(sample_fps=args.sample_fps)
+    start = time.perf_counter()
+    style = analyzer.analyze(video)
+    elapsed = time.perf_counter() - start
+
+    duration = style["duration"]
+    print(f"Clip duration:    {duration:.1f}s")
+    print(f"Analysis time:    {elapsed:.2f}s")
+    print(f"Real-time factor: {elapsed / duration:.3f} ({duration / elapsed:.1f}x faster than real time)")
+    print(f"Shots:            {style['shot_count']} (ASL {style['avg_shot_length']:.2f}s, "
+          f"median {style['shot_lengths']['median']:.2f}s, pacing {style['pacing']})")
+    print(f"Colour:           {style['color']['vibe']} / {style['color']['tone']}")
+    print(f"Motion:           {style['motion']['level']} ({style['motion']['mean']:.3f})")
+    if expected is not None:
+        tolerance = 1.0 / args.sample_fps + 1e-6
+        hits = sum(1 for e in expected if any(abs(c - e) <= tolerance for c in style["cut_times"]))
+        print(f"Planted cuts found: {hits}/{len(expected)} (false positives: {len(style['cut_times']) - hits})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+"""pytest setup: everything the app writes during the tests goes to a temporary data dir, not the working tree."""
+import os
+import tempfile
+
+os.environ.setdefault("APP_DATA_DIR", tempfile.mkdtemp(prefix="app_data_"))
@@ -0,0 +1,89 @@
+import os
+import tempfile
+import unittest
+
+from backend.app.services.analysis_cache import AnalysisCache
+
+
+class TestAnalysisCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.cache = AnalysisCache(cache_dir=os.path.join(self.tmp, "cache"), max_bytes=1024 * 1024)
+        self.asset = os.path.join(self.tmp, "clip.mp4")
+        with open(self.asset, "wb") as f:
+            f.write(b"fake video bytes")
+
+    def test_get_or_compute_hits_after_first_call(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return {"duration": 12.5}
+
+        first = self.cache.get_or_compute(self.asset, "metadata", {}, compute, version="1")
+        second = self.cache.get_or_compute(self.asset, "metadata", {}, compute, version="1")
+        self.assertEqual(first, second)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(self.cache.stats()["hits"], 1)
+        self.assertEqual(self.cache.stats()["misses"], 1)
+
+    def test_key_is_content_addressed(self):
+        copy = os.path.join(self.tmp, "renamed.mp4")
+        with open(copy, "wb") as f:
+            f.write(b"fake video bytes")
+        self.cache.get_or_compute(self.asset, "metadata", {}, lambda: {"v": 1})
+        value = self.cache.get_or_compute(copy, "metadata", {}, lambda: {"v": 2})
+        self.assertEqual(value, {"v": 1})
+
+        # Params and version are part of the key
+        value = self.cache.get_or_compute(copy, "metadata", {"threshold": 10}, lambda: {"v": 3})
+        self.assertEqual(value, {"v": 3})
+        value = self.cache.get_or_compute(copy, "metadata", {}, lambda: {"v": 4}, version="2")
+        self.assertEqual(value, {"v": 4})
+
+    def test_changed_file_misses(self):
+        self.cache.get_or_compute(self.asset, "metadata", {}, lambda: {"v": 1})
+        with open(self.asset, "wb") as f:
+            f.write(b"re-exported video with different bytes")
+        value = self.cache.get_or_compute(self.asset, "metadata", {}, lambda: {"v": 2})
+        self.assertEqual(value, {"v": 2})
+
+    def test_lru_eviction_respects_size_budget(self):
+        cache = AnalysisCache(cache_dir=os.path.join(self.tmp, "small"), max_bytes=4000)
+        payload = "x" * 900
+        for i in range(3):
+            cache.put(f"{i:064x}", payload)
+        # Touch the oldest so it becomes most recently used
+        os.utime(cache._path(f"{0:064x}"), (1, 1))
+        os.utime(cache._path(f"{1:064x}"), (2, 2))
+        os.utime(cache._path(f"{2:064x}"), (3, 3))
+        self.assertIsNotNone(cache.get(f"{0:064x}"))
+
+        for i in range(3, 6):
+            cache.put(f"{i:064x}", payload)
+
+        self.assertLessEqual(cache.stats()["bytes"], 4000)
+        self.assertGreater(cache.stats()["evictions"], 0)
+        self.assertIsNone(cache.get(f"{1:064x}"))
+        self.assertIsNotNone(cache.get(f"{0:064x}"))
+
+    def test_array_entries_round_trip_and_count_towards_the_budget(self):
+        import numpy as np
+
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return {"motion": np.arange(5, dtype=np.float32), "audio_rms": np.zeros(5, dtype=np.float32)}
+
+        first = self.cache.get_or_compute_arrays(self.asset, "features", {}, compute)
+        second = self.cache.get_or_compute_arrays(self.asset, "features", {}, compute)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(second), ["audio_rms", "motion"])
+        np.testing.assert_array_equal(first["motion"], second["motion"])
+        self.assertEqual(second["motion"].dtype, np.float32)
+        self.assertEqual(self.cache._scan_size(), self.cache.stats()["bytes"])
+
+
+if __name__ == "__main__":
+    unittest.main()
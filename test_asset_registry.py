@@ -0,0 +1,67 @@
+import os
+import tempfile
+import unittest
+
+from backend.app.services.asset_registry import AssetRegistry
+
+
+class TestAssetRegistry(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.registry = AssetRegistry(db_path=os.path.join(self.tmp, "assets.db"))
+
+    def _touch(self, name, data=b"x"):
+        path = os.path.join(self.tmp, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def test_add_get_and_hash_lookup(self):
+        path = self._touch("abc.mp4", b"video bytes")
+        self.registry.add("abc", path, "video", filename="holiday.mp4", sha256="f00")
+        asset = self.registry.get("abc")
+        self.assertEqual(asset["path"], path)
+        self.assertEqual(asset["size"], len(b"video bytes"))
+        self.assertEqual(self.registry.find_by_hash("f00")["file_id"], "abc")
+        self.assertIsNone(self.registry.find_by_hash("f00", kind="music"))
+        self.assertIsNone(self.registry.get("ab"))  # exact ids only, no prefix matching
+
+    def test_analysis_survives_re_add(self):
+        path = self._touch("abc.mp4")
+        self.registry.add("abc", path, "video")
+        self.registry.set_analysis("abc", {"metadata": {"duration": 3.0}})
+        self.registry.add("abc", path, "video", sha256="f00")
+        self.assertEqual(self.registry.get("abc")["analysis"], {"metadata": {"duration": 3.0}})
+
+    def test_list_is_paginated_and_filtered(self):
+        for i in range(5):
+            self.registry.add(f"v{i}", self._touch(f"v{i}.mp4"), "video")
+        self.registry.add("m0", self._touch("music/m0.mp3"), "music")
+
+        page = self.registry.list(kind="video", limit=2, offset=2)
+        self.assertEqual(page["total"], 5)
+        self.assertEqual([a["file_id"] for a in page["items"]], ["v2", "v3"])
+        self.assertEqual(self.registry.list(kind="music")["total"], 1)
+        self.assertEqual(set(self.registry.get_many(["v0", "m0", "nope"])), {"v0", "m0"})
+        by_path = self.registry.get_many_by_path([os.path.join(self.tmp, "v1.mp4"), "/nope.mp4"])
+        self.assertEqual([a["file_id"] for a in by_path.values()], ["v1"])
+
+    def test_rebuild_indexes_existing_files_and_prunes_missing(self):
+        self._touch("uploads/one.mp4", b"one")
+        self._touch("uploads/render_job.mp4", b"output")
+        self._touch("uploads/.partial/two.mp4", b"partial")
+        self._touch("uploads/music/song.mp3", b"song")
+        self.registry.add("gone", os.path.join(self.tmp, "uploads", "gone.mp4"), "video")
+
+        count = self.registry.rebuild(os.path.join(self.tmp, "uploads"), os.path.join(self.tmp, "uploads", "music"))
+        self.assertEqual(count, 2)
+        self.assertEqual(self.registry.get("one")["kind"], "video")
+        self.assertEqual(self.registry.get("song")["kind"], "music")
+        self.assertIsNotNone(self.registry.get("one")["sha256"])
+        self.assertIsNone(self.registry.get("gone"))
+        self.assertIsNone(self.registry.get("render_job"))
+
+
+if __name__ == "__main__":
+    unittest.main()
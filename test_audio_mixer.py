@@ -0,0 +1,130 @@
+import os
+import tempfile
+import threading
+import unittest
+
+import numpy as np
+
+from backend.app.services.audio_mixer import AudioMixer, LoopedMusic
+from backend.app.services.ffmpeg_tools import decode_audio_blocks, probe_streams, run_ffmpeg
+
+
+def _tone_level(samples: np.ndarray, sample_rate: int, freq: float) -> float:
+    """Magnitude of `freq` in a mono signal (single DFT bin)."""
+    t = np.arange(len(samples)) / sample_rate
+    return float(np.abs(np.sum(samples * np.exp(-2j * np.pi * freq * t))) / len(samples))
+
+
+class TestGainCurve(unittest.TestCase):
+    def test_ducks_ahead_of_speech_and_holds_over_gaps(self):
+        mixer = AudioMixer(music_volume=0.3, duck_db=-10.0, threshold_db=-40.0, hop=0.01, hold=0.3, smooth=0.2)
+        env = np.full(600, -80.0)
+        env[200:300] = -20.0  # 1s of speech at 2.0s
+        env[310:400] = -20.0  # a 0.1s pause, then more speech
+        gains = mixer.gain_curve(env)
+
+        ducked = 0.3 * 10 ** (-10 / 20)
+        self.assertAlmostEqual(gains[0], 0.3, places=5)
+        self.assertAlmostEqual(gains[250], ducked, places=4)
+        # The pause between words stays ducked; no pumping
+        self.assertAlmostEqual(gains[305], ducked, places=4)
+        # The dip starts before the speech does
+        self.assertLess(gains[199], 0.3)
+        self.assertAlmostEqual(gains[-1], 0.3, places=5)
+
+    def test_loop_crossfade(self):
+        sr = 100
+        mixer = AudioMixer(crossfade=1.0)
+        music = np.linspace(0.0, 1.0, 500, dtype=np.float32)[:, None]
+        cycle, period = mixer._loop_cycle(music, sr)
+        self.assertEqual(period, 400)
+
+        first_pass = AudioMixer.music_segment(music, cycle, period, 0, 400)
+        np.testing.assert_array_equal(first_pass, music[:400])
+        # At the loop point the tail fades out into the head fading in (equal power)
+        joined = AudioMixer.music_segment(music, cycle, period, 390, 1300)
+        self.assertLess(np.abs(np.diff(joined[:, 0])).max(), 0.05)
+        np.testing.assert_allclose(AudioMixer.music_segment(music, cycle, period, 950, 960), music[150:160])
+
+    def test_streamed_loop_matches_the_decoded_track(self):
+        sr = 8000
+        path = os.path.join(tempfile.mkdtemp(), "music.wav")
+        run_ffmpeg(["-f", "lavfi", "-i", "anoisesrc=sample_rate=8000:seed=3", "-t", "5", "-ac", "2", path])
+        music = np.concatenate(list(decode_audio_blocks(path, sr, 1 << 16, 2)))
+        # Streamed, no crossfade, short track looped from memory, whole track read while buffering the head
+        for crossfade, block_samples in ((1.0, 3000), (0.0, 3000), (4.0, 3000), (2.3, 1 << 16)):
+            cycle, period = AudioMixer(crossfade=crossfade)._loop_cycle(music, sr)
+            looped = LoopedMusic(path, sr, 2, crossfade, block_samples=block_samples)
+            streamed = np.concatenate([looped.read(n) for n in (100, 7000, 29000, 1, 15899)])
+            looped.close()
+            np.testing.assert_allclose(streamed, AudioMixer.music_segment(music, cycle, period, 0, 52000), atol=1e-6)
+            self.assertEqual((looped.length, looped.period), (len(music), period))
+
+
+class TestDecodeAudioBlocks(unittest.TestCase):
+    def test_noisy_stream_does_not_stall(self):
+        tmp = tempfile.mkdtemp()
+        clean, damaged = os.path.join(tmp, "clean.mp3"), os.path.join(tmp, "damaged.mp3")
+        run_ffmpeg(["-f", "lavfi", "-i", "sine=frequency=440:sample_rate=8000", "-t", "600",
+                    "-c:a", "libmp3lame", "-b:a", "16k", clean])
+        data = bytearray(open(clean, "rb").read())
+        for i in range(4096, len(data), 97):
+            data[i] ^= 0xFF
+        with open(damaged, "wb") as f:
+            f.write(bytes(data))
+
+        # ffmpeg logs far more errors than a pipe buffer holds while it decodes this
+        decoded = []
+        worker = threading.Thread(target=lambda: decoded.extend(decode_audio_blocks(damaged, 8000)), daemon=True)
+        worker.start()
+        worker.join(60)
+        self.assertFalse(worker.is_alive())
+        self.assertGreater(sum(len(block) for block in decoded), 0)
+
+
+class TestMix(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.mkdtemp()
+        cls.video = os.path.join(cls.tmp, "video.mp4")
+        # 8s of video; its audio is a 440 Hz "voice" only between 4s and 8s
+        run_ffmpeg([
+            "-f", "lavfi", "-i", "testsrc=size=160x90:rate=25",
+            "-f", "lavfi", "-i", "sine=frequency=440:sample_rate=44100",
+            "-t", "8", "-af", "volume=enable='lt(t,4)':volume=0",
+            "-c:v", "libx264", "-pix_fmt", "yuv420p", "-c:a", "aac", "-shortest", cls.video,
+        ])
+        cls.music = os.path.join(cls.tmp, "music.m4a")
+        run_ffmpeg(["-f", "lavfi", "-i", "sine=frequency=1000:sample_rate=44100", "-t", "3", cls.music])
+
+    def test_music_loops_and_ducks_under_original_audio(self):
+        output = os.path.join(self.tmp, "mixed.mp4")
+        report = AudioMixer().mix(self.video, self.music, output)
+
+        self.assertAlmostEqual(report["duration"], 8.0, delta=0.15)
+        self.assertGreaterEqual(report["loops"], 2)
+        self.assertGreater(report["ducked"], 0.3)
+        self.assertLess(report["ducked"], 0.7)
+        info = probe_streams(output)
+        self.assertEqual(info["video"]["codec"], "h264")
+        self.assertAlmostEqual(info["duration"], 8.0, delta=0.2)
+
+        mixed = np.concatenate(list(decode_audio_blocks(output, 8000, 1 << 16)))
+        quiet = _tone_level(mixed[int(1.0 * 8000):int(3.0 * 8000)], 8000, 1000)
+        under_voice = _tone_level(mixed[int(5.0 * 8000):int(6.0 * 8000)], 8000, 1000)
+        self.assertAlmostEqual(under_voice / quiet, 10 ** (-10 / 20), delta=0.08)
+        self.assertGreater(_tone_level(mixed[int(5.0 * 8000):int(6.0 * 8000)], 8000, 440), 0.04)
+
+    def test_video_without_audio(self):
+        silent = os.path.join(self.tmp, "silent.mp4")
+        run_ffmpeg(["-f", "lavfi", "-i", "testsrc=size=160x90:rate=25", "-t", "4",
+                    "-c:v", "libx264", "-pix_fmt", "yuv420p", silent])
+        output = os.path.join(self.tmp, "music_only.mp4")
+        report = AudioMixer().mix(silent, self.music, output, has_audio=False)
+        self.assertAlmostEqual(report["duration"], 4.0, delta=0.1)
+        self.assertEqual(report["ducked"], 0.0)
+        self.assertIsNotNone(probe_streams(output)["audio"])
+
+
+if __name__ == "__main__":
+    unittest.main()
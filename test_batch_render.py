@@ -0,0 +1,105 @@
+import os
+import tempfile
+import unittest
+
+from backend.app.services.analysis_cache import AnalysisCache
+from backend.app.services.ffmpeg_tools import probe_streams, run_ffmpeg
+from backend.app.services.job_queue import JobContext
+from backend.app.services.pipeline import run_batch_job
+from backend.app.services.render_planner import RenderPlanner
+from backend.app.services.video_processor import VideoProcessor
+
+
+def _segment(index, action, start, end, source="a.mp4", copy_start=None):
+    segment = {"index": index, "action": action, "cut": {"source_path": source, "start": start, "end": end}}
+    if copy_start is not None:
+        segment["copy_start"] = copy_start
+    return segment, {"fps": 25.0}
+
+
+class TestSharedDecodeGroups(unittest.TestCase):
+    def test_overlapping_reencodes_of_one_source_share_a_unit(self):
+        tasks = [
+            _segment(0, "encode", 0.0, 2.0),
+            _segment(1, "copy", 0.0, 2.0),
+            _segment(2, "smart", 2.5, 8.0, copy_start=4.0),   # head 2.5-4.0, within the gap
+            _segment(3, "encode", 1.0, 3.0, source="b.mp4"),
+            _segment(4, "encode", 10.0, 12.0),                 # too far away
+            _segment(5, "effects", 0.0, 2.0),
+            _segment(6, "smart", 1.0, 3.5, copy_start=1.0),   # no head, only a re-encoded tail
+        ]
+        units = RenderPlanner.shared_decode_groups(tasks, max_gap=1.0)
+        self.assertEqual([[pair[0]["index"] for pair in unit] for unit in units], [[0, 2], [1], [3], [4], [5], [6]])
+
+    def test_group_size_is_capped(self):
+        tasks = [_segment(i, "encode", i * 0.5, i * 0.5 + 1.0) for i in range(5)]
+        units = RenderPlanner.shared_decode_groups(tasks, max_outputs=2)
+        self.assertEqual([len(unit) for unit in units], [2, 2, 1])
+
+
+class TestBatchRender(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.mkdtemp()
+        cls.src = os.path.join(cls.tmp, "src.mp4")
+        run_ffmpeg([
+            "-f", "lavfi", "-i", "testsrc=size=320x180:rate=25",
+            "-f", "lavfi", "-i", "sine=frequency=440:sample_rate=44100",
+            "-t", "8", "-c:v", "libx264", "-g", "250", "-pix_fmt", "yuv420p", "-c:a", "aac", "-shortest", cls.src,
+        ])
+
+    def test_variants_share_parts_and_decodes(self):
+        processor = VideoProcessor(cache=AnalysisCache(cache_dir=os.path.join(self.tmp, "cache")), workers=1,
+                                   segment_cache=False)
+        square = {"base": "landscape_1080p", "name": "square", "width": 180, "height": 180, "fit": "crop"}
+        cuts = [{"clip_id": "1", "source_path": self.src, "start": 1.0, "end": 3.0},
+                {"clip_id": "1", "source_path": self.src, "start": 3.5, "end": 5.0}]
+        progress = []
+        reports = processor.render_batch([
+            {"edl": {"timeline": cuts}, "output_path": os.path.join(self.tmp, "a.mp4")},
+            {"edl": {"timeline": cuts[:1]}, "output_path": os.path.join(self.tmp, "b.mp4")},
+            {"edl": {"timeline": cuts}, "output_path": os.path.join(self.tmp, "c.mp4"), "output_profile": square},
+        ], progress_callback=progress.append)
+
+        self.assertEqual(progress[-1], 1.0)
+        # The second variant's only entry is the first variant's first part
+        self.assertEqual(reports[1]["segments"][0].get("reused"), True)
+        self.assertEqual(reports[1]["counters"]["frames_encoded"], 0)
+        # No keyframe after 0s: every distinct part is re-encoded, and all of them from one decode
+        self.assertEqual([s["action"] for s in reports[2]["segments"]], ["encode", "encode"])
+        self.assertTrue(all(s.get("shared_decode") == 4 for s in reports[0]["segments"] + reports[2]["segments"]))
+        self.assertEqual(reports[2]["output_profile"], "square")
+
+        for name, size, duration in (("a.mp4", (320, 180), 3.5), ("b.mp4", (320, 180), 2.0),
+                                     ("c.mp4", (180, 180), 3.5)):
+            info = probe_streams(os.path.join(self.tmp, name))
+            self.assertEqual((info["video"]["width"], info["video"]["height"]), size)
+            self.assertAlmostEqual(info["duration"], duration, delta=0.15)
+            self.assertIsNotNone(info["audio"])
+
+    def test_batch_job_plans_every_variant_once(self):
+        ctx = JobContext("batch-test", tempfile.mkdtemp())
+        result = run_batch_job({
+            "assets": [{"file_id": "1", "path": self.src}],
+            "prompt": "A day out",
+            "render_workers": 1,
+            "variants": [{"name": "wide"}, {"name": "tall", "output_profile": "vertical_1080", "style": "vlog"}],
+        }, ctx)
+        try:
+            self.assertEqual([v["name"] for v in result["variants"]], ["wide", "tall"])
+            self.assertEqual(result["variants"][1]["output_profile"], "vertical_1080")
+            for variant in result["variants"]:
+                self.assertTrue(os.path.exists(variant["output_path"]))
+                self.assertEqual(variant["edl"]["timeline"][0]["source_path"], self.src)
+            tall = probe_streams(result["variants"][1]["output_path"])["video"]
+            self.assertEqual((tall["width"], tall["height"]), (1080, 1920))
+            stages = [span["stage"] for span in result["trace"]["spans"]]
+            self.assertEqual(stages.count("metadata"), 1)
+            self.assertEqual(stages.count("director"), 1)
+        finally:
+            for variant in result["variants"]:
+                os.remove(variant["output_path"])
+
+
+if __name__ == "__main__":
+    unittest.main()
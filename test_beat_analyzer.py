@@ -0,0 +1,77 @@
+import os
+import tempfile
+import unittest
+import wave
+
+import numpy as np
+
+from backend.app.services.beat_analyzer import BeatAnalyzer
+
+
+def _write_click_track(path, bpm=120.0, seconds=20.0, sr=22050, offset=0.25):
+    """Hi-hat click on every beat, plus a low kick on the first beat of each 4/4 bar."""
+    t = np.arange(int(seconds * sr)) / sr
+    y = np.zeros_like(t)
+    beat = 60.0 / bpm
+    for n, start in enumerate(np.arange(offset, seconds - 0.2, beat)):
+        i = int(start * sr)
+        tail = t[:int(0.08 * sr)]
+        click = 0.3 * np.sin(2 * np.pi * 3000 * tail) * np.exp(-tail * 60)
+        y[i:i + len(click)] += click[:len(y) - i]
+        if n % 4 == 1:  # bars start on the second click
+            kick = 0.9 * np.sin(2 * np.pi * 60 * tail) * np.exp(-tail * 25)
+            y[i:i + len(kick)] += kick[:len(y) - i]
+    pcm = (np.clip(y, -1, 1) * 32767).astype(np.int16)
+    with wave.open(path, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(sr)
+        w.writeframes(pcm.tobytes())
+
+
+class TestBeatAnalyzer(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.mkdtemp()
+        cls.path = os.path.join(cls.tmp, "clicks.wav")
+        _write_click_track(cls.path)
+
+    def test_full_track_beats_and_downbeats(self):
+        result = BeatAnalyzer().analyze(self.path)
+        self.assertAlmostEqual(result["duration"], 20.0, places=1)
+        self.assertAlmostEqual(result["tempo"], 120.0, delta=3.0)
+        # Beats cover the whole track, not just a prefix
+        self.assertGreater(result["beat_times"][-1], 18.0)
+        self.assertTrue(np.allclose(np.diff(result["beat_times"]), 0.5, atol=0.05))
+        # Downbeats are every 4th beat, on the kicks (0.75 + 2k)
+        downbeats = np.array(result["downbeat_times"])
+        self.assertTrue(np.allclose(np.diff(downbeats), 2.0, atol=0.08))
+        self.assertLess(abs(((downbeats[0] - 0.75) + 1.0) % 2.0 - 1.0), 0.08)
+        self.assertGreaterEqual(len(result["onset_times"]), 30)
+        self.assertEqual(len(result["onset_times"]), len(result["onset_strengths"]))
+        envelope = result["energy_envelope"]
+        self.assertAlmostEqual(len(envelope["values"]) / envelope["rate"], 20.0, delta=0.5)
+        self.assertAlmostEqual(max(envelope["values"]), 1.0)
+
+    def test_block_size_does_not_change_features(self):
+        small = BeatAnalyzer(block_seconds=0.37).features(self.path)
+        large = BeatAnalyzer(block_seconds=60).features(self.path)
+        self.assertEqual(len(small["onset"]), len(large["onset"]))
+        self.assertTrue(np.allclose(small["onset"], large["onset"], atol=1e-3))
+        self.assertTrue(np.allclose(small["rms"], large["rms"], atol=1e-5))
+
+    def test_reduced_sample_rate(self):
+        result = BeatAnalyzer(sample_rate=11025).analyze(self.path)
+        self.assertEqual(result["sample_rate"], 11025)
+        self.assertAlmostEqual(result["tempo"], 120.0, delta=3.0)
+
+    def test_unreadable_file_raises(self):
+        bogus = os.path.join(self.tmp, "bogus.mp3")
+        with open(bogus, "wb") as f:
+            f.write(b"not audio")
+        with self.assertRaises(ValueError):
+            BeatAnalyzer().analyze(bogus)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+import os
+import time
+import unittest
+
+import numpy as np
+
+from backend.app.services.audio_mixer import AudioMixer
+from backend.app.services.beat_sync import BeatGrid
+from backend.app.services.director import Director
+
+
+def _grid(bpm=120.0, seconds=60.0, offset=0.2):
+    beats = np.arange(offset, seconds, 60.0 / bpm)
+    return BeatGrid(beats, beats[::4], duration=seconds)
+
+
+def _boundaries(timeline):
+    return np.cumsum([(c['end'] - c['start']) / c.get('speed', 1.0) for c in timeline])
+
+
+class TestBeatGrid(unittest.TestCase):
+    def test_nearest(self):
+        grid = np.array([0.5, 1.0, 1.5, 2.0])
+        self.assertEqual(BeatGrid.nearest(grid, [0.0, 0.7, 0.8, 1.74, 9.0]).tolist(), [0, 0, 1, 2, 3])
+
+    def test_cut_points_land_on_beats(self):
+        grid = _grid()
+        timeline = [{"clip_id": "a", "start": 1.0, "end": 2.3}, {"clip_id": "b", "start": 0.0, "end": 0.9},
+                    {"clip_id": "c", "start": 5.0, "end": 6.1, "speed": 2.0}]
+        summary = grid.snap_timeline(timeline, unit="beat")
+        self.assertEqual(summary["snapped"], 3)
+        offsets = (_boundaries(timeline) - 0.2) / 0.5
+        self.assertTrue(np.allclose(offsets, np.round(offsets), atol=1e-3))
+        # Starts are untouched; only the out points move
+        self.assertEqual([c["start"] for c in timeline], [1.0, 0.0, 5.0])
+
+    def test_short_cuts_never_collapse(self):
+        grid = _grid()
+        timeline = [{"clip_id": str(i), "start": 0.0, "end": 0.1} for i in range(6)]
+        grid.snap_timeline(timeline, unit="beat")
+        self.assertTrue(all(c["end"] - c["start"] > 0.15 for c in timeline))
+        self.assertEqual(len(set(np.round(_boundaries(timeline), 3))), 6)
+
+    def test_source_length_is_respected(self):
+        grid = _grid()
+        # 1.5s source: nearest beat would need 1.8s, so the cut drops back to the previous beat
+        timeline = [{"clip_id": "a", "start": 0.0, "end": 1.45}]
+        grid.snap_timeline(timeline, clip_durations={"a": 1.5}, unit="beat")
+        self.assertAlmostEqual(timeline[0]["end"], 1.2)
+
+    def test_bars_and_looped_music(self):
+        grid = _grid(seconds=8.0)  # 8s track looped under a longer edit
+        timeline = [{"clip_id": "a", "start": 0.0, "end": 5.0}, {"clip_id": "b", "start": 0.0, "end": 6.0}]
+        summary = grid.snap_timeline(timeline, unit="bar")
+        self.assertEqual(summary["snapped"], 2)
+        b = _boundaries(timeline)
+        self.assertAlmostEqual(b[0], 4.2)
+        self.assertAlmostEqual(b[1], 10.2)  # 2.2 + 8.0 on the second pass of the loop
+
+    def test_grid_follows_the_crossfaded_loop(self):
+        beats = np.arange(0.2, 9.0, 0.5).tolist()
+        analysis = {"beat_times": beats, "downbeat_times": beats[::4], "duration": 9.0}
+        grid = BeatGrid.from_analysis(analysis, AudioMixer(crossfade=2.0).loop_period)
+        # Every pass after the first starts 2s before the track ends
+        np.testing.assert_allclose(grid.grid("bar", until=12.0)[:8], [0.2, 2.2, 4.2, 6.2, 7.2, 9.2, 11.2, 13.2])
+        timeline = [{"clip_id": "a", "start": 0.0, "end": 7.1}]
+        grid.snap_timeline(timeline, unit="bar")
+        self.assertAlmostEqual(timeline[0]["end"], 7.2)
+
+    def test_large_timeline_is_fast(self):
+        grid = _grid(bpm=128, seconds=3600)
+        rng = np.random.default_rng(0)
+        starts = rng.uniform(0, 20, 800)
+        timeline = [{"clip_id": str(i), "source_path": f"{i}.mp4", "start": float(s), "end": float(s + d)}
+                    for i, (s, d) in enumerate(zip(starts, rng.uniform(0.3, 4, 800)))]
+        durations = {str(i): 60.0 for i in range(800)}
+        started = time.perf_counter()
+        summary = grid.snap_timeline(timeline, durations)
+        self.assertLess(time.perf_counter() - started, 0.1)
+        self.assertEqual(summary["snapped"], 800)
+
+
+class TestDirectorBeatSync(unittest.TestCase):
+    def setUp(self):
+        os.environ.pop("GEMINI_API_KEY", None)
+
+    def test_heuristic_edit_is_snapped(self):
+        assets = [{"file_id": str(i), "path": f"{i}.mp4", "metadata": {"duration": 10.0}, "type": "video"}
+                  for i in range(4)]
+        beats = np.arange(0.1, 30, 0.45).tolist()
+        music = {"beat_times": beats, "downbeat_times": beats[::4], "duration": 30.0}
+        edl = Director().generate_edit_script("daily vlog", assets, music_analysis=music)
+        self.assertEqual(edl["beat_sync"]["snapped"], 4)
+        offsets = (_boundaries(edl["timeline"]) - 0.1) / 0.45
+        self.assertTrue(np.allclose(offsets, np.round(offsets), atol=1e-3))
+
+
+if __name__ == "__main__":
+    unittest.main()
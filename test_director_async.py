@@ -0,0 +1,58 @@
+import asyncio
+import time
+import unittest
+
+from backend.app.services.director import Director
+from test_llm_cache import ASSETS, StubModel
+
+
+class TestAsyncDirector(unittest.TestCase):
+    def test_fast_llm_wins(self):
+        d = Director(model=StubModel(delay=0.01))
+        edl = asyncio.run(d.generate_edit_script_async("vlog", ASSETS, timeout=2, hedge_after=1))
+        self.assertEqual(edl["explanation"], "stub")
+        self.assertEqual(edl["director"]["path"], "llm")
+        self.assertTrue(edl["director"]["hedged"])
+        self.assertIsNotNone(edl["director"]["latency"]["llm"])
+        self.assertIsNotNone(edl["director"]["latency"]["heuristic"])
+
+    def test_timeout_falls_back_to_heuristic(self):
+        d = Director(model=StubModel(delay=1.0))
+        started = time.perf_counter()
+        edl = asyncio.run(d.generate_edit_script_async("vlog", ASSETS, timeout=0.1))
+        self.assertLess(time.perf_counter() - started, 0.5)
+        self.assertEqual(edl["director"]["path"], "heuristic")
+        self.assertIsNone(edl["director"]["latency"]["llm"])
+        self.assertIn("Heuristic fallback", edl["explanation"])
+
+    def test_hedge_returns_heuristic_within_budget(self):
+        d = Director(model=StubModel(delay=1.0))
+        started = time.perf_counter()
+        edl = asyncio.run(d.generate_edit_script_async("hype", ASSETS, timeout=5, hedge_after=0.1))
+        self.assertLess(time.perf_counter() - started, 0.5)
+        self.assertEqual(edl["director"]["path"], "heuristic")
+        self.assertTrue(edl["director"]["hedged"])
+
+    def test_llm_error_falls_back(self):
+        d = Director(model=StubModel(fail=True))
+        edl = asyncio.run(d.generate_edit_script_async("vlog", ASSETS, timeout=2))
+        self.assertEqual(edl["director"]["path"], "heuristic")
+        self.assertIn("model unavailable", edl["director"]["reason"])
+
+    def test_concurrency_is_capped(self):
+        model = StubModel(delay=0.15)
+        d = Director(model=model, max_concurrent_llm=2)
+
+        async def many():
+            # Distinct prompts so the response cache cannot coalesce them
+            return await asyncio.gather(*[
+                d.generate_edit_script_async(f"vlog take {i}", ASSETS, timeout=5) for i in range(5)
+            ])
+
+        results = asyncio.run(many())
+        self.assertTrue(all(r["director"]["path"] == "llm" for r in results))
+        self.assertEqual(model.max_active, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
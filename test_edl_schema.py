@@ -0,0 +1,84 @@
+import asyncio
+import json
+import unittest
+
+from backend.app.services.director import Director
+from backend.app.services.edl_schema import EDLValidationError, EDLValidator
+
+ASSETS = [
+    {"file_id": "1", "path": "/uploads/1_beach.mp4", "type": "video", "metadata": {"duration": 10.0}},
+    {"file_id": "2", "path": "/uploads/2_city.mp4", "type": "video", "metadata": {"duration": 4.0}},
+]
+
+
+class _Response:
+    def __init__(self, text):
+        self.text = text
+
+
+class _UnknownClipModel:
+    """LLM stand-in that plans with a clip id it was never given."""
+
+    def generate_content(self, prompt):
+        return _Response(json.dumps({"timeline": [{"clip_id": "7", "start": 0, "end": 2}], "explanation": "llm"}))
+
+
+class TestEDLValidator(unittest.TestCase):
+    def test_resolves_clamps_drops_and_merges(self):
+        edl = EDLValidator(ASSETS).normalize({"explanation": "x", "timeline": [
+            {"clip_id": 1, "start": "0", "end": 2},
+            {"clip_id": "1", "start": 2.0, "end": 3.5, "transition": "cut"},     # continues the first
+            {"clip_id": "2_city.mp4", "start": -1, "end": 6},                    # filename, clamped to 0 - 4
+            {"clip_id": "2", "start": 5, "end": 6},                              # past the end: empty
+            {"clip_id": "1", "start": 4, "end": 4},                              # zero length
+            {"clip_id": "1", "start": 4, "end": 5, "filter": "vibrant", "transition": "flash"},
+            {"clip_id": "1", "start": 5, "end": 6, "filter": "vibrant"},         # graded: kept separate
+        ]})
+        timeline = edl["timeline"]
+        self.assertEqual([(c["source_path"], c["start"], c["end"]) for c in timeline], [
+            ("/uploads/1_beach.mp4", 0.0, 3.5),
+            ("/uploads/2_city.mp4", 0.0, 4.0),
+            ("/uploads/1_beach.mp4", 4.0, 5.0),
+            ("/uploads/1_beach.mp4", 5.0, 6.0),
+        ])
+        self.assertEqual(timeline[0]["clip_id"], "1")
+        self.assertNotIn("transition", timeline[2])
+        self.assertEqual(edl["explanation"], "x")
+        report = edl["validation"]
+        self.assertEqual((report["entries"], report["clamped"], report["dropped"], report["merged"]), (7, 2, 2, 1))
+        self.assertEqual(len(report["warnings"]), 1)
+
+    def test_rejects_what_cannot_be_repaired(self):
+        with self.assertRaises(EDLValidationError) as raised:
+            EDLValidator(ASSETS).normalize({"timeline": [
+                {"clip_id": "9", "start": 0, "end": 1},
+                {"clip_id": "1", "start": 3, "end": 1},
+                {"clip_id": "1", "start": "soon", "end": 1},
+                {"clip_id": "1", "start": 0, "end": 1, "speed": 0},
+                "not an entry",
+            ]})
+        self.assertEqual(len(raised.exception.errors), 5)
+        for edl in ({"timeline": []}, {"timeline": [{"clip_id": "1", "start": 3, "end": 3}]}, {}):
+            with self.assertRaises(EDLValidationError):
+                EDLValidator(ASSETS).normalize(edl)
+
+    def test_without_assets_entries_need_a_source_path(self):
+        validator = EDLValidator()
+        edl = validator.normalize({"timeline": [{"source_path": "a.mp4", "start": 0, "end": 20}]})
+        self.assertEqual(edl["timeline"][0]["end"], 20.0)
+        with self.assertRaises(EDLValidationError):
+            validator.normalize({"timeline": [{"clip_id": "1", "start": 0, "end": 1}]})
+
+
+class TestDirectorValidation(unittest.TestCase):
+    def test_rejected_llm_plan_falls_back_to_heuristic(self):
+        d = Director(model=_UnknownClipModel())
+        edl = asyncio.run(d.generate_edit_script_async("vlog", ASSETS, timeout=2, validator=EDLValidator(ASSETS)))
+        self.assertEqual(edl["director"]["path"], "heuristic")
+        self.assertIn("unknown clip_id", edl["director"]["reason"])
+        self.assertEqual(edl["timeline"][0]["source_path"], "/uploads/1_beach.mp4")
+        self.assertIn("validation", edl)
+
+
+if __name__ == "__main__":
+    unittest.main()
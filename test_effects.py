@@ -0,0 +1,58 @@
+import unittest
+
+import numpy as np
+
+from backend.app.services.effects import FramePipeline, LUMA
+from backend.app.services.render_planner import effect_reasons
+
+
+def _reference(frame, saturation=1.0, contrast=1.0, brightness=1.0):
+    x = frame.astype(np.float64)
+    y = (x @ LUMA.astype(np.float64))[..., None]
+    x = y + saturation * (x - y)
+    x = ((x - 128.0) * contrast + 128.0) * brightness
+    return np.clip(np.round(x), 0, 255)
+
+
+class TestFramePipeline(unittest.TestCase):
+    def setUp(self):
+        self.frame = np.random.default_rng(0).integers(0, 256, (90, 160, 3), dtype=np.uint8)
+
+    def test_fused_grade_matches_sequential_effects(self):
+        params = {"saturation": 1.4, "contrast": 1.2, "brightness": 0.9}
+        out = FramePipeline((160, 90), **params).apply(self.frame)
+        self.assertLessEqual(np.abs(out.astype(int) - _reference(self.frame, **params)).max(), 1)
+
+    def test_black_white_is_grey(self):
+        out = FramePipeline((160, 90), black_white=True).apply(self.frame).astype(int)
+        self.assertLessEqual(np.abs(out[..., 0] - out[..., 1]).max(), 1)
+        self.assertLessEqual(np.abs(out[..., 1] - out[..., 2]).max(), 1)
+
+    def test_contrast_is_applied(self):
+        flat = FramePipeline((160, 90), contrast=0.0).apply(self.frame)
+        self.assertTrue(np.all(flat == 128))
+
+    def test_zoom_is_centre_crop(self):
+        frame = np.zeros((90, 160, 3), dtype=np.uint8)
+        frame[30:60, 53:107] = 255  # middle third
+        pipeline = FramePipeline((160, 90), zoom_rate=1.0, max_zoom=3.0)
+        self.assertTrue(np.array_equal(pipeline.apply(frame, 0.0), frame))
+        zoomed = pipeline.apply(frame, 2.0)  # 3x: the middle third fills the frame
+        self.assertEqual(zoomed.shape, frame.shape)
+        self.assertGreater(zoomed[5:-5, 5:-5].mean(), 250)
+
+    def test_buffers_are_reused(self):
+        pipeline = FramePipeline((160, 90), saturation=1.5, zoom_rate=0.1)
+        first = pipeline.apply(self.frame, 1.0)
+        self.assertIs(pipeline.apply(self.frame, 2.0), first)
+
+    def test_from_cut(self):
+        self.assertIsNone(FramePipeline.from_cut({"start": 0, "end": 1, "filter": "none"}, (160, 90)))
+        vibrant = FramePipeline.from_cut({"filter": "vibrant", "brightness": 1.1}, (160, 90))
+        self.assertTrue(vibrant.has_color)
+        self.assertEqual(FramePipeline.from_cut({"effect": "zoom_in"}, (160, 90)).zoom_rate, 0.1)
+        self.assertIn("brightness", effect_reasons({"brightness": 1.1}))
+
+
+if __name__ == "__main__":
+    unittest.main()
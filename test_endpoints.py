@@ -0,0 +1,111 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.app.api import endpoints
+from backend.app.services.asset_registry import AssetRegistry
+from backend.app.services.upload_service import UploadManager
+
+
+class _Jobs:
+    """Stands in for the JobManager: one finished preview job, and submissions are recorded, not run."""
+
+    def __init__(self):
+        self.submitted = []
+
+    def get(self, job_id):
+        return {"job_id": job_id, "status": "completed", "result": {}} if job_id == "preview" else None
+
+    def submit(self, fn, payload, kind="job"):
+        self.submitted.append(payload)
+        return "render"
+
+
+class _EndpointTest(unittest.TestCase):
+    """The API router over a registry and uploads in a temporary directory, with jobs recorded instead of run."""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.registry = AssetRegistry(db_path=os.path.join(self.tmp, "assets.db"))
+        self.jobs = _Jobs()
+        uploads = UploadManager(upload_dir=os.path.join(self.tmp, "uploads"), music_dir=os.path.join(self.tmp, "music"),
+                                registry=self.registry)
+        for name, value in (("registry", self.registry), ("jobs", self.jobs), ("uploads", uploads)):
+            patcher = mock.patch.object(endpoints, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        app = FastAPI()
+        app.include_router(endpoints.router, prefix="/api")
+        self.client = TestClient(app)
+
+
+class TestUpload(_EndpointTest):
+    def test_audio_is_registered_as_audio_without_a_proxy(self):
+        response = self.client.post("/api/upload", files={"file": ("voice.mp3", b"id3 audio bytes")})
+        self.assertEqual(response.status_code, 200, response.text)
+        self.assertEqual(self.registry.get(response.json()["file_id"])["kind"], "audio")
+        self.assertEqual(self.jobs.submitted, [])
+
+        response = self.client.post("/api/upload", files={"file": ("clip.mp4", b"video bytes")})
+        self.assertEqual(self.registry.get(response.json()["file_id"])["kind"], "video")
+        self.assertEqual(len(self.jobs.submitted), 1)  # its preview proxy
+
+
+class TestEditReference(_EndpointTest):
+    def _edit(self, reference_url):
+        self.registry.add("clip", os.path.join(self.tmp, "clip.mp4"), "video")
+        return self.client.post("/api/generate_edit", json={"file_ids": ["clip"], "reference_url": reference_url})
+
+    def test_local_references_must_be_uploads(self):
+        for url in ("/etc/hostname", "file:///etc/hostname", "../../etc/hostname", "/no/such/file.mp4"):
+            self.assertEqual(self._edit(url).status_code, 400, url)
+        self.assertEqual(self.jobs.submitted, [])
+
+        uploaded = os.path.join(self.tmp, "uploads", "reference.mp4")
+        open(uploaded, "wb").close()
+        with mock.patch.object(endpoints, "UPLOAD_DIR", os.path.join(self.tmp, "uploads")):
+            self.assertEqual(self._edit(f"file://{uploaded}").status_code, 200)
+        self.assertEqual(self._edit("https://youtu.be/dQw4w9WgXcQ").status_code, 200)
+        self.assertEqual([p["reference_url"] for p in self.jobs.submitted],
+                         [f"file://{uploaded}", "https://youtu.be/dQw4w9WgXcQ"])
+
+
+class TestPromoteEditedEDL(_EndpointTest):
+    def setUp(self):
+        super().setUp()
+        self.path = os.path.join(self.tmp, "clip.mp4")
+        open(self.path, "wb").close()
+        self.registry.add("clip", self.path, "video")
+        self.registry.set_analysis("clip", {"metadata": {"duration": 10.0}})
+
+    def _promote(self, timeline):
+        return self.client.post("/api/jobs/preview/promote", json={"edl": {"timeline": timeline}})
+
+    def test_entries_may_reference_assets_by_source_path(self):
+        response = self._promote([{"source_path": self.path, "start": 1.0, "end": 12.0}])
+        self.assertEqual(response.status_code, 200, response.text)
+        self.assertEqual(self.jobs.submitted[0]["edl"]["timeline"][0]["end"], 10.0)  # registered duration
+
+        response = self._promote([{"clip_id": "clip", "start": 0.0, "end": 2.0},
+                                  {"clip_id": None, "source_path": self.path, "start": 4.0, "end": 6.0}])
+        self.assertEqual(response.status_code, 200, response.text)
+        self.assertEqual([c["source_path"] for c in self.jobs.submitted[1]["edl"]["timeline"]], [self.path] * 2)
+
+    def test_bad_output_profile_is_rejected(self):
+        response = self.client.post("/api/jobs/preview/promote", json={"output_profile": {"crf": 99}})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("crf", response.json()["detail"])
+        self.assertEqual(self.jobs.submitted, [])
+
+    def test_unregistered_source_is_rejected(self):
+        response = self._promote([{"source_path": self.path + ".missing", "start": 0.0, "end": 2.0}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.jobs.submitted, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
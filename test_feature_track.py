@@ -0,0 +1,110 @@
+import json
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from backend.app.services.analysis_cache import AnalysisCache
+from backend.app.services.analyzer import AssetAnalyzer
+from backend.app.services.director import Director
+from backend.app.services.feature_track import best_windows, interest_scores, summarize_track
+from backend.app.services.ffmpeg_tools import run_ffmpeg
+
+
+def _track(seconds, busy):
+    """Feature track that is flat except for the `busy` seconds."""
+    track = {name: np.full(seconds, 0.1, dtype=np.float32) for name in ("motion", "sharpness", "audio_rms")}
+    track["brightness"] = np.full(seconds, 0.5, dtype=np.float32)
+    for name in ("motion", "sharpness", "audio_rms"):
+        track[name][list(busy)] = 1.0
+    return track
+
+
+class _Response:
+    def __init__(self, text):
+        self.text = text
+
+
+class _PromptModel:
+    def __init__(self):
+        self.prompts = []
+
+    def generate_content(self, prompt):
+        self.prompts.append(prompt)
+        return _Response(json.dumps({"timeline": [{"clip_id": "1", "start": 0, "end": 2}], "explanation": "llm"}))
+
+
+class TestFeatureExtraction(unittest.TestCase):
+    def test_per_second_features_are_cached_as_arrays(self):
+        tmp = tempfile.mkdtemp()
+        path = os.path.join(tmp, "clip.mp4")
+        # 3s still grey and silent, 3s moving pattern with a tone, 3s black and silent
+        run_ffmpeg([
+            "-f", "lavfi", "-i", "color=gray:size=320x180:rate=25:d=3",
+            "-f", "lavfi", "-i", "testsrc=size=320x180:rate=25:d=3",
+            "-f", "lavfi", "-i", "color=black:size=320x180:rate=25:d=3",
+            "-f", "lavfi", "-i", "anullsrc=r=44100:cl=mono:d=3",
+            "-f", "lavfi", "-i", "sine=frequency=440:sample_rate=44100:d=3",
+            "-filter_complex", "[0:v][3:a][1:v][4:a][2:v][3:a]concat=n=3:v=1:a=1[v][a]",
+            "-map", "[v]", "-map", "[a]", "-c:v", "libx264", "-pix_fmt", "yuv420p", "-c:a", "aac", path,
+        ])
+        analyzer = AssetAnalyzer(cache=AnalysisCache(cache_dir=os.path.join(tmp, "cache")))
+        track = analyzer.get_feature_track(path)
+
+        self.assertEqual(sorted(track), ["audio_rms", "brightness", "motion", "sharpness"])
+        self.assertTrue(all(len(values) == 9 and values.dtype == np.float32 for values in track.values()))
+        self.assertGreater(track["motion"][3:6].mean(), track["motion"][:3].mean())
+        self.assertGreater(track["sharpness"][4], track["sharpness"][1])
+        self.assertLess(track["brightness"][7], 0.05)
+        self.assertGreater(track["audio_rms"][4], 0.05)
+        self.assertLess(track["audio_rms"][1], 0.01)
+        self.assertEqual(best_windows(interest_scores(track), 3)[0]["start"], 3.0)
+
+        again = analyzer.get_feature_track(path)
+        self.assertEqual(analyzer.cache.stats()["hits"], 1)
+        np.testing.assert_array_equal(again["motion"], track["motion"])
+
+
+class TestInterestWindows(unittest.TestCase):
+    def test_best_windows_do_not_overlap_and_keep_time_order(self):
+        scores = np.array([0, 0, 5, 5, 0, 0, 0, 3, 3, 0, 4, 0], dtype=np.float32)
+        windows = best_windows(scores, 2, count=3)
+        self.assertEqual([w["start"] for w in windows], [2.0, 7.0, 9.0])
+        self.assertEqual(windows[0]["score"], 5.0)
+        # Ends are bounded by the clip duration; short clips give one window from the start
+        self.assertEqual(best_windows(scores, 2.5, duration=11.2)[0]["end"], 4.5)
+        self.assertEqual(best_windows(scores[:2], 3, duration=1.6), [{"start": 0.0, "end": 1.6, "score": 0.0}])
+
+    def test_summary_is_small_and_json_ready(self):
+        summary = summarize_track(_track(60, range(30, 34)), 59.5, window=4)
+        best = max(summary["highlights"], key=lambda w: w["score"])
+        self.assertEqual((best["start"], best["end"]), (30.0, 34.0))
+        self.assertEqual(len(summary["interest_curve"]), 12)
+        json.dumps(summary)
+
+
+class TestDirectorUsesFeatures(unittest.TestCase):
+    ASSET = {"file_id": "1", "path": "vid.mp4", "type": "video", "metadata": {"duration": 20.0}}
+
+    def test_heuristic_picks_the_most_interesting_window(self):
+        d = Director()
+        plain = d.generate_edit_script("a relaxed vlog", [self.ASSET])
+        self.assertEqual(plain["timeline"][0]["start"], 0)
+
+        asset = dict(self.ASSET, features=_track(20, range(12, 15)))
+        edl = d.generate_edit_script("a relaxed vlog", [asset])
+        cut = edl["timeline"][0]
+        self.assertLessEqual(cut["start"], 12.0)
+        self.assertGreaterEqual(cut["end"], 14.0)
+
+    def test_llm_prompt_gets_a_summary_not_the_arrays(self):
+        model = _PromptModel()
+        d = Director(model=model)
+        d.generate_edit_script("a relaxed vlog", [dict(self.ASSET, features=_track(20, range(12, 15)))])
+        self.assertIn('"highlights"', model.prompts[0])
+        self.assertLess(len(model.prompts[0]), 6000)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+import asyncio
+import os
+import tempfile
+import time
+import unittest
+from backend.app.services.job_queue import JobManager
+
+
+def _quick_job(payload, ctx):
+    ctx.report(0.5, "working", force=True)
+    return {"echo": payload["value"]}
+
+
+def _slow_job(payload, ctx):
+    # Loops on progress checkpoints until cancelled
+    for i in range(400):
+        ctx.report(i / 400, "working", force=True)
+        time.sleep(0.05)
+    return {"finished": True}
+
+
+def _failing_job(payload, ctx):
+    raise ValueError("boom")
+
+
+def _crashing_job(payload, ctx):
+    os._exit(1)  # Worker dies, like an OOM kill
+
+
+class TestJobManager(unittest.TestCase):
+    def setUp(self):
+        self.state_dir = tempfile.mkdtemp()
+        self.jobs = JobManager(max_workers=1, state_dir=self.state_dir)
+
+    def tearDown(self):
+        self.jobs.shutdown()
+
+    def _wait(self, job_id, statuses, timeout=60):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            job = self.jobs.get(job_id)
+            if job["status"] in statuses:
+                return job
+            time.sleep(0.05)
+        self.fail(f"Job never reached {statuses}: {self.jobs.get(job_id)}")
+
+    def test_submit_returns_immediately_and_completes(self):
+        start = time.time()
+        job_id = self.jobs.submit(_quick_job, {"value": 42})
+        self.assertLess(time.time() - start, 1.0)
+
+        job = self._wait(job_id, ("completed", "failed"))
+        self.assertEqual(job["status"], "completed")
+        self.assertEqual(job["progress"], 1.0)
+        self.assertEqual(job["result"], {"echo": 42})
+
+    def test_failure_is_reported(self):
+        job_id = self.jobs.submit(_failing_job, {})
+        job = self._wait(job_id, ("completed", "failed"))
+        self.assertEqual(job["status"], "failed")
+        self.assertIn("boom", job["error"])
+
+    def test_cancel_running_job(self):
+        job_id = self.jobs.submit(_slow_job, {})
+        job = self._wait(job_id, ("running",))
+        self.assertEqual(job["stage"], "working")
+
+        self.jobs.cancel(job_id)
+        job = self._wait(job_id, ("cancelled", "completed"))
+        self.assertEqual(job["status"], "cancelled")
+
+    def test_run_awaits_the_result(self):
+        self.assertEqual(asyncio.run(self.jobs.run(_quick_job, {"value": 7})), {"echo": 7})
+        with self.assertRaises(ValueError):
+            asyncio.run(self.jobs.run(_failing_job, {}))
+
+    def test_warm_up_starts_workers_with_their_imports(self):
+        jobs = JobManager(max_workers=2, state_dir=self.state_dir, warm_modules=("json", "no_such_module"))
+        try:
+            jobs.warm_up()
+            deadline = time.time() + 60
+            while len(jobs.worker_imports()) < 2 and time.time() < deadline:
+                time.sleep(0.05)
+            workers = jobs.worker_imports()
+            self.assertEqual(len(workers), 2)
+            for imports in workers.values():
+                self.assertIsNotNone(imports["json"])
+                self.assertIsNone(imports["no_such_module"])
+            self.assertIn('ai_editor_worker_import_seconds{module="json"}', jobs.metrics.render())
+            job_id = jobs.submit(_quick_job, {"value": 1})
+            while jobs.get(job_id)["status"] not in ("completed", "failed") and time.time() < deadline:
+                time.sleep(0.05)
+            self.assertEqual(jobs.get(job_id)["result"], {"echo": 1})
+        finally:
+            jobs.shutdown()
+
+    def test_pool_is_rebuilt_after_a_worker_dies(self):
+        job = self._wait(self.jobs.submit(_crashing_job, {}), ("completed", "failed"))
+        self.assertEqual(job["status"], "failed")
+        job = self._wait(self.jobs.submit(_quick_job, {"value": 3}), ("completed", "failed"))
+        self.assertEqual(job["result"], {"echo": 3})
+
+    def test_finished_jobs_are_evicted(self):
+        jobs = JobManager(max_workers=1, state_dir=self.state_dir, max_finished=2)
+        try:
+            job_ids = []
+            for i in range(3):
+                job_ids.append(jobs.submit(_quick_job, {"value": i}))
+                deadline = time.time() + 60
+                while jobs.get(job_ids[-1])["status"] != "completed" and time.time() < deadline:
+                    time.sleep(0.05)
+            self.assertEqual([job["job_id"] for job in jobs.list()], job_ids[1:])
+            self.assertIsNone(jobs.get(job_ids[0]))
+
+            jobs.finished_ttl = 0
+            self.assertEqual(jobs.list(), [])
+        finally:
+            jobs.shutdown()
+
+    def test_unknown_job(self):
+        self.assertIsNone(self.jobs.get("missing"))
+        self.assertIsNone(self.jobs.cancel("missing"))
+
+
+if __name__ == "__main__":
+    unittest.main()
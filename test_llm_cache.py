@@ -0,0 +1,96 @@
+import json
+import os
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.app.services import director as director_module
+from backend.app.services.director import Director, get_director
+from backend.app.services.llm_cache import LLMResponseCache
+
+
+class _Response:
+    def __init__(self, text):
+        self.text = text
+
+
+class StubModel:
+    """Local stand-in for the Gemini model: counts calls, optionally slow or failing."""
+
+    def __init__(self, delay=0.0, fail=False):
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt):
+        with self._lock:
+            self.calls += 1
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(self.delay)
+        with self._lock:
+            self.active -= 1
+        if self.fail:
+            raise RuntimeError("model unavailable")
+        edl = {"timeline": [{"clip_id": "1", "start": 0.0, "end": 2.0}], "explanation": "stub"}
+        return _Response("```json\n" + json.dumps(edl) + "\n```")
+
+
+ASSETS = [{"file_id": "1", "path": "vid.mp4", "metadata": {"duration": 10.0}, "type": "video"}]
+
+
+class TestLLMResponseCache(unittest.TestCase):
+    def test_identical_requests_hit_cache(self):
+        model = StubModel()
+        d = Director(model=model)
+        first = d.generate_edit_script("Make it  HYPE", ASSETS)
+        first["timeline"][0]["end"] = 99  # callers mutate EDLs; the cached copy must not change
+        second = d.generate_edit_script("make it hype", ASSETS)
+        self.assertEqual(model.calls, 1)
+        self.assertEqual(second["timeline"][0]["end"], 2.0)
+        self.assertEqual(d.llm_cache.stats()["hits"], 1)
+
+        d.generate_edit_script("make it hype", [dict(ASSETS[0], file_id="2")])
+        self.assertEqual(model.calls, 2)
+
+    def test_concurrent_requests_are_coalesced(self):
+        model = StubModel(delay=0.2)
+        d = Director(model=model)
+        with ThreadPoolExecutor(max_workers=5) as pool:
+            results = list(pool.map(lambda _: d.generate_edit_script("hype montage", ASSETS), range(5)))
+        self.assertEqual(model.calls, 1)
+        self.assertTrue(all(r["explanation"] == "stub" for r in results))
+        self.assertEqual(d.llm_cache.stats()["coalesced"], 4)
+
+    def test_ttl_expiry(self):
+        model = StubModel()
+        d = Director(model=model, llm_cache=LLMResponseCache(ttl=0.05))
+        d.generate_edit_script("vlog", ASSETS)
+        time.sleep(0.1)
+        d.generate_edit_script("vlog", ASSETS)
+        self.assertEqual(model.calls, 2)
+
+    def test_failures_are_not_cached(self):
+        model = StubModel(fail=True)
+        d = Director(model=model)
+        edl = d.generate_edit_script("vlog", ASSETS)
+        self.assertIn("Heuristic fallback", edl["explanation"])
+        model.fail = False
+        self.assertEqual(d.generate_edit_script("vlog", ASSETS)["explanation"], "stub")
+        self.assertEqual(model.calls, 2)
+
+    def test_singleton(self):
+        os.environ.pop("GEMINI_API_KEY", None)
+        director_module._director = None
+        try:
+            self.assertIs(get_director(), get_director())
+        finally:
+            director_module._director = None
+
+
+if __name__ == "__main__":
+    unittest.main()
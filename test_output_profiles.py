@@ -0,0 +1,87 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from backend.app.services.analysis_cache import AnalysisCache
+from backend.app.services.effects import FramePipeline
+from backend.app.services.ffmpeg_tools import run_ffmpeg, probe_streams
+from backend.app.services.output_profiles import get_output_profile, scaled_for_preview
+from backend.app.services.segment_renderer import part_encode_args, scale_filter
+from backend.app.services.video_processor import VideoProcessor
+from test_render_planner import _FakePlanner
+
+
+class TestOutputProfiles(unittest.TestCase):
+    def test_named_and_custom_profiles(self):
+        vertical = get_output_profile("vertical_1080")
+        self.assertEqual((vertical["width"], vertical["height"], vertical["fit"]), (1080, 1920, "crop"))
+        custom = get_output_profile({"base": "preview_720p", "fps": 24.0, "threads": 2})
+        self.assertEqual((custom["width"], custom["fps"], custom["preset"]), (1280, 24.0, "ultrafast"))
+        self.assertIsNone(get_output_profile(None))
+        with self.assertRaises(ValueError):
+            get_output_profile("8k_imax")
+        with self.assertRaises(ValueError):
+            get_output_profile({"width": 1081})
+
+    def test_custom_values_are_checked(self):
+        for bad in ({"fps": 0}, {"fps": 500}, {"fps": "fast"}, {"crf": 60}, {"crf": 20.5}, {"crf": None},
+                    {"preset": "turbo"}, {"threads": -1}, {"fit": "stretch"}, {"video_bitrate": "6M; rm"},
+                    {"width": 100000}, {"height": [720]}, "vertical_1080 ", ["preview_720p"]):
+            with self.assertRaises(ValueError, msg=bad):
+                get_output_profile(bad)
+        custom = get_output_profile({"fps": "25", "crf": "18", "preset": "slow", "video_bitrate": "2500k"})
+        self.assertEqual((custom["fps"], custom["crf"], custom["preset"]), (25.0, 18, "slow"))
+
+    def test_preview_keeps_aspect(self):
+        preview = scaled_for_preview(get_output_profile("vertical_1080"))
+        self.assertEqual((preview["width"], preview["height"]), (360, 640))
+
+    def test_encoder_args(self):
+        args = part_encode_args({"preset": "slow", "video_bitrate": "6M", "crf": 20, "threads": 4})
+        self.assertIn("-b:v", args)
+        self.assertNotIn("-crf", args)
+        self.assertEqual(args[args.index("-threads") + 1], "4")
+        self.assertIn("crop=1080:1920", scale_filter({"width": 1080, "height": 1920, "fit": "crop"}))
+        self.assertIn("pad=1920:1080", scale_filter({"width": 1920, "height": 1080, "fit": "pad"}))
+
+    def test_planner_only_copies_sources_matching_output(self):
+        timeline = [{"source_path": "a.mp4", "start": 2.0, "end": 6.0}]
+        same = _FakePlanner().plan(timeline, output=get_output_profile({"width": 1280, "height": 720}))
+        self.assertEqual(same["segments"][0]["action"], "copy")
+        vertical = _FakePlanner().plan(timeline, output=get_output_profile("vertical_1080"))
+        self.assertEqual(vertical["segments"][0]["action"], "encode")
+        self.assertEqual((vertical["profile"]["width"], vertical["profile"]["height"]), (1080, 1920))
+        self.assertEqual(vertical["profile"]["fit"], "crop")
+
+    def test_frame_pipeline_fits_output(self):
+        frame = np.full((90, 160, 3), 200, dtype=np.uint8)
+        padded = FramePipeline((160, 90), output_size=(90, 160), fit="pad").apply(frame)
+        self.assertEqual(padded.shape, (160, 90, 3))
+        self.assertEqual(padded[0, 0].tolist(), [0, 0, 0])        # letterbox bar
+        self.assertEqual(padded[80, 45].tolist(), [200, 200, 200])
+        cropped = FramePipeline((160, 90), output_size=(90, 160), fit="crop").apply(frame)
+        self.assertTrue(np.all(cropped == 200))
+
+
+class TestProfileRender(unittest.TestCase):
+    def test_vertical_render(self):
+        tmp = tempfile.mkdtemp()
+        src = os.path.join(tmp, "src.mp4")
+        run_ffmpeg(["-f", "lavfi", "-i", "testsrc=size=320x180:rate=25",
+                    "-f", "lavfi", "-i", "sine=frequency=440:sample_rate=44100",
+                    "-t", "4", "-c:v", "libx264", "-pix_fmt", "yuv420p", "-c:a", "aac", "-shortest", src])
+        processor = VideoProcessor(cache=AnalysisCache(cache_dir=os.path.join(tmp, "cache")), segment_cache=False,
+                                   output_profile={"base": "vertical_1080", "width": 180, "height": 320})
+        output = os.path.join(tmp, "short.mp4")
+        report = processor.render_video({"timeline": [{"source_path": src, "start": 0.5, "end": 2.5}]}, output)
+        info = probe_streams(output)
+        self.assertEqual((info["video"]["width"], info["video"]["height"]), (180, 320))
+        self.assertAlmostEqual(info["video"]["fps"], 30.0, delta=0.1)
+        self.assertEqual(report["output_profile"], "custom")
+        self.assertEqual(report["profile"]["preset"], "veryfast")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import os
+import tempfile
+import time
+import unittest
+
+from backend.app.services.analysis_cache import AnalysisCache
+from backend.app.services.ffmpeg_tools import run_ffmpeg, probe_streams, keyframe_times
+from backend.app.services.proxy_service import ProxyManager
+from backend.app.services.video_processor import VideoProcessor
+
+
+def _make_source(path, seconds=6, color="testsrc"):
+    run_ffmpeg([
+        "-f", "lavfi", "-i", f"{color}=size=640x480:rate=25",
+        "-f", "lavfi", "-i", "sine=frequency=440:sample_rate=48000",
+        "-t", str(seconds), "-c:v", "libx264", "-g", "125", "-pix_fmt", "yuv420p", "-c:a", "aac", "-shortest", path,
+    ])
+
+
+class TestProxyManager(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.cache = AnalysisCache(cache_dir=os.path.join(self.tmp, "cache"))
+        self.proxies = ProxyManager(proxy_dir=os.path.join(self.tmp, ".proxies"), cache=self.cache, height=120)
+        self.src = os.path.join(self.tmp, "src.mp4")
+        _make_source(self.src)
+
+    def test_proxy_is_small_keeps_timing_and_is_reused(self):
+        self.assertIsNone(self.proxies.get(self.src))
+        path = self.proxies.ensure(self.src)
+        info = probe_streams(path)
+        self.assertEqual((info["video"]["width"], info["video"]["height"]), (160, 120))
+        self.assertAlmostEqual(info["duration"], 6.0, delta=0.2)
+        self.assertIsNotNone(info["audio"])
+        # Keyframe every second so preview cuts can be copied
+        self.assertGreaterEqual(len(keyframe_times(path)), 6)
+
+        built_at = os.path.getmtime(path)
+        self.assertEqual(self.proxies.ensure(self.src), path)
+        self.assertEqual(os.path.getmtime(path), built_at)
+        self.assertEqual(self.proxies.get(self.src), path)
+
+    def test_changed_source_gets_new_proxy(self):
+        first = self.proxies.ensure(self.src)
+        time.sleep(0.01)
+        _make_source(self.src, seconds=3, color="smptebars")
+        self.assertIsNone(self.proxies.get(self.src))
+        second = self.proxies.ensure(self.src)
+        self.assertNotEqual(first, second)
+        self.assertAlmostEqual(probe_streams(second)["duration"], 3.0, delta=0.2)
+
+    def test_preview_render_uses_proxies(self):
+        edl = {"timeline": [
+            {"clip_id": "1", "source_path": self.src, "start": 0.5, "end": 2.0},
+            {"clip_id": "1", "source_path": self.src, "start": 3.0, "end": 4.5},
+        ]}
+        preview_edl = self.proxies.proxy_edl(edl)
+        self.assertEqual(edl["timeline"][0]["source_path"], self.src)  # original untouched for promotion
+        self.assertTrue(all(c["source_path"] != self.src for c in preview_edl["timeline"]))
+
+        output = os.path.join(self.tmp, "preview.mp4")
+        processor = VideoProcessor(cache=self.cache, workers=1, quality="preview", segment_cache=False)
+        report = processor.render_video(preview_edl, output)
+        self.assertEqual(report["quality"], "preview")
+        self.assertEqual(probe_streams(output)["video"]["height"], 120)
+
+    def test_unknown_quality_rejected(self):
+        with self.assertRaises(ValueError):
+            VideoProcessor(cache=self.cache, quality="draft", segment_cache=False)
+
+
+if __name__ == "__main__":
+    unittest.main()
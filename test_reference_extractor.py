@@ -0,0 +1,98 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from backend.app.services.analysis_cache import AnalysisCache
+from backend.app.services.reference_extractor import ReferenceExtractor
+from test_scene_detector import _write_clip
+
+
+class TestReferenceDownloads(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.download_dir = os.path.join(self.tmp, "references")
+        self.extractor = ReferenceExtractor(download_dir=self.download_dir,
+                                            cache=AnalysisCache(cache_dir=os.path.join(self.tmp, "cache")),
+                                            local_dirs=[self.tmp])
+        self.clip = os.path.join(self.tmp, "reference.mp4")
+        _write_clip(self.clip, [(200, 40, 40), (40, 200, 40)])
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def _no_network(self):
+        return mock.patch("yt_dlp.YoutubeDL", side_effect=AssertionError("network access"))
+
+    def test_video_ids(self):
+        for url in ("https://www.youtube.com/watch?v=dQw4w9WgXcQ", "https://youtu.be/dQw4w9WgXcQ?t=3",
+                    "https://www.youtube.com/shorts/dQw4w9WgXcQ"):
+            self.assertEqual(ReferenceExtractor.video_id(url), "dQw4w9WgXcQ")
+        self.assertIsNone(ReferenceExtractor.video_id("https://example.com/clip.mp4"))
+
+    def test_local_paths_are_used_directly(self):
+        with self._no_network():
+            self.assertEqual(self.extractor.download_reference(self.clip), self.clip)
+            self.assertEqual(self.extractor.download_reference(f"file://{self.clip}"), self.clip)
+        style = self.extractor.analyze_style(self.clip)
+        self.assertEqual(style["shot_count"], 2)
+
+    def test_local_paths_outside_the_allowed_dirs_are_refused(self):
+        extractor = ReferenceExtractor(download_dir=self.download_dir, cache=self.extractor.cache)
+        link = os.path.join(self.download_dir, "linked.mp4")
+        os.symlink(self.clip, link)
+        with self._no_network():
+            for url in (self.clip, f"file://{self.clip}", link, "/etc/hostname"):
+                with self.assertRaises(ValueError):
+                    extractor.download_reference(url)
+            os.remove(link)
+            shutil.copy(self.clip, link)
+            self.assertEqual(extractor.download_reference(link), link)
+
+    def test_repeat_download_is_served_from_cache(self):
+        cached = os.path.join(self.download_dir, "dQw4w9WgXcQ.mp4")
+        shutil.copy(self.clip, cached)
+        # Leftovers of an interrupted download must not count
+        open(os.path.join(self.download_dir, "otherVideo1.mp4.part"), "wb").close()
+
+        with self._no_network():
+            path = self.extractor.download_reference("https://youtu.be/dQw4w9WgXcQ")
+        self.assertEqual(path, cached)
+        self.assertIsNone(self.extractor.cached_path("otherVideo1"))
+        self.assertEqual(self.extractor.analyze_style(path)["video_id"], "dQw4w9WgXcQ")
+
+    def test_download_asks_for_low_res_video_only(self):
+        downloaded = os.path.join(self.download_dir, "abcdefghijk.mp4")
+        clip = self.clip
+
+        class FakeYDL:
+            def __init__(self, opts):
+                FakeYDL.opts = opts
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+            def extract_info(self, url, download=True):
+                assert not download
+                return {"id": "abcdefghijk", "ext": "mp4"}
+
+            def process_ie_result(self, info, download=True):
+                shutil.copy(clip, downloaded)
+                return dict(info, requested_downloads=[{"filepath": downloaded}])
+
+        with mock.patch("yt_dlp.YoutubeDL", FakeYDL):
+            path = self.extractor.download_reference("https://www.youtube.com/watch?v=abcdefghijk")
+        self.assertEqual(path, downloaded)
+        self.assertNotIn("bestaudio", FakeYDL.opts["format"])
+        self.assertTrue(FakeYDL.opts["format"].startswith("bestvideo[height<=360]"))
+
+        with self._no_network():
+            self.assertEqual(self.extractor.download_reference("https://youtu.be/abcdefghijk"), downloaded)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,175 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from backend.app.services.analysis_cache import AnalysisCache
+from backend.app.services.ffmpeg_tools import run_ffmpeg, probe_streams
+from backend.app.services.render_planner import RenderPlanner, effect_reasons
+from backend.app.services.video_processor import VideoProcessor, default_segment_workers
+
+H264_720 = {"duration": 20.0,
+            "video": {"codec": "h264", "width": 1280, "height": 720, "fps": 30.0, "pix_fmt": "yuv420p"},
+            "audio": {"codec": "aac", "sample_rate": 48000, "channels": 2}}
+HEVC_720 = {"duration": 20.0,
+            "video": {"codec": "hevc", "width": 1280, "height": 720, "fps": 30.0, "pix_fmt": "yuv420p"},
+            "audio": {"codec": "aac", "sample_rate": 48000, "channels": 2}}
+
+
+class _FakePlanner(RenderPlanner):
+    """Planner with canned probe results (keyframes every 2s)."""
+
+    STREAMS = {"a.mp4": H264_720, "b.mp4": H264_720, "c.mov": HEVC_720}
+
+    def streams(self, path):
+        return self.STREAMS[path]
+
+    def keyframes(self, path):
+        return [float(t) for t in range(0, 20, 2)]
+
+
+class TestRenderPlanner(unittest.TestCase):
+    def test_effect_reasons(self):
+        self.assertEqual(effect_reasons({"start": 0, "end": 1, "transition": "cut"}), [])
+        self.assertEqual(effect_reasons({"speed": 1.0, "filter": "none"}), [])
+        self.assertIn("speed", effect_reasons({"speed": 1.2}))
+        self.assertIn("filter:black_white", effect_reasons({"filter": "black_white"}))
+        self.assertIn("transition:fade_in", effect_reasons({"transition": "fade_in"}))
+
+    def test_actions(self):
+        timeline = [
+            {"source_path": "a.mp4", "start": 2.0, "end": 6.0},                  # keyframe to keyframe
+            {"source_path": "a.mp4", "start": 4.3, "end": 7.0},                  # no whole GOP inside
+            {"source_path": "b.mp4", "start": 5.0, "end": 9.0},                  # 1s head and tail
+            {"source_path": "b.mp4", "start": 9.0, "end": 9.8},                  # no keyframe inside
+            {"source_path": "c.mov", "start": 0.0, "end": 4.0},                  # other codec
+            {"source_path": "a.mp4", "start": 0.0, "end": 2.0, "speed": 1.5},    # effect
+            {"source_path": "a.mp4", "start": 16.01, "end": 20.0},               # same frame, to the end
+        ]
+        plan = _FakePlanner().plan(timeline)
+        actions = [s["action"] for s in plan["segments"]]
+        self.assertEqual(actions, ["copy", "encode", "smart", "encode", "encode", "effects", "copy"])
+        copied = [(s.get("copy_start"), s.get("copy_end")) for s in plan["segments"]]
+        self.assertEqual(copied[0], (2.0, 6.0))
+        self.assertEqual(copied[2], (6.0, 8.0))
+        self.assertEqual(copied[6], (16.0, 20.0))
+        self.assertEqual(plan["profile"]["video_codec"], "h264")
+        self.assertEqual((plan["profile"]["width"], plan["profile"]["height"]), (1280, 720))
+
+    def test_no_copyable_profile_conforms_to_h264(self):
+        plan = _FakePlanner().plan([{"source_path": "c.mov", "start": 0.0, "end": 4.0}])
+        self.assertEqual(plan["profile"]["video_codec"], "h264")
+        self.assertEqual((plan["profile"]["width"], plan["profile"]["height"]), (1280, 720))
+        self.assertEqual([s["action"] for s in plan["segments"]], ["encode"])
+
+
+def _video_frames(path):
+    frames = [0]
+    run_ffmpeg(["-i", path, "-map", "0:v:0", "-f", "null", "-"], on_progress=lambda info: frames.__setitem__(0, info["frames"]))
+    return frames[0]
+
+
+class TestStreamCopyRender(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.mkdtemp()
+        cls.src = os.path.join(cls.tmp, "src.mp4")
+        run_ffmpeg([
+            "-f", "lavfi", "-i", "testsrc=size=320x180:rate=25",
+            "-f", "lavfi", "-i", "sine=frequency=440:sample_rate=44100",
+            "-t", "8", "-c:v", "libx264", "-g", "25", "-pix_fmt", "yuv420p", "-c:a", "aac", "-shortest", cls.src,
+        ])
+
+    def test_plain_cuts_are_stream_copied(self):
+        processor = VideoProcessor(cache=AnalysisCache(cache_dir=os.path.join(self.tmp, "cache")), segment_cache=False)
+        output = os.path.join(self.tmp, "out.mp4")
+        progress = []
+        edl = {"timeline": [
+            {"clip_id": "1", "source_path": self.src, "start": 1.0, "end": 3.0, "transition": "cut"},
+            {"clip_id": "1", "source_path": self.src, "start": 4.6, "end": 6.0},
+        ]}
+        report = processor.render_video(edl, output, progress_callback=progress.append)
+
+        self.assertEqual(report["mode"], "segments")
+        self.assertEqual([s["action"] for s in report["segments"]], ["copy", "smart"])
+        self.assertEqual(progress[-1], 1.0)
+
+        info = probe_streams(output)
+        self.assertEqual(info["video"]["codec"], "h264")
+        self.assertEqual((info["video"]["width"], info["video"]["height"]), (320, 180))
+        self.assertIsNotNone(info["audio"])
+        self.assertAlmostEqual(info["duration"], 3.4, delta=0.03)
+
+    def test_parallel_segments_report_timings(self):
+        processor = VideoProcessor(cache=AnalysisCache(cache_dir=os.path.join(self.tmp, "cache")), workers=2,
+                                   segment_cache=False)
+        output = os.path.join(self.tmp, "parallel.mp4")
+        edl = {"timeline": [
+            {"clip_id": "1", "source_path": self.src, "start": 0.0, "end": 2.0},
+            {"clip_id": "1", "source_path": self.src, "start": 2.32, "end": 3.0},
+            {"clip_id": "1", "source_path": self.src, "start": 5.0, "end": 7.0},
+        ]}
+        report = processor.render_video(edl, output)
+
+        self.assertEqual(report["workers"], 2)
+        self.assertEqual([s["index"] for s in report["segments"]], [0, 1, 2])
+        self.assertTrue(all(s["seconds"] >= 0 for s in report["segments"]))
+        self.assertIn("concat", report["timings"])
+        # The second entry holds no whole GOP and is re-encoded, not copied from the keyframe at 2.0s
+        self.assertEqual([s["action"] for s in report["segments"]], ["copy", "encode", "copy"])
+        self.assertAlmostEqual(probe_streams(output)["duration"], 4.68, delta=0.03)
+
+    def test_output_duration_is_the_sum_of_the_cuts(self):
+        processor = VideoProcessor(cache=AnalysisCache(cache_dir=os.path.join(self.tmp, "cache")), segment_cache=False)
+        output = os.path.join(self.tmp, "exact.mp4")
+        cuts = [(1.0, 2.0), (2.32, 4.6), (5.2, 5.8), (6.0, 8.0)]
+        edl = {"timeline": [{"clip_id": "1", "source_path": self.src, "start": s, "end": e} for s, e in cuts]}
+        report = processor.render_video(edl, output)
+
+        self.assertEqual([s["action"] for s in report["segments"]], ["copy", "smart", "encode", "copy"])
+        expected = sum(e - s for s, e in cuts)
+        # Copied parts bring no frames from before or after their cut, and audio ends with the video
+        # (the container adds at most the AAC encoder delay at the very start)
+        self.assertEqual(_video_frames(output), round(expected * 25))
+        self.assertAlmostEqual(probe_streams(output)["duration"], expected, delta=0.03)
+
+
+class TestSegmentWorkers(unittest.TestCase):
+    def test_cores_are_shared_between_concurrent_renders(self):
+        with mock.patch("os.cpu_count", return_value=16):
+            with mock.patch.dict(os.environ, {"RENDER_CONCURRENCY": "4"}):
+                os.environ.pop("RENDER_SEGMENT_WORKERS", None)
+                self.assertEqual(default_segment_workers(), 4)
+                self.assertEqual(VideoProcessor(segment_cache=False).workers, 4)
+            with mock.patch.dict(os.environ, {"RENDER_CONCURRENCY": "32", "RENDER_SEGMENT_WORKERS": ""}):
+                self.assertEqual(default_segment_workers(), 1)
+            with mock.patch.dict(os.environ, {"RENDER_SEGMENT_WORKERS": "6"}):
+                self.assertEqual(default_segment_workers(), 6)
+
+
+class TestParallelRenderCancel(unittest.TestCase):
+    def test_abort_stops_running_parts(self):
+        tmp = tempfile.mkdtemp()
+        src = os.path.join(tmp, "src.mp4")
+        run_ffmpeg(["-f", "lavfi", "-i", "testsrc=size=320x180:rate=25", "-t", "20", "-c:v", "libx264",
+                    "-preset", "ultrafast", "-pix_fmt", "yuv420p", src])
+        # Upscaled re-encodes: far slower than the abort should take
+        processor = VideoProcessor(cache=AnalysisCache(cache_dir=os.path.join(tmp, "cache")), workers=2,
+                                   segment_cache=False, output_profile={"width": 1920, "height": 1080})
+        edl = {"timeline": [{"clip_id": "1", "source_path": src, "start": 0.5, "end": 9.0},
+                            {"clip_id": "1", "source_path": src, "start": 10.5, "end": 19.0}]}
+        raised = []
+
+        def cancel_once_running(fraction):
+            if fraction > 0:
+                raised.append(time.monotonic())
+                raise InterruptedError("cancelled")
+
+        with self.assertRaises(InterruptedError):
+            processor.render_video(edl, os.path.join(tmp, "out.mp4"), progress_callback=cancel_once_running)
+        self.assertLess(time.monotonic() - raised[0], 4.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
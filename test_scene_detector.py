@@ -0,0 +1,52 @@
+import os
+import tempfile
+import unittest
+
+import cv2
+import numpy as np
+
+from backend.app.services.scene_detector import SceneDetector
+
+
+def _write_clip(path, colors, shot_frames=50, fps=25, size=(320, 180)):
+    w, h = size
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (w, h))
+    for color in colors:
+        for i in range(shot_frames):
+            frame = np.full((h, w, 3), color, dtype=np.uint8)
+            # In-shot motion that must not trigger a cut
+            x0 = int(i / shot_frames * (w - 40))
+            frame[60:100, x0:x0 + 40] = 255 - np.array(color, dtype=np.uint8)
+            writer.write(frame)
+    writer.release()
+
+
+class TestSceneDetector(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.mkdtemp()
+        cls.path = os.path.join(cls.tmp, "three_shots.mp4")
+        _write_clip(cls.path, [(200, 40, 40), (40, 200, 40), (40, 40, 200)])
+
+    def test_detects_hard_cuts(self):
+        cuts, duration = SceneDetector(sample_fps=25).detect_cuts(self.path)
+        self.assertAlmostEqual(duration, 6.0, places=1)
+        self.assertEqual(len(cuts), 2)
+        self.assertAlmostEqual(cuts[0], 2.0, delta=0.05)
+        self.assertAlmostEqual(cuts[1], 4.0, delta=0.05)
+
+    def test_scenes_cover_clip_with_frame_skipping(self):
+        scenes = SceneDetector(sample_fps=5).detect(self.path)
+        self.assertEqual(len(scenes), 3)
+        self.assertEqual(scenes[0]["start"], 0.0)
+        self.assertAlmostEqual(scenes[-1]["end"], 6.0, places=1)
+        for a, b in zip(scenes, scenes[1:]):
+            self.assertEqual(a["end"], b["start"])
+
+    def test_unreadable_file(self):
+        with self.assertRaises(ValueError):
+            SceneDetector().detect(os.path.join(self.tmp, "missing.mp4"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+import copy
+import os
+import tempfile
+import unittest
+
+from backend.app.services.analysis_cache import AnalysisCache
+from backend.app.services.ffmpeg_tools import run_ffmpeg, probe_streams
+from backend.app.services.segment_cache import SegmentCache
+from backend.app.services.video_processor import VideoProcessor
+
+
+class TestIncrementalRender(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.mkdtemp()
+        cls.src = os.path.join(cls.tmp, "src.mp4")
+        run_ffmpeg([
+            "-f", "lavfi", "-i", "testsrc=size=320x180:rate=25",
+            "-f", "lavfi", "-i", "sine=frequency=440:sample_rate=44100",
+            "-t", "8", "-c:v", "libx264", "-g", "25", "-pix_fmt", "yuv420p", "-c:a", "aac", "-shortest", cls.src,
+        ])
+
+    def setUp(self):
+        self.analysis = AnalysisCache(cache_dir=os.path.join(self.tmp, "analysis"))
+        self.segments = SegmentCache(cache_dir=tempfile.mkdtemp(dir=self.tmp))
+        self.edl = {"timeline": [
+            {"clip_id": "1", "source_path": self.src, "start": 0.0, "end": 2.0, "description": "open"},
+            {"clip_id": "1", "source_path": self.src, "start": 2.5, "end": 4.0},
+            {"clip_id": "1", "source_path": self.src, "start": 5.0, "end": 7.0},
+        ]}
+
+    def _render(self, edl, name, quality="final"):
+        processor = VideoProcessor(cache=self.analysis, workers=1, quality=quality, segment_cache=self.segments)
+        return processor.render_video(edl, os.path.join(self.tmp, name))
+
+    def test_only_changed_entry_is_rendered(self):
+        first = self._render(self.edl, "first.mp4")
+        self.assertEqual(first["segment_cache"], {"hits": 0, "misses": 3})
+
+        edited = copy.deepcopy(self.edl)
+        edited["timeline"][1]["end"] = 4.5
+        edited["timeline"][0]["description"] = "renamed, same pixels"
+        second = self._render(edited, "second.mp4")
+        self.assertEqual([s["cache_hit"] for s in second["segments"]], [True, False, True])
+        self.assertEqual(second["segment_cache"], {"hits": 2, "misses": 1})
+        # 0.0-2.0, 2.0(keyframe)-4.5, 5.0-7.0
+        self.assertAlmostEqual(probe_streams(os.path.join(self.tmp, "second.mp4"))["duration"], 6.5, delta=0.6)
+
+        # Cached parts survive the render's temp directory
+        third = self._render(edited, "third.mp4")
+        self.assertEqual(third["segment_cache"]["hits"], 3)
+
+    def test_profile_change_misses(self):
+        self._render(self.edl, "final.mp4")
+        report = self._render(self.edl, "preview.mp4", quality="preview")
+        self.assertEqual(report["segment_cache"]["hits"], 0)
+
+    def test_eviction_keeps_cache_bounded(self):
+        self.segments.max_bytes = 1
+        self._render(self.edl, "tiny.mp4")
+        self.assertGreater(self.segments.evictions, 0)
+        self.assertTrue(os.path.exists(os.path.join(self.tmp, "tiny.mp4")))
+
+
+if __name__ == "__main__":
+    unittest.main()
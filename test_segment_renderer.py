@@ -0,0 +1,56 @@
+import os
+import tempfile
+import unittest
+
+try:
+    from moviepy.editor import ColorClip
+except ImportError:
+    from moviepy import ColorClip
+
+from backend.app.services.ffmpeg_tools import decode_video_frames, probe_streams, run_ffmpeg
+from backend.app.services.render_planner import RenderPlanner
+from backend.app.services.segment_renderer import ProgressLogger, render_segment
+
+
+class TestProgressLogger(unittest.TestCase):
+    def test_reports_frames_of_a_real_render(self):
+        progress = []
+        clip = ColorClip((64, 36), color=(200, 0, 0), duration=1.0)
+        try:
+            clip.write_videofile(os.path.join(tempfile.mkdtemp(), "red.mp4"), fps=10, codec="libx264",
+                                 audio=False, logger=ProgressLogger(progress.append))
+        finally:
+            clip.close()
+        self.assertGreaterEqual(len(progress), 10)  # One per frame
+        self.assertEqual(progress, sorted(progress))
+        self.assertEqual(progress[-1], 1.0)
+
+
+class TestEffectsPart(unittest.TestCase):
+    def test_speed_grade_and_fade_render(self):
+        tmp = tempfile.mkdtemp()
+        src = os.path.join(tmp, "src.mp4")
+        run_ffmpeg(["-f", "lavfi", "-i", "testsrc=size=320x180:rate=25",
+                    "-f", "lavfi", "-i", "sine=frequency=440:sample_rate=44100",
+                    "-t", "4", "-c:v", "libx264", "-pix_fmt", "yuv420p", "-c:a", "aac", "-shortest", src])
+        cut = {"source_path": src, "start": 0.0, "end": 3.0, "speed": 2.0, "filter": "black_white",
+               "transition": "fade_in"}
+        plan = RenderPlanner().plan([cut])
+        self.assertEqual(plan["segments"][0]["action"], "effects")
+
+        progress = []
+        result = render_segment(plan["segments"][0], plan["profile"], tmp, progress.append)
+        self.assertEqual(result["frames"], 38)  # 1.5s at 25 fps
+        self.assertEqual(progress[-1], 1.0)
+        info = probe_streams(result["parts"][0])
+        self.assertAlmostEqual(info["duration"], 1.52, delta=0.03)
+        self.assertIsNotNone(info["audio"])
+
+        frames = next(decode_video_frames(result["parts"][0], sample_fps=25, width=64, fast=False))[1]
+        self.assertLess(frames[0].mean(), 10)  # faded in from black
+        middle = frames[len(frames) // 2].astype(int)
+        self.assertLessEqual(abs(middle[..., 0] - middle[..., 2]).max(), 8)  # greyscale
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,132 @@
+import fcntl
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from backend.app.services import shot_index
+from backend.app.services.director import Director
+from backend.app.services.ffmpeg_tools import run_ffmpeg
+from backend.app.services.pipeline import _match_shots
+from backend.app.services.shot_index import ColorEmbedder, ShotIndex, get_embedder
+from backend.app.services.telemetry import JobTrace
+
+
+def _color_video(path, colors, seconds=2):
+    """One `seconds`-long solid shot per colour."""
+    args = []
+    for color in colors:
+        args += ["-f", "lavfi", "-i", f"color={color}:size=160x90:rate=25:d={seconds}"]
+    inputs = "".join(f"[{i}:v]" for i in range(len(colors)))
+    run_ffmpeg(args + ["-filter_complex", f"{inputs}concat=n={len(colors)}:v=1:a=0[v]", "-map", "[v]",
+                       "-c:v", "libx264", "-pix_fmt", "yuv420p", path])
+    return [{"start": i * seconds, "end": (i + 1) * seconds, "description": f"Scene {i + 1}"}
+            for i in range(len(colors))]
+
+
+class TestColorEmbedder(unittest.TestCase):
+    def test_colour_words_match_solid_frames(self):
+        embedder = ColorEmbedder()
+        frames = np.zeros((2, 4, 4, 3), dtype=np.uint8)
+        frames[0, ..., 0] = 255  # red
+        frames[1, ..., 2] = 255  # blue
+        scores = embedder.embed_images(frames) @ embedder.embed_text(["a red car", "blue sky"]).T
+        np.testing.assert_allclose(scores, np.eye(2), atol=1e-6)
+        self.assertFalse(embedder.embed_text(["no colours here"]).any())
+
+    def test_clip_falls_back_without_its_dependencies(self):
+        with mock.patch("importlib.util.find_spec", return_value=None):
+            self.assertIsInstance(get_embedder("clip"), ColorEmbedder)
+
+
+class TestShotIndex(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.mkdtemp()
+        cls.first = os.path.join(cls.tmp, "first.mp4")
+        cls.second = os.path.join(cls.tmp, "second.mp4")
+        cls.first_scenes = _color_video(cls.first, ["red", "blue", "white"])
+        cls.second_scenes = _color_video(cls.second, ["blue", "yellow"])
+
+    def setUp(self):
+        self.index_dir = tempfile.mkdtemp(dir=self.tmp)
+        self.index = ShotIndex(self.index_dir, embedder=ColorEmbedder(), batch_size=2)
+
+    def test_search_across_the_library(self):
+        self.assertEqual(self.index.add_video("1", self.first, self.first_scenes), 3)
+        self.assertEqual(self.index.add_video("2", self.second, self.second_scenes), 2)
+        self.assertEqual(self.index.add_video("1", self.first, self.first_scenes), 0)  # already indexed
+
+        hits = self.index.search("blue", k=2)
+        self.assertEqual({(h["file_id"], h["start"]) for h in hits}, {("1", 2.0), ("2", 0.0)})
+        self.assertGreater(hits[0]["score"], 0.9)
+        self.assertEqual(self.index.search("yellow", k=1)[0]["file_id"], "2")
+        self.assertEqual([h["file_id"] for h in self.index.search("blue", k=5, file_ids=["2"])], ["2", "2"])
+
+        # A second instance (another worker) reads the same memmapped matrix
+        reopened = ShotIndex(self.index_dir, embedder=ColorEmbedder())
+        self.assertEqual(reopened.stats()["shots"], 5)
+        self.assertEqual(reopened.stats()["keyframes"], 15)
+        self.assertEqual(reopened.search("white", k=1)[0]["start"], 4.0)
+
+    def test_remove_asset_and_embedder_change(self):
+        self.index.add_video("1", self.first, self.first_scenes)
+        self.index.add_video("2", self.second, self.second_scenes)
+        self.assertEqual(self.index.remove_asset("1"), 3)
+        self.assertEqual([h["file_id"] for h in self.index.search("blue", k=5)], ["2", "2"])
+        self.assertEqual(self.index.search("yellow", k=1)[0]["start"], 2.0)
+        self.assertEqual(os.path.getsize(self.index.vectors_path), 6 * 64 * 4)
+
+        class OtherEmbedder(ColorEmbedder):
+            name = "other"
+
+        # Vectors from another model are meaningless to this one: start over
+        self.assertEqual(ShotIndex(self.index_dir, embedder=OtherEmbedder()).stats()["shots"], 0)
+
+    def test_embedding_runs_outside_the_lock(self):
+        index_dir, first, scenes = self.index_dir, self.first, self.first_scenes
+        seen = []
+
+        class RivalEmbedder(ColorEmbedder):
+            def embed_images(self, frames):
+                if not seen:
+                    with open(os.path.join(index_dir, ".lock"), "w") as lock:
+                        try:
+                            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                            seen.append("free")
+                            fcntl.flock(lock, fcntl.LOCK_UN)
+                        except BlockingIOError:
+                            seen.append("held")
+                    if seen == ["free"]:
+                        # Another worker indexes the same video meanwhile
+                        ShotIndex(index_dir, embedder=ColorEmbedder()).add_video("1", first, scenes)
+                return super().embed_images(frames)
+
+        self.assertEqual(ShotIndex(index_dir, embedder=RivalEmbedder()).add_video("1", first, scenes), 0)
+        self.assertEqual(seen, ["free"])
+        self.assertEqual(ShotIndex(index_dir, embedder=ColorEmbedder()).stats()["shots"], 3)
+
+    def test_only_relevant_shots_are_matched(self):
+        self.index.add_video("1", self.first, self.first_scenes)
+        self.index.add_video("2", self.second, self.second_scenes)
+        with mock.patch.object(shot_index, "_shot_index", self.index):
+            assets = [{"file_id": "1"}, {"file_id": "2"}]
+            _match_shots("make a cool video", assets, JobTrace())  # no colour word: a zero query vector
+            self.assertEqual(assets, [{"file_id": "1"}, {"file_id": "2"}])
+
+            _match_shots("a yellow sunflower", assets, JobTrace())
+            self.assertNotIn("shots", assets[0])  # its best shot is not yellow at all
+            self.assertEqual([s["start"] for s in assets[1]["shots"]], [2.0])
+
+    def test_director_uses_the_matching_shot(self):
+        asset = {"file_id": "1", "path": self.first, "type": "video", "metadata": {"duration": 6.0},
+                 "shots": [{"start": 2.0, "end": 4.0, "score": 0.97}]}
+        edl = Director().generate_edit_script("a calm walk", [asset])
+        cut = edl["timeline"][0]
+        self.assertEqual((cut["start"], cut["end"], cut["description"]), (2.0, 4.0, "Requested shot"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,24 @@
+import json
+import subprocess
+import sys
+import unittest
+
+from backend.app.services.warmup import timed_imports
+
+HEAVY_MODULES = ("numpy", "cv2", "librosa", "moviepy", "yt_dlp", "google.generativeai", "torch", "transformers")
+
+
+class TestStartup(unittest.TestCase):
+    def test_api_import_loads_no_media_libraries(self):
+        code = f"import json, sys, backend.main; print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))"
+        out = subprocess.run([sys.executable, "-c", code], stdout=subprocess.PIPE, check=True, text=True).stdout
+        self.assertEqual(json.loads(out.strip().splitlines()[-1]), [])
+
+    def test_timed_imports(self):
+        timings = timed_imports(["json", "no_such_module_here"])
+        self.assertGreaterEqual(timings["json"], 0.0)
+        self.assertIsNone(timings["no_such_module_here"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from backend.app.services.analysis_cache import AnalysisCache
+from backend.app.services.reference_extractor import ReferenceExtractor
+from backend.app.services.style_analyzer import StyleAnalyzer
+from test_scene_detector import _write_clip
+
+
+class _CountingAnalyzer(StyleAnalyzer):
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    def analyze(self, video_path):
+        self.calls += 1
+        return super().analyze(video_path)
+
+
+class TestStyleAnalyzer(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.mkdtemp()
+        cls.colour = os.path.join(cls.tmp, "colour.mp4")
+        _write_clip(cls.colour, [(200, 40, 40), (40, 200, 40), (40, 40, 200), (40, 200, 200)], shot_frames=50)
+        cls.grey = os.path.join(cls.tmp, "grey.mp4")
+        _write_clip(cls.grey, [(40, 40, 40), (200, 200, 200)], shot_frames=75)
+
+    def test_pacing(self):
+        style = StyleAnalyzer().analyze(self.colour)
+        self.assertAlmostEqual(style["duration"], 8.0, delta=0.1)
+        self.assertEqual(len(style["cut_times"]), 3)
+        for cut, expected in zip(style["cut_times"], (2.0, 4.0, 6.0)):
+            self.assertAlmostEqual(cut, expected, delta=0.3)
+        self.assertEqual(style["shot_count"], 4)
+        self.assertAlmostEqual(style["avg_shot_length"], 2.0, delta=0.01)
+        self.assertEqual(style["pacing"], "fast")
+        self.assertEqual(sum(style["shot_lengths"]["histogram"]), 4)
+        self.assertAlmostEqual(style["shot_lengths"]["median"], 2.0, delta=0.3)
+
+    def test_colour_and_motion(self):
+        colour = StyleAnalyzer().analyze(self.colour)
+        grey = StyleAnalyzer().analyze(self.grey)
+
+        self.assertEqual(colour["color"]["vibe"], "vibrant")
+        self.assertEqual(grey["color"]["vibe"], "black_white")
+        self.assertAlmostEqual(sum(grey["color"]["brightness_hist"]), 1.0, places=3)
+        # Half dark, half bright
+        self.assertEqual(grey["color"]["tone"], "balanced")
+        # The moving block is the only motion; the cut between shots is not counted
+        self.assertGreater(colour["motion"]["mean"], 0.0)
+        self.assertLess(colour["motion"]["mean"], 0.06)
+
+    def test_undecodable_file(self):
+        bogus = os.path.join(self.tmp, "bogus.mp4")
+        with open(bogus, "wb") as f:
+            f.write(b"not a video")
+        extractor = ReferenceExtractor(download_dir=os.path.join(self.tmp, "dl_bogus"),
+                                       cache=AnalysisCache(cache_dir=os.path.join(self.tmp, "cache_bogus")))
+        self.assertIsNone(extractor.analyze_style(bogus))
+
+    def test_fingerprint_cached_by_video_id(self):
+        download_dir = os.path.join(self.tmp, "downloads")
+        os.makedirs(download_dir, exist_ok=True)
+        downloaded = os.path.join(download_dir, "abc123XYZ_-.mp4")
+        shutil.copy(self.colour, downloaded)
+
+        analyzer = _CountingAnalyzer()
+        extractor = ReferenceExtractor(download_dir=download_dir, analyzer=analyzer,
+                                       cache=AnalysisCache(cache_dir=os.path.join(self.tmp, "cache")))
+        first = extractor.analyze_style(downloaded)
+        self.assertEqual(first["video_id"], "abc123XYZ_-")
+
+        # Same id, even if the file was re-downloaded with different bytes
+        with open(downloaded, "ab") as f:
+            f.write(b"\0" * 16)
+        second = extractor.analyze_style(downloaded)
+        self.assertEqual(analyzer.calls, 1)
+        self.assertEqual(second["cut_times"], first["cut_times"])
+
+        # Files outside the download dir are cached by content instead
+        extractor.analyze_style(self.colour)
+        extractor.analyze_style(self.colour)
+        self.assertEqual(analyzer.calls, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,153 @@
+import os
+import tempfile
+import time
+import unittest
+
+from backend.app.services.analysis_cache import AnalysisCache
+from backend.app.services.ffmpeg_tools import run_ffmpeg
+from backend.app.services.job_queue import JobManager
+from backend.app.services.telemetry import JobTrace, MetricsRegistry
+from backend.app.services.video_processor import VideoProcessor
+
+
+def _traced_job(payload, ctx):
+    trace = JobTrace()
+    with trace.job():
+        with trace.span("work"):
+            trace.count("frames_encoded", 25)
+        if payload.get("fail"):
+            with trace.span("render"):
+                raise RuntimeError("encoder exploded")
+    return {"ok": True, "trace": trace.to_dict()}
+
+
+class TestJobTrace(unittest.TestCase):
+    def test_spans_counters_and_errors(self):
+        trace = JobTrace()
+        with trace.span("metadata", assets=2):
+            time.sleep(0.01)
+        try:
+            with trace.span("reference_download"):
+                raise ValueError("no network")
+        except ValueError:
+            pass
+        trace.add_span("render.concat", 0.25)
+        trace.count("bytes_written", 100)
+        trace.count("bytes_written", 50)
+
+        data = trace.to_dict()
+        stages = {s["stage"]: s for s in data["spans"]}
+        self.assertGreaterEqual(stages["metadata"]["seconds"], 0.01)
+        self.assertEqual(stages["metadata"]["assets"], 2)
+        self.assertEqual(stages["reference_download"]["status"], "error")
+        self.assertEqual(stages["render.concat"]["seconds"], 0.25)
+        self.assertEqual(data["counters"]["bytes_written"], 150)
+        # Recorded once even though the error passed through the span
+        self.assertEqual(data["errors"], [{"stage": "reference_download", "type": "ValueError",
+                                           "message": "no network"}])
+
+    def test_failed_job_carries_trace(self):
+        trace = JobTrace()
+        with self.assertRaises(RuntimeError) as raised:
+            with trace.job(), trace.span("render"):
+                raise RuntimeError("boom")
+        self.assertEqual(raised.exception.trace["errors"][0]["stage"], "render")
+
+
+class TestMetricsRegistry(unittest.TestCase):
+    def test_prometheus_text(self):
+        metrics = MetricsRegistry(prefix="t")
+        metrics.record_job({
+            "kind": "render", "status": "completed", "created_at": 10.0, "finished_at": 13.0,
+            "trace": {"spans": [{"stage": "director", "seconds": 0.3}], "counters": {"frames_encoded": 50},
+                      "gauges": {"encode_fps": 120.5}, "errors": [{"stage": "music_analysis", "type": "ValueError"}]},
+        })
+        metrics.set("jobs", 1, status='we"ird')
+        text = metrics.render()
+
+        self.assertIn('t_jobs_total{kind="render",status="completed"} 1', text)
+        self.assertIn('t_frames_encoded_total{kind="render"} 50', text)
+        self.assertIn('t_last_encode_fps{kind="render"} 120.5', text)
+        self.assertIn('t_stage_duration_seconds_bucket{kind="render",stage="director",le="0.5"} 1', text)
+        self.assertIn('t_stage_duration_seconds_bucket{kind="render",stage="director",le="0.1"} 0', text)
+        self.assertIn('t_job_duration_seconds_sum{kind="render"} 3.0', text)
+        self.assertIn('t_stage_errors_total{stage="music_analysis",type="ValueError"} 1', text)
+        self.assertIn('t_jobs{status="we\\"ird"} 1', text)
+        self.assertEqual(text.count("# TYPE t_stage_duration_seconds histogram"), 1)
+
+
+class TestJobManagerMetrics(unittest.TestCase):
+    def setUp(self):
+        self.jobs = JobManager(max_workers=1, state_dir=tempfile.mkdtemp())
+
+    def tearDown(self):
+        self.jobs.shutdown()
+
+    def _wait(self, job_id, timeout=60):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            job = self.jobs.get(job_id)
+            if job["status"] in ("completed", "failed"):
+                return job
+            time.sleep(0.05)
+        self.fail("Job never finished")
+
+    def test_traces_of_finished_and_failed_jobs(self):
+        ok = self._wait(self.jobs.submit(_traced_job, {}))
+        failed = self._wait(self.jobs.submit(_traced_job, {"fail": True}))
+
+        self.assertEqual(ok["result"], {"ok": True})
+        self.assertEqual(ok["trace"]["spans"][0]["stage"], "work")
+        self.assertEqual(failed["trace"]["errors"][0]["message"], "encoder exploded")
+
+        text = self.jobs.metrics.render()
+        self.assertIn('ai_editor_jobs_total{kind="render",status="failed"} 1', text)
+        self.assertIn('ai_editor_frames_encoded_total{kind="render"} 50', text)
+        self.assertEqual(self.jobs.status_counts()["completed"], 1)
+
+
+class TestEncoderProgress(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.mkdtemp()
+        cls.src = os.path.join(cls.tmp, "src.mp4")
+        run_ffmpeg([
+            "-f", "lavfi", "-i", "testsrc=size=320x180:rate=25",
+            "-f", "lavfi", "-i", "sine=frequency=440:sample_rate=44100",
+            "-t", "6", "-c:v", "libx264", "-g", "50", "-pix_fmt", "yuv420p", "-c:a", "aac", "-shortest", cls.src,
+        ])
+
+    def test_run_ffmpeg_reports_progress(self):
+        updates = []
+        out = os.path.join(self.tmp, "progress.mp4")
+        run_ffmpeg(["-i", self.src, "-c:v", "libx264", "-preset", "ultrafast", "-an", out],
+                   on_progress=updates.append, duration=6.0)
+
+        self.assertTrue(updates)
+        self.assertEqual(updates[-1]["fraction"], 1.0)
+        self.assertEqual(updates[-1]["frames"], 150)
+        self.assertGreater(updates[-1]["bytes"], 0)
+        self.assertEqual([u["fraction"] for u in updates], sorted(u["fraction"] for u in updates))
+
+    def test_render_counts_encoded_frames(self):
+        processor = VideoProcessor(cache=AnalysisCache(cache_dir=os.path.join(self.tmp, "cache")), workers=2,
+                                   segment_cache=False)
+        output = os.path.join(self.tmp, "out.mp4")
+        progress = []
+        edl = {"timeline": [
+            {"clip_id": "1", "source_path": self.src, "start": 1.0, "end": 2.5},
+            {"clip_id": "1", "source_path": self.src, "start": 4.8, "end": 5.6},
+        ]}
+        report = processor.render_video(edl, output, progress_callback=progress.append)
+
+        counters = report["counters"]
+        # Both entries start off-keyframe, so their heads are re-encoded
+        self.assertGreater(counters["frames_encoded"], 0)
+        self.assertEqual(counters["frames_encoded"], sum(s["frames"] for s in report["segments"]))
+        self.assertGreater(counters["bytes_written"], os.path.getsize(output))
+        self.assertGreater(counters["encode_fps"], 0)
+        self.assertEqual(progress[-1], 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+from backend.app.services.analysis_cache import AnalysisCache
+from backend.app.services.ffmpeg_tools import probe_streams, run_ffmpeg
+from backend.app.services.timeline import DecoderPool, compile_timeline
+from backend.app.services.video_processor import VideoProcessor
+
+
+def _children():
+    """Pids of this process's children, or None without pgrep."""
+    if not shutil.which("pgrep"):
+        return None
+    return set(subprocess.run(["pgrep", "-P", str(os.getpid())], stdout=subprocess.PIPE, text=True).stdout.split())
+
+
+class _FakeReader:
+    def __init__(self):
+        self.running = True
+        self.closes = 0
+
+    def close(self):
+        self.running = False
+        self.closes += 1
+
+
+class _FakeClip:
+    """Stands in for VideoFileClip: subclip/fl build derived clips that read through the source."""
+
+    def __init__(self, path, source=None, frame=None):
+        self.path = path
+        self.reader = _FakeReader() if source is None else source.reader
+        self.closed = False
+        self._frame = frame or (lambda t: (self.path, t))
+
+    def subclip(self, start, end):
+        return _FakeClip(self.path, self, lambda t: self.get_frame(start + t))
+
+    def fl(self, fn):
+        return _FakeClip(self.path, self, lambda t: fn(self.get_frame, t))
+
+    def get_frame(self, t):
+        self.reader.running = True
+        return self._frame(t)
+
+    def close(self):
+        self.closed = True
+
+
+class TestCompileTimeline(unittest.TestCase):
+    def test_indexes_cuts_by_source(self):
+        compiled = compile_timeline([
+            {"source_path": "a.mp4", "start": 0, "end": "1.5"},
+            {"source_path": "b.mp4", "start": 2, "end": 3, "speed": "2"},
+            {"source_path": "a.mp4", "start": 4, "end": 5},
+        ])
+        self.assertEqual(list(compiled["sources"].items()), [("a.mp4", [0, 2]), ("b.mp4", [1])])
+        self.assertEqual(compiled["cuts"][0]["end"], 1.5)
+        self.assertEqual(compiled["cuts"][1]["speed"], 2.0)
+
+    def test_rejects_bad_entries(self):
+        for entry in ({"start": 0, "end": 1}, {"source_path": "a.mp4", "start": 2, "end": 2},
+                      {"source_path": "a.mp4", "start": "x", "end": 1},
+                      {"source_path": "a.mp4", "start": 0, "end": 1, "speed": 0}):
+            with self.assertRaises(ValueError):
+                compile_timeline([entry])
+
+
+class TestDecoderPool(unittest.TestCase):
+    def test_one_reader_per_source_and_a_cap_on_running_decoders(self):
+        opened = []
+
+        def opener(path):
+            opened.append(path)
+            return _FakeClip(path)
+
+        with DecoderPool(max_open=2, opener=opener) as pool:
+            clips = [pool.subclip(path, i, i + 1) for i, path in enumerate(["a", "b", "a", "c", "a", "b"] * 3)]
+            self.assertEqual(opened, ["a", "b", "c"])
+            for clip in clips:
+                self.assertEqual(clip.get_frame(0.5)[0], clip.path)
+                self.assertLessEqual(sum(src.reader.running for src in pool._clips.values()), 2)
+            sources = list(pool._clips.values())
+            self.assertEqual(pool.stats()["peak_decoders"], 2)
+            self.assertGreater(pool.stats()["decoder_restarts"], 0)
+        self.assertTrue(all(src.closed for src in sources))
+
+    def test_closes_readers_on_failure(self):
+        pool = DecoderPool(opener=_FakeClip)
+        with self.assertRaises(RuntimeError):
+            with pool:
+                source = pool.source("a")
+                raise RuntimeError("render failed")
+        self.assertTrue(source.closed)
+
+
+class TestMontageRender(unittest.TestCase):
+    def test_sources_are_opened_once_and_closed(self):
+        tmp = tempfile.mkdtemp()
+        sources = []
+        for i, color in enumerate(("red", "blue")):
+            path = os.path.join(tmp, f"src{i}.mp4")
+            run_ffmpeg(["-f", "lavfi", "-i", f"color={color}:size=160x90:rate=25",
+                        "-f", "lavfi", "-i", "sine=frequency=440:sample_rate=44100", "-t", "5",
+                        "-c:v", "libx264", "-pix_fmt", "yuv420p", "-c:a", "aac", "-shortest", path])
+            sources.append(path)
+        timeline = [{"source_path": sources[i % 2], "start": (i % 4) * 1.0, "end": (i % 4) * 1.0 + 0.4}
+                    for i in range(12)]
+        processor = VideoProcessor(cache=AnalysisCache(cache_dir=os.path.join(tmp, "cache")), mode="moviepy",
+                                   segment_cache=False)
+        output = os.path.join(tmp, "montage.mp4")
+        before = _children()
+        report = processor.render_video({"timeline": timeline}, output)
+
+        self.assertEqual(report["decoders"]["sources"], 2)
+        self.assertAlmostEqual(probe_streams(output)["duration"], 4.8, delta=0.15)
+        if before is not None:
+            # No decoder of this render is left running
+            self.assertEqual(_children() - before, set())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+import unittest
+
+from backend.app.services.asset_registry import AssetRegistry
+from backend.app.services.upload_service import UploadManager, UploadOffsetMismatch, UploadNotFound
+
+
+async def _stream(*chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+class TestUploadManager(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.registry = AssetRegistry(db_path=os.path.join(self.tmp, "assets.db"))
+        self.uploads = UploadManager(upload_dir=self.tmp, music_dir=os.path.join(self.tmp, "music"),
+                                     registry=self.registry)
+        self.data = os.urandom(300_000)
+
+    def run_async(self, coro):
+        return asyncio.run(coro)
+
+    def test_chunked_upload_hashes_and_finalizes(self):
+        session = self.run_async(self.uploads.init("clip.mp4", size=len(self.data)))
+        uid = session["upload_id"]
+        self.run_async(self.uploads.write_chunk(uid, 0, _stream(self.data[:100_000], self.data[100_000:200_000])))
+        status = self.run_async(self.uploads.write_chunk(uid, 200_000, _stream(self.data[200_000:])))
+        self.assertTrue(status["complete"])
+
+        result = self.run_async(self.uploads.finalize(uid, hashlib.sha256(self.data).hexdigest()))
+        self.assertFalse(result["deduplicated"])
+        self.assertEqual(result["sha256"], hashlib.sha256(self.data).hexdigest())
+        self.assertTrue(result["path"].endswith(".mp4"))
+        with open(result["path"], "rb") as f:
+            self.assertEqual(f.read(), self.data)
+        with self.assertRaises(UploadNotFound):
+            self.uploads.status(uid)
+
+    def test_asset_kind_follows_the_extension(self):
+        self.assertEqual(self.run_async(self.uploads.init("voice.MP3"))["kind"], "audio")
+        self.assertEqual(self.run_async(self.uploads.init("clip.mov"))["kind"], "video")
+        self.assertEqual(self.run_async(self.uploads.init("song.mp3", kind="music"))["kind"], "music")
+        with self.assertRaises(ValueError):
+            self.run_async(self.uploads.init("clip.mp4", kind="picture"))
+
+    def test_resume_after_restart(self):
+        session = self.run_async(self.uploads.init("clip.mp4"))
+        uid = session["upload_id"]
+        self.run_async(self.uploads.write_chunk(uid, 0, _stream(self.data[:120_000])))
+
+        # New manager = server restart; in-memory hash state is gone
+        restarted = UploadManager(upload_dir=self.tmp, music_dir=os.path.join(self.tmp, "music"),
+                                  registry=self.registry)
+        offset = restarted.status(uid)["offset"]
+        self.assertEqual(offset, 120_000)
+        with self.assertRaises(UploadOffsetMismatch):
+            self.run_async(restarted.write_chunk(uid, offset + 10, _stream(b"x")))
+
+        self.run_async(restarted.write_chunk(uid, offset, _stream(self.data[offset:])))
+        result = self.run_async(restarted.finalize(uid))
+        self.assertEqual(result["sha256"], hashlib.sha256(self.data).hexdigest())
+
+    def test_duplicate_content_returns_existing_asset(self):
+        first = self.run_async(self._upload("a.mp4", self.data))
+        second = self.run_async(self._upload("copy_of_a.mp4", self.data))
+        self.assertTrue(second["deduplicated"])
+        self.assertEqual(second["file_id"], first["file_id"])
+        self.assertEqual(len([f for f in os.listdir(self.tmp) if f.endswith(".mp4")]), 1)
+
+    def test_music_kind_goes_to_music_dir(self):
+        result = self.run_async(self._upload("track", b"ID3 fake mp3", kind="music"))
+        self.assertTrue(result["path"].startswith(os.path.join(self.tmp, "music")))
+        self.assertTrue(result["url"].startswith("/static/music/"))
+        self.assertTrue(result["path"].endswith(".mp3"))
+
+    async def _upload(self, filename, data, kind="video"):
+        session = await self.uploads.init(filename, size=len(data), kind=kind)
+        await self.uploads.write_chunk(session["upload_id"], 0, _stream(data))
+        return await self.uploads.finalize(session["upload_id"])
+
+
+if __name__ == "__main__":
+    unittest.main()